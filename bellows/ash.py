@@ -3,11 +3,13 @@ from __future__ import annotations
 import abc
 import asyncio
 import binascii
+import bisect
 from collections.abc import Coroutine
 import contextlib
 import dataclasses
 import enum
 import logging
+import re
 import sys
 import time
 import typing
@@ -17,7 +19,7 @@ if sys.version_info[:2] < (3, 11):
 else:
     from asyncio import timeout as asyncio_timeout  # pragma: no cover
 
-from zigpy.types import BaseDataclassMixin
+from zigpy.datastructures import PriorityDynamicBoundedSemaphore
 
 import bellows.types as t
 
@@ -37,35 +39,67 @@ class Reserved(enum.IntEnum):
 
 RESERVED_BYTES = frozenset(Reserved)
 RESERVED_WITHOUT_ESCAPE = frozenset([v for v in Reserved if v != Reserved.ESCAPE])
+RESERVED_WITHOUT_ESCAPE_PATTERN = re.compile(
+    b"[" + re.escape(bytes(sorted(RESERVED_WITHOUT_ESCAPE))) + b"]"
+)
 
 # Initial value of t_rx_ack, the maximum time the NCP waits to receive acknowledgement
 # of a DATA frame
 T_RX_ACK_INIT = 1.6
 
-# Minimum value of t_rx_ack
-T_RX_ACK_MIN = 0.4
+# Minimum value of t_rx_ack. UG101 suggests 0.4s but the RTT estimator accounts for
+# variance, allowing the timeout to follow low latency links much more closely.
+T_RX_ACK_MIN = 0.05
 
 # Maximum value of t_rx_ack
 T_RX_ACK_MAX = 3.2
 
+# Baudrate assumed when estimating how long a frame takes to send, the slowest one used
+# by EZSP adapters
+DEFAULT_BAUDRATE = 57600
+
+# Every byte is sent with a start and a stop bit
+BITS_PER_BYTE = 10
+
 # Delay before sending a non-piggybacked acknowledgement
 T_TX_ACK_DELAY = 0.02
 
+# RTT estimator gains and variance multiplier, from RFC 6298
+RTT_ALPHA = 1 / 8
+RTT_BETA = 1 / 4
+RTT_K = 4
+
+# Lower bound of the variance term of t_rx_ack. The NCP may delay its own ACK frames by
+# up to T_TX_ACK_DELAY, so a perfectly stable RTT does not mean ACKs are instantaneous.
+RTT_GRANULARITY = T_TX_ACK_DELAY
+
 # Time from receiving an ACK or NAK with the nRdy flag set after which the NCP resumes
 # sending callback frames to the host without requiring an ACK or NAK with the nRdy
 # flag clear
 T_REMOTE_NOTRDY = 1.0
 
+# Maximum time host transmission stays paused after receiving an XOFF byte, in case the
+# matching XON byte is lost
+T_XOFF_MAX = 1.0
+
 # Maximum number of DATA frames the NCP can transmit without having received
 # acknowledgements
 TX_K = 1  # TODO: investigate why this cannot be raised without causing a firmware crash
 
+# Frame numbers are three bits wide, so at most seven frames can be unacknowledged
+MAX_TX_K = 7
+
 # Maximum number of consecutive timeouts allowed while waiting to receive an ACK before
 # going to the FAILED state. The value 0 prevents the NCP from entering the error state
 # due to timeouts.
 ACK_TIMEOUTS = 5
 
 
+# Upper bounds of the ACK round-trip time histogram buckets, in seconds. The last
+# bucket counts everything slower than the largest bound.
+RTT_HISTOGRAM_BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+
 def generate_random_sequence(length: int) -> bytes:
     output = bytearray()
     rand = 0x42
@@ -84,6 +118,26 @@ def generate_random_sequence(length: int) -> bytes:
 # Since the sequence is static for every frame, we only need to generate it once
 PSEUDO_RANDOM_DATA_SEQUENCE = generate_random_sequence(256)
 
+# Big-endian integer form of the sequence, so data can be randomized with one XOR
+_PSEUDO_RANDOM_DATA_INT = int.from_bytes(PSEUDO_RANDOM_DATA_SEQUENCE, "big")
+
+# Replacements used for byte stuffing. The escape byte must be replaced first, since
+# every other replacement introduces a new escape byte.
+_STUFFING_REPLACEMENTS = tuple(
+    (bytes([byte]), bytes([Reserved.ESCAPE, byte ^ 0b00100000]))
+    for byte in sorted(RESERVED_BYTES, key=lambda byte: byte != Reserved.ESCAPE)
+)
+
+# Every byte value as a `bytes` object, and its stuffed form
+_SINGLE_BYTES = tuple(bytes([byte]) for byte in range(256))
+_STUFFED_SINGLE_BYTES = tuple(
+    bytes([Reserved.ESCAPE, byte ^ 0b00100000]) if byte in RESERVED_BYTES else single
+    for byte, single in enumerate(_SINGLE_BYTES)
+)
+
+# Maps the second byte of an escape sequence back to the reserved byte it replaces
+_UNSTUFFING_TABLE = {byte ^ 0b00100000: bytes([byte]) for byte in RESERVED_BYTES}
+
 if sys.version_info[:2] < (3, 12):
     create_eager_task = asyncio.create_task
 else:
@@ -131,7 +185,61 @@ class NcpFailure(AshException):
         return f"<{self.__class__.__name__}(code={self.code})>"
 
 
-class AshFrame(abc.ABC, BaseDataclassMixin):
+def randomize(data: bytes) -> bytes:
+    """XOR data with the pseudo-random sequence. The operation is its own inverse."""
+    length = len(data)
+    assert length <= len(PSEUDO_RANDOM_DATA_SEQUENCE)
+
+    sequence = _PSEUDO_RANDOM_DATA_INT >> 8 * (
+        len(PSEUDO_RANDOM_DATA_SEQUENCE) - length
+    )
+    return (int.from_bytes(data, "big") ^ sequence).to_bytes(length, "big")
+
+
+def stuff_bytes(data: bytes) -> bytes:
+    """Stuff bytes for transmission"""
+    data = bytes(data)
+
+    for byte, replacement in _STUFFING_REPLACEMENTS:
+        data = data.replace(byte, replacement)
+
+    return data
+
+
+def unstuff_bytes(data: bytes) -> bytes:
+    """Unstuff bytes after receipt"""
+    data = bytes(data)
+    escape = bytes([Reserved.ESCAPE])
+
+    # A trailing escape byte has nothing to escape and is ignored
+    if data.endswith(escape):
+        data = data[:-1]
+
+    first, *chunks = data.split(escape)
+
+    if not chunks:
+        return first
+
+    try:
+        return first + b"".join(
+            [_UNSTUFFING_TABLE[chunk[0]] + chunk[1:] for chunk in chunks]
+        )
+    except (KeyError, IndexError):
+        pass
+
+    for chunk in chunks:
+        # An empty chunk means that the escape byte was itself escaped
+        byte = (chunk[0] if chunk else Reserved.ESCAPE) ^ 0b00100000
+
+        if byte not in RESERVED_BYTES:
+            raise ParsingError(f"Invalid escaped byte: 0x{byte:02X}")
+
+    raise AssertionError("Unreachable")
+
+
+class AshFrame(abc.ABC):
+    __slots__ = ()
+
     MASK: t.uint8_t
     MASK_VALUE: t.uint8_t
 
@@ -142,6 +250,10 @@ class AshFrame(abc.ABC, BaseDataclassMixin):
     def to_bytes(self) -> bytes:
         raise NotImplementedError()
 
+    def to_stuffed_chunks(self) -> tuple[bytes, ...]:
+        """Serialize and stuff the frame, as chunks to be joined by the caller."""
+        return (stuff_bytes(self.to_bytes()),)
+
     @classmethod
     def _unwrap(cls, data: bytes) -> tuple[int, bytes]:
         if len(data) < 3:
@@ -162,8 +274,12 @@ class AshFrame(abc.ABC, BaseDataclassMixin):
         return data + binascii.crc_hqx(data, 0xFFFF).to_bytes(2, "big")
 
 
-@dataclasses.dataclass(frozen=True)
+# DATA frames are mutable so that retransmissions can update their control fields in
+# place instead of allocating a new frame for every attempt
+@dataclasses.dataclass
 class DataFrame(AshFrame):
+    __slots__ = ("frm_num", "re_tx", "ack_num", "ezsp_frame")
+
     MASK = 0b10000000
     MASK_VALUE = 0b00000000
 
@@ -172,10 +288,7 @@ class DataFrame(AshFrame):
     ack_num: int
     ezsp_frame: bytes
 
-    @staticmethod
-    def _randomize(data: bytes) -> bytes:
-        assert len(data) <= len(PSEUDO_RANDOM_DATA_SEQUENCE)
-        return bytes([a ^ b for a, b in zip(data, PSEUDO_RANDOM_DATA_SEQUENCE)])
+    _randomize = staticmethod(randomize)
 
     @classmethod
     def from_bytes(cls, data: bytes) -> DataFrame:
@@ -188,22 +301,39 @@ class DataFrame(AshFrame):
             ezsp_frame=cls._randomize(data),
         )
 
+    def _control_byte(self) -> int:
+        return (
+            self.MASK_VALUE
+            | (self.frm_num) << 4
+            | (self.re_tx) << 3
+            | (self.ack_num) << 0
+        )
+
     def to_bytes(self, *, randomize: bool = True) -> bytes:
         return self.append_crc(
-            bytes(
-                [
-                    self.MASK_VALUE
-                    | (self.frm_num) << 4
-                    | (self.re_tx) << 3
-                    | (self.ack_num) << 0
-                ]
-            )
-            + self._randomize(self.ezsp_frame)
+            bytes([self._control_byte()]) + self._randomize(self.ezsp_frame)
+        )
+
+    def to_stuffed_chunks(self) -> tuple[bytes, ...]:
+        # The payload is only copied when it is randomized. The CRC is computed
+        # incrementally over the pieces and nothing is concatenated: all chunks are
+        # copied once, when the write buffer is joined.
+        control = _SINGLE_BYTES[self._control_byte()]
+        data = self._randomize(self.ezsp_frame)
+        crc = binascii.crc_hqx(data, binascii.crc_hqx(control, 0xFFFF))
+
+        return (
+            _STUFFED_SINGLE_BYTES[control[0]],
+            stuff_bytes(data),
+            _STUFFED_SINGLE_BYTES[crc >> 8],
+            _STUFFED_SINGLE_BYTES[crc & 0xFF],
         )
 
 
 @dataclasses.dataclass(frozen=True)
 class AckFrame(AshFrame):
+    __slots__ = ("res", "ncp_ready", "ack_num")
+
     MASK = 0b11100000
     MASK_VALUE = 0b10000000
 
@@ -233,9 +363,14 @@ class AckFrame(AshFrame):
             )
         )
 
+    def to_stuffed_chunks(self) -> tuple[bytes, ...]:
+        return _INTERNED_STUFFED_CHUNKS.get(self) or super().to_stuffed_chunks()
+
 
 @dataclasses.dataclass(frozen=True)
 class NakFrame(AshFrame):
+    __slots__ = ("res", "ncp_ready", "ack_num")
+
     MASK = 0b11100000
     MASK_VALUE = 0b10100000
 
@@ -265,9 +400,14 @@ class NakFrame(AshFrame):
             )
         )
 
+    def to_stuffed_chunks(self) -> tuple[bytes, ...]:
+        return _INTERNED_STUFFED_CHUNKS.get(self) or super().to_stuffed_chunks()
+
 
 @dataclasses.dataclass(frozen=True)
 class RstFrame(AshFrame):
+    __slots__ = ()
+
     MASK = 0b11111111
     MASK_VALUE = 0b11000000
 
@@ -286,6 +426,8 @@ class RstFrame(AshFrame):
 
 @dataclasses.dataclass(frozen=True)
 class RStackFrame(AshFrame):
+    __slots__ = ("version", "reset_code")
+
     MASK = 0b11111111
     MASK_VALUE = 0b11000001
 
@@ -317,6 +459,8 @@ class RStackFrame(AshFrame):
 
 @dataclasses.dataclass(frozen=True)
 class ErrorFrame(AshFrame):
+    __slots__ = ("version", "reset_code")
+
     MASK = 0b11111111
     MASK_VALUE = 0b11000010
 
@@ -328,48 +472,165 @@ class ErrorFrame(AshFrame):
     to_bytes = RStackFrame.to_bytes
 
 
+# Frame type for every possible control byte, `None` if the control byte is invalid
+FRAME_TYPES_BY_CONTROL_BYTE: tuple[type[AshFrame] | None, ...] = tuple(
+    next(
+        (
+            frame
+            for frame in [
+                DataFrame,
+                AckFrame,
+                NakFrame,
+                RstFrame,
+                RStackFrame,
+                ErrorFrame,
+            ]
+            if control_byte & frame.MASK == frame.MASK_VALUE
+        ),
+        None,
+    )
+    for control_byte in range(256)
+)
+
+# ACK and NAK frames carry no data and have only a few dozen possible encodings. These
+# make up a large portion of all traffic so immutable instances are shared.
+INTERNED_FRAMES: dict[bytes, AckFrame | NakFrame] = {
+    frame.to_bytes(): frame
+    for frame_type in (AckFrame, NakFrame)
+    for res in (0, 1)
+    for ncp_ready in (0, 1)
+    for ack_num in range(8)
+    for frame in [frame_type(res=res, ncp_ready=ncp_ready, ack_num=ack_num)]
+}
+
+# Their stuffed encodings are also computed once
+_INTERNED_STUFFED_CHUNKS: dict[AckFrame | NakFrame, tuple[bytes, ...]] = {
+    frame: (stuff_bytes(data),) for data, frame in INTERNED_FRAMES.items()
+}
+
+
 def parse_frame(
     data: bytes,
 ) -> DataFrame | AckFrame | NakFrame | RstFrame | RStackFrame | ErrorFrame:
     """Parse a frame from the given data, looking at the control byte."""
-    control_byte = data[0]
-
-    # In order of use
-    for frame in [
-        DataFrame,
-        AckFrame,
-        NakFrame,
-        RstFrame,
-        RStackFrame,
-        ErrorFrame,
-    ]:
-        if control_byte & frame.MASK == frame.MASK_VALUE:
-            return frame.from_bytes(data)
-    else:
+    frame = INTERNED_FRAMES.get(data)
+
+    if frame is not None:
+        return frame
+
+    frame_type = FRAME_TYPES_BY_CONTROL_BYTE[data[0]]
+
+    if frame_type is None:
         raise ParsingError(f"Could not determine frame type: {data!r}")
 
+    return frame_type.from_bytes(data)
+
+
+@dataclasses.dataclass
+class AshStatistics:
+    """Counters describing the health of the serial link."""
+
+    frames_tx: int = 0
+    frames_rx: int = 0
+    bytes_tx: int = 0
+    bytes_rx: int = 0
+    retransmits: int = 0
+    ack_timeouts: int = 0
+    naks_tx: int = 0
+    naks_rx: int = 0
+    parse_failures: int = 0
+    discarded_bytes: int = 0
+    xoff_count: int = 0
+    xoff_timeouts: int = 0
+    tx_paused_time: float = 0.0
+    t_rx_ack: float = T_RX_ACK_INIT
+    srtt: float = 0.0
+    rttvar: float = 0.0
+    rtt_histogram: list[int] = dataclasses.field(
+        default_factory=lambda: [0] * (len(RTT_HISTOGRAM_BUCKETS) + 1)
+    )
+
+    def record_rtt(self, rtt: float) -> None:
+        self.rtt_histogram[bisect.bisect_left(RTT_HISTOGRAM_BUCKETS, rtt)] += 1
+
+    def as_dict(self) -> dict[str, int]:
+        """Flatten the statistics into integer counters."""
+        counters = {
+            field.name: getattr(self, field.name)
+            for field in dataclasses.fields(self)
+            if field.type == "int"
+        }
+        counters["tx_paused_ms"] = round(1000 * self.tx_paused_time)
+        counters["t_rx_ack_ms"] = round(1000 * self.t_rx_ack)
+        counters["srtt_ms"] = round(1000 * self.srtt)
+        counters["rttvar_ms"] = round(1000 * self.rttvar)
+
+        for bound, count in zip(RTT_HISTOGRAM_BUCKETS, self.rtt_histogram):
+            counters[f"rtt_le_{round(1000 * bound)}ms"] = count
+
+        counters[
+            f"rtt_gt_{round(1000 * RTT_HISTOGRAM_BUCKETS[-1])}ms"
+        ] = self.rtt_histogram[-1]
+
+        return counters
+
 
 class AshProtocol(asyncio.Protocol):
-    def __init__(self, ezsp_protocol) -> None:
+    def __init__(
+        self,
+        ezsp_protocol,
+        *,
+        tx_k: int = TX_K,
+        ack_delay: float = 0,
+        baudrate: int = DEFAULT_BAUDRATE,
+    ) -> None:
+        if not 1 <= tx_k <= MAX_TX_K:
+            raise ValueError(f"TX window must be between 1 and {MAX_TX_K}: {tx_k}")
+
         self._ezsp_protocol = ezsp_protocol
         self._transport = None
         self._buffer = bytearray()
+        self._scan_offset: int = 0
         self._discarding_until_next_flag: bool = False
         self._pending_data_frames: dict[int, asyncio.Future] = {}
-        self._send_data_frame_semaphore = asyncio.Semaphore(TX_K)
+        self._tx_k = tx_k
+        self._send_data_frame_semaphore = PriorityDynamicBoundedSemaphore(tx_k)
         self._tx_seq: int = 0
         self._rx_seq: int = 0
         self._t_rx_ack = T_RX_ACK_INIT
+        self._srtt: float | None = None
+        self._rttvar: float | None = None
+        self._ack_delay = ack_delay
+        self._baudrate = baudrate
+        self._delayed_ack_handle: asyncio.TimerHandle | None = None
+        self._write_chunks: list[bytes] = []
+        self._flush_writes_handle: asyncio.Handle | None = None
+
+        # Software flow control
+        self._tx_paused_since: float | None = None
+        self._tx_resumed = asyncio.Event()
+        self._tx_resumed.set()
+        self._xoff_timeout_handle: asyncio.TimerHandle | None = None
+
+        # Host-side flow control, sent as the nRdy flag of ACK and NAK frames
+        self._host_not_ready: bool = False
+        self._host_not_ready_handle: asyncio.TimerHandle | None = None
 
         self._ncp_reset_code: t.NcpResetCode | None = None
         self._ncp_state: NcpState = NcpState.CONNECTED
 
+        self.stats = AshStatistics()
+
     def connection_made(self, transport):
         self._transport = transport
         self._ezsp_protocol.connection_made(self)
 
     def connection_lost(self, exc):
         self._transport = None
+        self._cancel_delayed_ack()
+        self._cancel_host_not_ready_refresh()
+        self._resume_transmission()
+        self._flush_writes()
         self._cancel_pending_data_frames()
         self._ezsp_protocol.connection_lost(exc)
 
@@ -384,79 +645,58 @@ class AshProtocol(asyncio.Protocol):
                 fut.set_exception(exc)
 
     def close(self):
+        self._cancel_delayed_ack()
+        self._cancel_host_not_ready_refresh()
+        self._resume_transmission()
         self._cancel_pending_data_frames()
 
         if self._transport is not None:
             self._transport.close()
             self._transport = None
 
-    @staticmethod
-    def _stuff_bytes(data: bytes) -> bytes:
-        """Stuff bytes for transmission"""
-        out = bytearray()
-
-        for c in data:
-            if c in RESERVED_BYTES:
-                out.extend([Reserved.ESCAPE, c ^ 0b00100000])
-            else:
-                out.append(c)
-
-        return out
-
-    @staticmethod
-    def _unstuff_bytes(data: bytes) -> bytes:
-        """Unstuff bytes after receipt"""
-        out = bytearray()
-        escaped = False
-
-        for c in data:
-            if escaped:
-                byte = c ^ 0b00100000
-                if byte not in RESERVED_BYTES:
-                    raise ParsingError(f"Invalid escaped byte: 0x{byte:02X}")
-
-                out.append(byte)
-                escaped = False
-            elif c == Reserved.ESCAPE:
-                escaped = True
-            else:
-                out.append(c)
-
-        return out
+    _stuff_bytes = staticmethod(stuff_bytes)
+    _unstuff_bytes = staticmethod(unstuff_bytes)
 
     def data_received(self, data: bytes) -> None:
         _LOGGER.debug("Received data %s", data.hex())
-        self._buffer.extend(data)
-
-        if len(self._buffer) > MAX_BUFFER_SIZE:
-            _LOGGER.debug(
-                "Truncating buffer to %s bytes, it is growing too fast", MAX_BUFFER_SIZE
-            )
-            self._buffer = self._buffer[-MAX_BUFFER_SIZE:]
+        self.stats.bytes_rx += len(data)
+        self._buffer += data
 
+        # The buffer only ever holds a single partial frame. Consumed bytes are deleted
+        # from the front of the `bytearray`, which does not copy the rest of the buffer.
         while self._buffer:
             if self._discarding_until_next_flag:
-                if bytes([Reserved.FLAG]) not in self._buffer:
+                flag_index = self._buffer.find(Reserved.FLAG, self._scan_offset)
+
+                if flag_index == -1:
+                    self.stats.discarded_bytes += len(self._buffer)
                     self._buffer.clear()
+                    self._scan_offset = 0
                     break
 
                 self._discarding_until_next_flag = False
-                _, _, self._buffer = self._buffer.partition(bytes([Reserved.FLAG]))
+                self.stats.discarded_bytes += flag_index
+                del self._buffer[: flag_index + 1]
+                self._scan_offset = 0
+
+            # Find the index of the first reserved byte that isn't an escape byte,
+            # skipping over data that has already been scanned
+            match = RESERVED_WITHOUT_ESCAPE_PATTERN.search(
+                self._buffer, self._scan_offset
+            )
 
-            try:
-                # Find the index of the first reserved byte that isn't an escape byte
-                reserved_index, reserved_byte = next(
-                    (index, byte)
-                    for index, byte in enumerate(self._buffer)
-                    if byte in RESERVED_WITHOUT_ESCAPE
-                )
-            except StopIteration:
+            if match is None:
+                self._scan_offset = len(self._buffer)
                 break
 
+            reserved_index = match.start()
+            reserved_byte = self._buffer[reserved_index]
+
             if reserved_byte == Reserved.FLAG:
                 # Flag Byte marks the end of a frame
                 frame_bytes = self._buffer[:reserved_index]
-                self._buffer = self._buffer[reserved_index + 1 :]
+                del self._buffer[: reserved_index + 1]
+                self._scan_offset = 0
 
                 # Consecutive EOFs can be received, empty frames are ignored
                 if not frame_bytes:
@@ -469,10 +709,16 @@ class AshProtocol(asyncio.Protocol):
                     _LOGGER.debug(
                         "Failed to parse frame %r", frame_bytes, exc_info=True
                     )
+                    self.stats.parse_failures += 1
+                    self.stats.discarded_bytes += len(frame_bytes)
 
                     with contextlib.suppress(NcpFailure):
                         self._write_frame(
-                            NakFrame(res=0, ncp_ready=0, ack_num=self._rx_seq),
+                            NakFrame(
+                                res=0,
+                                ncp_ready=self._host_not_ready,
+                                ack_num=self._rx_seq,
+                            ),
                             prefix=(Reserved.CANCEL,),
                         )
                 else:
@@ -480,39 +726,104 @@ class AshProtocol(asyncio.Protocol):
             elif reserved_byte == Reserved.CANCEL:
                 _LOGGER.debug("Received cancel byte, clearing buffer")
                 # All data received since the previous Flag Byte to be ignored
-                self._buffer = self._buffer[reserved_index + 1 :]
+                self.stats.discarded_bytes += reserved_index
+                del self._buffer[: reserved_index + 1]
+                self._scan_offset = 0
             elif reserved_byte == Reserved.SUBSTITUTE:
                 _LOGGER.debug("Received substitute byte, marking buffer as corrupted")
                 # The data between the previous and the next Flag Byte is ignored
                 self._discarding_until_next_flag = True
-                self._buffer = self._buffer[reserved_index + 1 :]
+                self.stats.discarded_bytes += reserved_index
+                del self._buffer[: reserved_index + 1]
+                self._scan_offset = 0
             elif reserved_byte == Reserved.XON:
-                # Resume transmission: not implemented!
                 _LOGGER.debug("Received XON byte, resuming transmission")
-                self._buffer.pop(reserved_index)
+                del self._buffer[reserved_index]
+                self._scan_offset = reserved_index
+                self._resume_transmission()
             elif reserved_byte == Reserved.XOFF:
-                # Pause transmission: not implemented!
                 _LOGGER.debug("Received XOFF byte, pausing transmission")
-                self._buffer.pop(reserved_index)
+                del self._buffer[reserved_index]
+                self._scan_offset = reserved_index
+                self._pause_transmission()
             else:
                 raise RuntimeError(
                     f"Unexpected reserved byte found: 0x{reserved_byte:02X}"
                 )  # pragma: no cover
 
+        # No valid frame can be this long: drop it and resync on the next Flag Byte
+        if len(self._buffer) > MAX_BUFFER_SIZE:
+            _LOGGER.debug(
+                "Discarding %d bytes, no frame boundary was found", len(self._buffer)
+            )
+            self.stats.discarded_bytes += len(self._buffer)
+            self._buffer.clear()
+            self._scan_offset = 0
+            self._discarding_until_next_flag = True
+
+    def _pause_transmission(self) -> None:
+        # Every XOFF byte restarts the timeout, the NCP is still asking us to wait
+        if self._xoff_timeout_handle is not None:
+            self._xoff_timeout_handle.cancel()
+
+        self._xoff_timeout_handle = asyncio.get_running_loop().call_later(
+            T_XOFF_MAX, self._xoff_timeout
+        )
+
+        if self._tx_paused_since is not None:
+            return
+
+        self.stats.xoff_count += 1
+        self._tx_paused_since = time.monotonic()
+        self._tx_resumed.clear()
+
+    def _xoff_timeout(self) -> None:
+        self._xoff_timeout_handle = None
+        self.stats.xoff_timeouts += 1
+
+        _LOGGER.debug(
+            "No XON byte received in %0.2fs, resuming transmission", T_XOFF_MAX
+        )
+        self._resume_transmission()
+
+    def _resume_transmission(self) -> None:
+        if self._xoff_timeout_handle is not None:
+            self._xoff_timeout_handle.cancel()
+            self._xoff_timeout_handle = None
+
+        if self._tx_paused_since is None:
+            self._flush_writes()
+            return
+
+        self.stats.tx_paused_time += time.monotonic() - self._tx_paused_since
+        self._tx_paused_since = None
+        self._tx_resumed.set()
+
+        # Send everything that was queued while transmission was paused
+        self._flush_writes()
+
     def _handle_ack(self, frame: DataFrame | AckFrame | NakFrame) -> None:
         # Note that ackNum is the number of the next frame the receiver expects and it
-        # is one greater than the last frame received.
-        for ack_num_offset in range(-TX_K, 0):
-            ack_num = (frame.ack_num + ack_num_offset) % 8
-            fut = self._pending_data_frames.get(ack_num)
-
-            if fut is None or fut.done():
-                continue
+        # is one greater than the last frame received. Acknowledgements are cumulative:
+        # every outstanding frame sent before `ackNum` has been received.
+        if (
+            frame.ack_num != self._tx_seq
+            and frame.ack_num not in self._pending_data_frames
+        ):
+            # Stale or invalid acknowledgement, it does not fall within our window
+            return
+
+        # Pending frames are stored in the order they were first sent
+        for frm_num, fut in self._pending_data_frames.items():
+            if frm_num == frame.ack_num:
+                break
 
-            self._pending_data_frames[ack_num].set_result(True)
+            if not fut.done():
+                fut.set_result(True)
 
     def frame_received(self, frame: AshFrame) -> None:
         _LOGGER.debug("Received frame %r", frame)
+        self.stats.frames_rx += 1
 
         # If a frame has ACK information (DATA, ACK, or NAK), it should be used even if
         # the frame is out of sequence or invalid
@@ -534,21 +845,87 @@ class AshProtocol(asyncio.Protocol):
         else:
             raise TypeError(f"Unknown frame received: {frame}")  # pragma: no cover
 
+    def _cancel_delayed_ack(self) -> None:
+        if self._delayed_ack_handle is not None:
+            self._delayed_ack_handle.cancel()
+            self._delayed_ack_handle = None
+
+    def _send_delayed_ack(self) -> None:
+        self._delayed_ack_handle = None
+
+        with contextlib.suppress(NcpFailure):
+            self._write_frame(
+                AckFrame(res=0, ncp_ready=self._host_not_ready, ack_num=self._rx_seq)
+            )
+
+    def _acknowledge_data_frame(self) -> None:
+        # Without a delay, the Host promptly sends an ACK frame for every DATA frame
+        if not self._ack_delay:
+            self._write_frame(
+                AckFrame(res=0, ncp_ready=self._host_not_ready, ack_num=self._rx_seq)
+            )
+            return
+
+        # Otherwise, a single cumulative ACK is sent once the delay expires, unless a
+        # DATA frame is sent before then and carries the acknowledgement instead
+        if self._delayed_ack_handle is None:
+            self._delayed_ack_handle = asyncio.get_running_loop().call_later(
+                self._ack_delay, self._send_delayed_ack
+            )
+
+    def _cancel_host_not_ready_refresh(self) -> None:
+        if self._host_not_ready_handle is not None:
+            self._host_not_ready_handle.cancel()
+            self._host_not_ready_handle = None
+
+    def _refresh_host_not_ready(self) -> None:
+        # The NCP resumes sending callbacks T_REMOTE_NOTRDY after the last frame with
+        # the nRdy flag set, so it must be periodically repeated
+        self._host_not_ready_handle = asyncio.get_running_loop().call_later(
+            T_REMOTE_NOTRDY / 2, self._refresh_host_not_ready
+        )
+
+        with contextlib.suppress(NcpFailure):
+            self._write_frame(
+                AckFrame(res=0, ncp_ready=self._host_not_ready, ack_num=self._rx_seq)
+            )
+
+    def set_host_ready(self, ready: bool) -> None:
+        """Ask the NCP to hold onto callbacks while the host is not ready for them."""
+        if self._host_not_ready == (not ready):
+            return
+
+        _LOGGER.debug("Host is %sready to receive callbacks", "" if ready else "not ")
+        self._host_not_ready = not ready
+        self._cancel_host_not_ready_refresh()
+
+        if self._host_not_ready:
+            self._refresh_host_not_ready()
+            return
+
+        # Let the NCP know immediately that it can resume sending callbacks
+        with contextlib.suppress(NcpFailure):
+            self._write_frame(
+                AckFrame(res=0, ncp_ready=self._host_not_ready, ack_num=self._rx_seq)
+            )
+
     def data_frame_received(self, frame: DataFrame) -> None:
-        # The Host may not piggyback acknowledgments and should promptly send an ACK
-        # frame when it receives a DATA frame.
         if frame.frm_num == self._rx_seq:
             self._rx_seq = (frame.frm_num + 1) % 8
-            self._write_frame(AckFrame(res=0, ncp_ready=0, ack_num=self._rx_seq))
+            self._acknowledge_data_frame()
 
             self._ezsp_protocol.data_received(frame.ezsp_frame)
         elif frame.re_tx:
             # Retransmitted frames must be immediately ACKed even if they are out of
             # sequence
-            self._write_frame(AckFrame(res=0, ncp_ready=0, ack_num=self._rx_seq))
+            self._write_frame(
+                AckFrame(res=0, ncp_ready=self._host_not_ready, ack_num=self._rx_seq)
+            )
         else:
             _LOGGER.debug("Received an out of sequence frame: %r", frame)
-            self._write_frame(NakFrame(res=0, ncp_ready=0, ack_num=self._rx_seq))
+            self._write_frame(
+                NakFrame(res=0, ncp_ready=self._host_not_ready, ack_num=self._rx_seq)
+            )
 
     def rstack_frame_received(self, frame: RStackFrame) -> None:
         self._ncp_reset_code = None
@@ -556,13 +933,16 @@ class AshProtocol(asyncio.Protocol):
 
         self._tx_seq = 0
         self._rx_seq = 0
-        self._change_ack_timeout(T_RX_ACK_INIT)
+        self._cancel_delayed_ack()
+        self._reset_rtt_estimator()
+        self._send_data_frame_semaphore.max_value = self._tx_k
         self._ezsp_protocol.reset_received(frame.reset_code)
 
     def ack_frame_received(self, frame: AckFrame) -> None:
         pass
 
     def nak_frame_received(self, frame: NakFrame) -> None:
+        self.stats.naks_rx += 1
         self._cancel_pending_data_frames(NotAcked(frame=frame))
 
     def rst_frame_received(self, frame: RstFrame) -> None:
@@ -588,6 +968,7 @@ class AshProtocol(asyncio.Protocol):
         *,
         prefix: tuple[Reserved] = (),
         suffix: tuple[Reserved] = (Reserved.FLAG,),
+        flush: bool = False,
     ) -> None:
         if self._transport is None or self._transport.is_closing():
             raise NcpFailure("Transport is closed, cannot send frame")
@@ -597,8 +978,56 @@ class AshProtocol(asyncio.Protocol):
             suffix_str = "".join([f" + {r.name}" for r in suffix])
             _LOGGER.debug("Sending frame %s%r%s", prefix_str, frame, suffix_str)
 
-        data = bytes(prefix) + self._stuff_bytes(frame.to_bytes()) + bytes(suffix)
-        _LOGGER.debug("Sending data  %s", data.hex())
+        self.stats.frames_tx += 1
+
+        if isinstance(frame, NakFrame):
+            self.stats.naks_tx += 1
+
+        # Frames written during a single event loop iteration are sent together
+        for reserved in prefix:
+            self._write_chunks.append(_SINGLE_BYTES[reserved])
+
+        self._write_chunks.extend(frame.to_stuffed_chunks())
+
+        for reserved in suffix:
+            self._write_chunks.append(_SINGLE_BYTES[reserved])
+
+        if flush:
+            self._flush_writes()
+        elif self._flush_writes_handle is None:
+            self._flush_writes_handle = asyncio.get_running_loop().call_soon(
+                self._flush_writes
+            )
+
+        # Any DATA, ACK, or NAK frame acknowledges everything received so far
+        if (
+            self._delayed_ack_handle is not None
+            and isinstance(frame, (DataFrame, AckFrame, NakFrame))
+            and frame.ack_num == self._rx_seq
+        ):
+            self._cancel_delayed_ack()
+
+    def _flush_writes(self) -> None:
+        if self._flush_writes_handle is not None:
+            self._flush_writes_handle.cancel()
+            self._flush_writes_handle = None
+
+        # Queued data is sent once the NCP resumes transmission with an XON byte
+        if not self._write_chunks or self._tx_paused_since is not None:
+            return
+
+        # Every queued chunk is copied exactly once, into the data being written
+        data = b"".join(self._write_chunks)
+        self._write_chunks.clear()
+
+        if self._transport is None or self._transport.is_closing():
+            _LOGGER.debug("Transport is closed, dropping data %s", data.hex())
+            return
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Sending data  %s", data.hex())
+
+        self.stats.bytes_tx += len(data)
         self._transport.write(data)
 
     def _change_ack_timeout(self, new_value: float) -> None:
@@ -610,14 +1039,64 @@ class AshProtocol(asyncio.Protocol):
             )
 
         self._t_rx_ack = new_value
+        self.stats.t_rx_ack = new_value
+
+    def _reset_rtt_estimator(self) -> None:
+        self._srtt = None
+        self._rttvar = None
+        self.stats.srtt = 0.0
+        self.stats.rttvar = 0.0
+        self._change_ack_timeout(T_RX_ACK_INIT)
+
+    def _update_rtt_estimator(self, rtt: float) -> None:
+        """Update the smoothed RTT and its variance with an unambiguous sample."""
+        self.stats.record_rtt(rtt)
+
+        if self._srtt is None:
+            self._srtt = rtt
+            self._rttvar = rtt / 2
+        else:
+            self._rttvar = (1 - RTT_BETA) * self._rttvar + RTT_BETA * abs(
+                self._srtt - rtt
+            )
+            self._srtt = (1 - RTT_ALPHA) * self._srtt + RTT_ALPHA * rtt
+
+        self.stats.srtt = self._srtt
+        self.stats.rttvar = self._rttvar
+        self._change_ack_timeout(
+            self._srtt + max(RTT_GRANULARITY, RTT_K * self._rttvar)
+        )
+
+    def _transmission_time(self, frame: DataFrame) -> float:
+        """Time it takes to write a DATA frame to the serial port."""
+        # Control byte, CRC, and flag. Randomized data rarely needs to be stuffed.
+        return (len(frame.ezsp_frame) + 4) * BITS_PER_BYTE / self._baudrate
+
+    def _reduce_tx_window(self) -> None:
+        """Fall back to a window of a single frame when the NCP requires retransmits."""
+        if len(self._pending_data_frames) <= 1:
+            return
+
+        if self._send_data_frame_semaphore.max_value == 1:
+            return
 
-    async def _send_data_frame(self, frame: AshFrame) -> None:
+        _LOGGER.debug(
+            "Retransmission needed with %d frames in flight, reducing TX window to 1",
+            len(self._pending_data_frames),
+        )
+        self._send_data_frame_semaphore.max_value = 1
+
+    async def _send_data_frame(self, frame: DataFrame) -> None:
         if self._send_data_frame_semaphore.locked():
             _LOGGER.debug("Semaphore is locked, waiting")
 
         async with self._send_data_frame_semaphore:
             frm_num = None
 
+            # The RTT estimator only tracks the NCP's response time, large frames
+            # take much longer to send than small ones at low baudrates
+            tx_time = self._transmission_time(frame)
+
             try:
                 for attempt in range(ACK_TIMEOUTS):
                     if self._ncp_state == NcpState.FAILED:
@@ -631,13 +1110,19 @@ class AshProtocol(asyncio.Protocol):
                     if frm_num is None:
                         frm_num = self._tx_seq
                         self._tx_seq = (self._tx_seq + 1) % 8
+                        frame.frm_num = frm_num
+
+                    # Don't start the ACK timer while the NCP has paused transmission
+                    if not self._tx_resumed.is_set():
+                        _LOGGER.debug("Transmission is paused, waiting")
+                        await self._tx_resumed.wait()
+
+                    if attempt > 0:
+                        self.stats.retransmits += 1
 
                     # Use a fresh ACK number on every retry
-                    frame = frame.replace(
-                        frm_num=frm_num,
-                        re_tx=(attempt > 0),
-                        ack_num=self._rx_seq,
-                    )
+                    frame.re_tx = attempt > 0
+                    frame.ack_num = self._rx_seq
 
                     send_time = time.monotonic()
 
@@ -646,7 +1131,7 @@ class AshProtocol(asyncio.Protocol):
                     self._write_frame(frame)
 
                     try:
-                        async with asyncio_timeout(self._t_rx_ack):
+                        async with asyncio_timeout(self._t_rx_ack + tx_time):
                             await ack_future
                     except NotAcked:
                         _LOGGER.debug(
@@ -656,8 +1141,12 @@ class AshProtocol(asyncio.Protocol):
                         )
 
                         # For timing purposes, NAK can be treated as an ACK
-                        delta = time.monotonic() - send_time
-                        self._change_ack_timeout((7 / 8) * self._t_rx_ack + 0.5 * delta)
+                        if attempt == 0:
+                            self._update_rtt_estimator(
+                                max(0.0, time.monotonic() - send_time - tx_time)
+                            )
+
+                        self._reduce_tx_window()
 
                         if attempt >= ACK_TIMEOUTS - 1:
                             self._enter_failed_state(
@@ -672,13 +1161,15 @@ class AshProtocol(asyncio.Protocol):
                     except asyncio.TimeoutError:
                         _LOGGER.debug(
                             "No ACK received in %0.2fs (attempt %d) for %r",
-                            self._t_rx_ack,
+                            self._t_rx_ack + tx_time,
                             attempt + 1,
                             frame,
                         )
                         # If a DATA frame acknowledgement is not received within the
                         # current timeout value, then t_rx_ack is doubled.
+                        self.stats.ack_timeouts += 1
                         self._change_ack_timeout(2 * self._t_rx_ack)
+                        self._reduce_tx_window()
 
                         if attempt >= ACK_TIMEOUTS - 1:
                             self._enter_failed_state(
@@ -686,11 +1177,14 @@ class AshProtocol(asyncio.Protocol):
                             )
                             raise
                     else:
-                        # Whenever an acknowledgement is received, t_rx_ack is set to
-                        # 7/8 of its current value plus 1/2 of the measured time for the
-                        # acknowledgement.
-                        delta = time.monotonic() - send_time
-                        self._change_ack_timeout((7 / 8) * self._t_rx_ack + 0.5 * delta)
+                        # Samples from retransmitted frames are ambiguous, it is not
+                        # known which transmission is being acknowledged (Karn's
+                        # algorithm). The backed off timeout is kept until a new
+                        # sample is taken.
+                        if attempt == 0:
+                            self._update_rtt_estimator(
+                                max(0.0, time.monotonic() - send_time - tx_time)
+                            )
 
                         break
             finally:
@@ -709,4 +1203,6 @@ class AshProtocol(asyncio.Protocol):
         )
 
     def send_reset(self) -> None:
-        self._write_frame(RstFrame(), prefix=(Reserved.CANCEL,))
+        # The NCP's flow control state does not survive a reset
+        self._resume_transmission()
+        self._write_frame(RstFrame(), prefix=(Reserved.CANCEL,), flush=True)
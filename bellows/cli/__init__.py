@@ -1,2 +0,0 @@
-# flake8: noqa
-from . import application, backup, dump, ncp, network, stream, tone
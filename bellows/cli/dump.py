@@ -73,28 +73,27 @@ async def _dump(ctx, channel, outfile):
     done_event = asyncio.Event()
 
     def cb(frame_name, response):
-        if frame_name == "mfglibRxHandler":
-            data = response[2]
+        data = response[2]
 
-            # Later releases of EmberZNet incorrectly use a static FCS
-            fcs = data[-2:]
-            if s.ezsp_version >= 8:
-                computed_fcs = ieee_15_4_fcs(data[0:-2])
-                LOGGER.debug("Fixing FCS (expected %s, got %s)", computed_fcs, fcs)
-                data = data[0:-2] + computed_fcs
+        # Later releases of EmberZNet incorrectly use a static FCS
+        fcs = data[-2:]
+        if s.ezsp_version >= 8:
+            computed_fcs = ieee_15_4_fcs(data[0:-2])
+            LOGGER.debug("Fixing FCS (expected %s, got %s)", computed_fcs, fcs)
+            data = data[0:-2] + computed_fcs
 
-            ts = time.time()
-            ts_sec = int(ts)
-            ts_usec = int((ts - ts_sec) * 1000000)
-            hdr = pure_pcapy.Pkthdr(ts_sec, ts_usec, len(data), len(data))
+        ts = time.time()
+        ts_sec = int(ts)
+        ts_usec = int((ts - ts_sec) * 1000000)
+        hdr = pure_pcapy.Pkthdr(ts_sec, ts_usec, len(data), len(data))
 
-            try:
-                pcap.dump(hdr, bytes(data))
-            except BrokenPipeError:
-                done_event.set()
+        try:
+            pcap.dump(hdr, bytes(data))
+        except BrokenPipeError:
+            done_event.set()
 
-            ctx.obj["captured"] += 1
+        ctx.obj["captured"] += 1
 
-    s.add_callback(cb)
+    s.add_callback(cb, ["mfglibRxHandler"])
 
     await done_event.wait()
@@ -1,3 +1,4 @@
+import importlib
 import logging
 
 import click
@@ -5,8 +6,42 @@ import click_log
 
 from . import opts
 
+# Modules defining each subcommand, only imported when the subcommand is used
+COMMAND_MODULES = {
+    "backup": "backup",
+    "bootloader": "ncp",
+    "config": "ncp",
+    "devices": "application",
+    "dump": "dump",
+    "form": "application",
+    "info": "ncp",
+    "join": "network",
+    "leave": "network",
+    "permit": "application",
+    "permit-with-key": "application",
+    "restore": "backup",
+    "scan": "network",
+    "stream": "stream",
+    "telemetry": "ncp",
+    "tone": "tone",
+    "zcl": "application",
+    "zdo": "application",
+}
 
-@click.group()
+
+class LazyGroup(click.Group):
+    def list_commands(self, ctx):
+        return sorted({*self.commands, *COMMAND_MODULES})
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in COMMAND_MODULES:
+            module = importlib.import_module(f"bellows.cli.{COMMAND_MODULES[cmd_name]}")
+            self.add_command(getattr(module, cmd_name.replace("-", "_")), cmd_name)
+
+        return super().get_command(ctx, cmd_name)
+
+
+@click.group(cls=LazyGroup)
 @click_log.simple_verbosity_option(logging.getLogger(), default="WARNING")
 @opts.device
 @opts.baudrate
@@ -1,3 +1,5 @@
+import asyncio
+
 import click
 
 import bellows.types as t
@@ -89,6 +91,40 @@ async def info(ctx):
     s.close()
 
 
+@main.command()
+@click.option("-t", "--time", "duration", default=60, help="Seconds to listen for")
+@click.pass_context
+@util.background
+async def telemetry(ctx, duration):
+    """Show the EZSP traffic of each frame"""
+    s = await util.setup(ctx.obj["device"], ctx.obj["baudrate"])
+    await util.network_init(s)
+    await asyncio.sleep(duration)
+
+    frames = sorted(
+        s.statistics.frames.items(),
+        key=lambda item: item[1].tx_bytes + item[1].rx_bytes,
+        reverse=True,
+    )
+
+    click.echo(
+        f"{'Frame':<36} {'TX':>7} {'TX bytes':>9} {'RX':>7} {'RX bytes':>9}"
+        f" {'Timeouts':>8} {'Invalid':>7} {'Queued ms':>9} {'p99 ms':>7}"
+    )
+
+    for name, stats in frames:
+        p99 = (
+            f"{1000 * stats.latency.quantile(0.99):.0f}" if stats.latency.total else ""
+        )
+        click.echo(
+            f"{name:<36} {stats.tx_count:>7} {stats.tx_bytes:>9} {stats.rx_count:>7}"
+            f" {stats.rx_bytes:>9} {stats.timeouts:>8} {stats.invalid_commands:>7}"
+            f" {1000 * stats.queue_time:>9.0f} {p99:>7}"
+        )
+
+    s.close()
+
+
 @main.command()
 @click.pass_context
 @util.background
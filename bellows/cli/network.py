@@ -25,8 +25,7 @@ async def join(ctx, channels, pan_id, extended_pan_id):
     """Join an existing ZigBee network as an end device"""
 
     def cb(fut, frame_name, response):
-        if frame_name == "stackStatusHandler":
-            fut.set_result(response)
+        fut.set_result(response)
 
     s = await util.setup(ctx.obj["device"], ctx.obj["baudrate"])
 
@@ -98,7 +97,7 @@ async def join(ctx, channels, pan_id, extended_pan_id):
     click.echo(parameters)
 
     fut = asyncio.Future()
-    cbid = s.add_callback(functools.partial(cb, fut))
+    cbid = s.add_callback(functools.partial(cb, fut), ["stackStatusHandler"])
     v = await s.joinNetwork(t.EmberNodeType.END_DEVICE, parameters)
     util.check(v[0], f"Joining network failed: {v[0]}")
     v = await fut
@@ -15,6 +15,7 @@ from zigpy.config import (  # noqa: F401 pylint: disable=unused-import
     CONF_NWK_TC_LINK_KEY,
     CONF_NWK_UPDATE_ID,
     CONFIG_SCHEMA,
+    SCHEMA_DEVICE,
     cv_boolean,
 )
 
@@ -22,15 +23,53 @@ CONF_USE_THREAD = "use_thread"
 CONF_EZSP_CONFIG = "ezsp_config"
 CONF_EZSP_POLICIES = "ezsp_policies"
 CONF_PARAM_MAX_WATCHDOG_FAILURES = "max_watchdog_failures"
+CONF_ASH_TX_WINDOW = "ash_tx_window"
+CONF_ASH_ACK_DELAY = "ash_ack_delay"
+CONF_SERIAL_READER_THREAD = "serial_reader_thread"
+CONF_DECODE_IN_THREAD = "decode_in_thread"
+CONF_IO_PROCESS = "io_process"
+CONF_EZSP_MAX_CONCURRENCY = "ezsp_max_concurrency"
+CONF_WARM_START_PROFILE = "warm_start_profile"
+CONF_EZSP_ADAPTIVE_TIMEOUTS = "ezsp_adaptive_timeouts"
+CONF_EZSP_COMMAND_TIMEOUTS = "ezsp_command_timeouts"
+CONF_EZSP_CALLBACK_POLLING = "ezsp_callback_polling"
+CONF_EZSP_CALLBACK_POLL_INTERVAL = "ezsp_callback_poll_interval"
+
+SCHEMA_DEVICE = SCHEMA_DEVICE.extend(
+    {
+        vol.Optional(CONF_ASH_TX_WINDOW, default=1): vol.All(
+            int, vol.Range(min=1, max=7)
+        ),
+        vol.Optional(CONF_ASH_ACK_DELAY, default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=0.2)
+        ),
+        vol.Optional(CONF_SERIAL_READER_THREAD, default=False): cv_boolean,
+        vol.Optional(CONF_DECODE_IN_THREAD, default=False): cv_boolean,
+        vol.Optional(CONF_IO_PROCESS, default=False): cv_boolean,
+        vol.Optional(CONF_EZSP_MAX_CONCURRENCY, default=1): vol.All(
+            int, vol.Range(min=1, max=16)
+        ),
+        vol.Optional(CONF_EZSP_ADAPTIVE_TIMEOUTS, default=True): cv_boolean,
+        vol.Optional(CONF_EZSP_COMMAND_TIMEOUTS, default={}): vol.Schema(
+            {str: vol.All(vol.Coerce(float), vol.Range(min=0.1))}
+        ),
+        vol.Optional(CONF_EZSP_CALLBACK_POLLING, default=False): cv_boolean,
+        vol.Optional(CONF_EZSP_CALLBACK_POLL_INTERVAL, default=0.05): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=1)
+        ),
+    }
+)
 
 CONFIG_SCHEMA = CONFIG_SCHEMA.extend(
     {
+        vol.Required(CONF_DEVICE): SCHEMA_DEVICE,
         vol.Optional(CONF_PARAM_MAX_WATCHDOG_FAILURES, default=4): int,
         vol.Optional(CONF_EZSP_CONFIG, default={}): dict,
         vol.Optional(CONF_EZSP_POLICIES, default={}): vol.Schema(
             {vol.Optional(str): int}
         ),
         vol.Optional(CONF_USE_THREAD, default=True): cv_boolean,
+        vol.Optional(CONF_WARM_START_PROFILE, default=None): vol.Maybe(str),
     }
 )
 
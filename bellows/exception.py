@@ -6,7 +6,9 @@ class EzspError(APIException):
 
 
 class InvalidCommandError(EzspError):
-    pass
+    def __init__(self, *args, status=None) -> None:
+        super().__init__(*args)
+        self.status = status
 
 
 class ControllerError(ControllerException):
@@ -7,9 +7,10 @@ import collections
 import contextlib
 import dataclasses
 import functools
+import importlib
 import logging
 import sys
-from typing import Any, Callable, Generator
+from typing import Any, Callable, Generator, Iterable, Iterator, Mapping
 import urllib.parse
 
 if sys.version_info[:2] < (3, 11):
@@ -21,13 +22,19 @@ import zigpy.config
 
 import bellows.config as conf
 from bellows.exception import EzspError, InvalidCommandError
+from bellows.ezsp.cache import ResponseCache
 from bellows.ezsp.config import DEFAULT_CONFIG, RuntimeConfig, ValueConfig
+from bellows.ezsp.latency import CommandLatency
+from bellows.ezsp.polling import POLL_INTERVAL, CallbackPoller
+from bellows.ezsp.profile import NcpProfile, NcpProfileStore
+from bellows.ezsp.protocol import MAX_COMMAND_CONCURRENCY, ProtocolHandler
+from bellows.ezsp.telemetry import EzspStatistics
 import bellows.types as t
 import bellows.uart
 
-from . import v4, v5, v6, v7, v8, v9, v10, v11, v12, v13, v14
+from . import v4
 
-EZSP_LATEST = v14.EZSPv14.VERSION
+EZSP_LATEST = 14
 LOGGER = logging.getLogger(__name__)
 MTOR_MIN_INTERVAL = 60
 MTOR_MAX_INTERVAL = 3600
@@ -40,40 +47,80 @@ NETWORK_OPS_TIMEOUT = 10
 NETWORK_COORDINATOR_STARTUP_RESET_WAIT = 1
 
 
+class _ProtocolHandlers(Mapping[int, type[ProtocolHandler]]):
+    """Protocol handler classes by EZSP version, imported when first used."""
+
+    def __init__(self, versions: Iterable[int]) -> None:
+        self._versions = tuple(versions)
+        self._handlers: dict[int, type[ProtocolHandler]] = {}
+
+    def __getitem__(self, version: int) -> type[ProtocolHandler]:
+        try:
+            return self._handlers[version]
+        except KeyError:
+            pass
+
+        if version not in self._versions:
+            raise KeyError(version)
+
+        module = importlib.import_module(f"{__name__}.v{version}")
+        handler = self._handlers[version] = getattr(module, f"EZSPv{version}")
+
+        return handler
+
+    def __contains__(self, version: object) -> bool:
+        return version in self._versions
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._versions)
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+
 class EZSP:
-    _BY_VERSION = {
-        v4.EZSPv4.VERSION: v4.EZSPv4,
-        v5.EZSPv5.VERSION: v5.EZSPv5,
-        v6.EZSPv6.VERSION: v6.EZSPv6,
-        v7.EZSPv7.VERSION: v7.EZSPv7,
-        v8.EZSPv8.VERSION: v8.EZSPv8,
-        v9.EZSPv9.VERSION: v9.EZSPv9,
-        v10.EZSPv10.VERSION: v10.EZSPv10,
-        v11.EZSPv11.VERSION: v11.EZSPv11,
-        v12.EZSPv12.VERSION: v12.EZSPv12,
-        v13.EZSPv13.VERSION: v13.EZSPv13,
-        v14.EZSPv14.VERSION: v14.EZSPv14,
-    }
-
-    def __init__(self, device_config: dict):
+    _BY_VERSION = _ProtocolHandlers(range(v4.EZSPv4.VERSION, EZSP_LATEST + 1))
+
+    def __init__(
+        self, device_config: dict, profile_store: NcpProfileStore | None = None
+    ):
         self._config = device_config
+        self._profile_store = profile_store
+        self._profile: NcpProfile | None = None
         self._callbacks = {}
+        self._callback_frames: dict[int, frozenset[str] | None] = {}
+        self._callbacks_by_frame: dict[str, tuple[Callable, ...]] = {}
+        self._subscribed_frames: frozenset[str] | None = frozenset()
         self._ezsp_event = asyncio.Event()
         self._ezsp_version = v4.EZSPv4.VERSION
         self._gw = None
+        self._cached_commands: set[str] = set()
         self._protocol = None
+        self.response_cache = ResponseCache()
+        self.command_latency = CommandLatency(
+            overrides=self._config.get(conf.CONF_EZSP_COMMAND_TIMEOUTS),
+            adaptive=self._config.get(conf.CONF_EZSP_ADAPTIVE_TIMEOUTS, True),
+        )
+        self.statistics = EzspStatistics()
+        self._callback_poller = (
+            CallbackPoller(
+                self,
+                poll_interval=self._config.get(
+                    conf.CONF_EZSP_CALLBACK_POLL_INTERVAL, POLL_INTERVAL
+                ),
+            )
+            if self._config.get(conf.CONF_EZSP_CALLBACK_POLLING, False)
+            else None
+        )
 
         self._stack_status_listeners: collections.defaultdict[
             t.sl_Status, list[asyncio.Future]
         ] = collections.defaultdict(list)
 
-        self.add_callback(self.stack_status_callback)
+        self.add_callback(self.stack_status_callback, ["stackStatusHandler"])
 
     def stack_status_callback(self, frame_name: str, args: list[Any]) -> None:
         """Callback for `stackStatusHandler` messages."""
-        if frame_name != "stackStatusHandler":
-            return
-
         status = t.sl_Status.from_ember_status(args[0])
 
         for listener in self._stack_status_listeners[status]:
@@ -139,7 +186,15 @@ class EZSP:
     async def connect(self, *, use_thread: bool = True) -> None:
         assert self._gw is None
         self._gw = await bellows.uart.connect(self._config, self, use_thread=use_thread)
-        self._protocol = v4.EZSPv4(self.handle_callback, self._gw)
+        self._protocol = v4.EZSPv4(
+            self.handle_callback,
+            self._gw,
+            max_concurrency=self._max_command_concurrency,
+            has_callbacks=self.has_callbacks,
+            response_cache=self.response_cache,
+            command_latency=self.command_latency,
+            statistics=self.statistics,
+        )
 
     async def reset(self):
         LOGGER.debug("Resetting EZSP")
@@ -153,6 +208,7 @@ class EZSP:
     def _switch_protocol_version(self, version: int) -> None:
         LOGGER.debug("Switching to EZSP protocol version %d", version)
         self._ezsp_version = version
+        self.response_cache.clear()
 
         if version not in self._BY_VERSION:
             LOGGER.warning(
@@ -163,15 +219,61 @@ class EZSP:
             # We replace the protocol object but keep the version correct
             version = EZSP_LATEST
 
-        self._protocol = self._BY_VERSION[version](self.handle_callback, self._gw)
+        self._protocol = self._BY_VERSION[version](
+            self.handle_callback,
+            self._gw,
+            max_concurrency=self._max_command_concurrency,
+            has_callbacks=self.has_callbacks,
+            response_cache=self.response_cache,
+            command_latency=self.command_latency,
+            statistics=self.statistics,
+        )
+
+    @property
+    def _protocol(self) -> ProtocolHandler | None:
+        return self._protocol_handler
+
+    @_protocol.setter
+    def _protocol(self, protocol: ProtocolHandler | None) -> None:
+        # Commands are looked up again on the new protocol version
+        for name in self._cached_commands:
+            self.__dict__.pop(name, None)
+
+        self._cached_commands.clear()
+        self._protocol_handler = protocol
+
+    @property
+    def _max_command_concurrency(self) -> int:
+        return self._config.get(conf.CONF_EZSP_MAX_CONCURRENCY, MAX_COMMAND_CONCURRENCY)
 
     async def version(self):
+        desired_version = self.ezsp_version
+        profile = None
+
+        # Request the protocol version previously negotiated with the NCP right away
+        if self._profile_store is not None and desired_version == v4.EZSPv4.VERSION:
+            profile = await self._profile_store.get(self._config[conf.CONF_DEVICE_PATH])
+
+            if profile is not None:
+                desired_version = profile.protocol_version
+
         ver, stack_type, stack_version = await self._command(
-            "version", desiredProtocolVersion=self.ezsp_version
+            "version", desiredProtocolVersion=desired_version
         )
+
+        # Upgraded firmware can still accept the stored version, negotiate it again
+        if profile is not None and profile.stack_version != stack_version:
+            LOGGER.debug("NCP firmware has changed, negotiating the protocol version")
+            desired_version = self.ezsp_version
+            ver, stack_type, stack_version = await self._command(
+                "version", desiredProtocolVersion=desired_version
+            )
+
         if ver != self.ezsp_version:
             self._switch_protocol_version(ver)
-            await self._command("version", desiredProtocolVersion=ver)
+
+            if ver != desired_version:
+                await self._command("version", desiredProtocolVersion=ver)
         LOGGER.debug(
             "EZSP Stack Type: %s, Stack Version: %04x, Protocol version: %s",
             stack_type,
@@ -179,12 +281,44 @@ class EZSP:
             ver,
         )
 
+        if self._profile_store is not None:
+            await self._load_profile(ver, stack_version)
+
+    async def _load_profile(self, protocol_version: int, stack_version: int) -> None:
+        """Load the profile of the NCP, if it is for the same device and firmware."""
+        (ieee,) = await self.getEui64()
+        profile = await self._profile_store.get(self._config[conf.CONF_DEVICE_PATH])
+
+        if profile is not None and profile.matches(str(ieee), stack_version):
+            LOGGER.debug("Using the stored profile of NCP %s", ieee)
+            profile.protocol_version = protocol_version
+        else:
+            profile = NcpProfile(
+                ieee=str(ieee),
+                stack_version=stack_version,
+                protocol_version=protocol_version,
+            )
+
+        self._profile = profile
+
+    async def _save_profile(self) -> None:
+        if self._profile_store is None or self._profile is None:
+            return
+
+        await self._profile_store.save(
+            self._config[conf.CONF_DEVICE_PATH], self._profile
+        )
+
     def close(self):
         self.stop_ezsp()
         if self._gw:
             self._gw.close()
             self._gw = None
 
+    async def get_ash_statistics(self) -> dict[str, int]:
+        """Statistics of the serial link with the NCP."""
+        return await self._gw.get_ash_statistics()
+
     async def _command(self, name: str, *args: Any, **kwargs: Any) -> Any:
         command = getattr(self._protocol, name)
 
@@ -207,12 +341,12 @@ class EZSP:
         results = []
 
         def cb(frame_name, response):
-            if frame_name in item_frames:
-                results.append(response)
-            elif frame_name == completion_frame:
+            if frame_name == completion_frame:
                 fut.set_result(response)
+            else:
+                results.append(response)
 
-        cbid = self.add_callback(cb)
+        cbid = self.add_callback(cb, [*item_frames, completion_frame])
         try:
             v = await self._command(name, *args, **kwargs)
             if t.sl_Status.from_ember_status(v[0]) != t.sl_Status.OK:
@@ -273,7 +407,9 @@ class EZSP:
 
     def enter_failed_state(self, error):
         """UART received error frame."""
-        if len(self._callbacks) > 1:
+        self.response_cache.clear()
+
+        if self.has_callbacks("_reset_controller_application"):
             LOGGER.error("NCP entered failed state. Requesting APP controller restart")
             self.close()
             self.handle_callback("_reset_controller_application", (error,))
@@ -286,7 +422,11 @@ class EZSP:
         if name not in self._protocol.COMMANDS:
             return getattr(self._protocol, name)
 
-        return functools.partial(self._command, name)
+        # Stored as an instance attribute, later lookups don't reach `__getattr__`
+        command = self.__dict__[name] = functools.partial(self._command, name)
+        self._cached_commands.add(name)
+
+        return command
 
     async def formNetwork(self, parameters: t.EmberNetworkParameters) -> None:
         with self.wait_for_stack_status(t.sl_Status.NETWORK_UP) as stack_status:
@@ -319,11 +459,60 @@ class EZSP:
         except Exception:
             LOGGER.warning("Failed to parse frame, ignoring")
 
+    def decode_frame(
+        self, data: bytes
+    ) -> tuple[ProtocolHandler | None, tuple[int, int, str, Any] | None]:
+        """Decode a received EZSP frame, called from the serial thread.
+
+        The protocol handler used for decoding is returned alongside the decoded
+        frame, the frame is decoded again if the protocol version has changed by the
+        time it is dispatched.
+        """
+        protocol = self._protocol
+
+        if protocol is None or not data:
+            return protocol, None
+
+        try:
+            return protocol, protocol.decode_frame(data)
+        except Exception:
+            LOGGER.warning("Failed to parse frame, ignoring")
+            return protocol, None
+
+    def frame_decoded(
+        self,
+        data: bytes,
+        decoded: tuple[ProtocolHandler | None, tuple[int, int, str, Any] | None],
+    ) -> None:
+        """Handle an EZSP frame decoded by `decode_frame`."""
+        protocol, frame = decoded
+
+        if protocol is not self._protocol:
+            self.frame_received(data)
+        elif frame is not None:
+            try:
+                protocol.frame_decoded(*frame)
+            except Exception:
+                LOGGER.warning("Failed to parse frame, ignoring")
+
     async def get_board_info(
         self,
     ) -> tuple[str, str, str | None] | tuple[None, None, str | None]:
         """Return board info."""
+        if self._profile is not None and self._profile.board_info is not None:
+            return tuple(self._profile.board_info)
+
+        board_info = await self._read_board_info()
+
+        if self._profile is not None:
+            self._profile.board_info = list(board_info)
+            await self._save_profile()
+
+        return board_info
 
+    async def _read_board_info(
+        self,
+    ) -> tuple[str, str, str | None] | tuple[None, None, str | None]:
         tokens = {}
 
         for token in (t.EzspMfgTokenId.MFG_STRING, t.EzspMfgTokenId.MFG_BOARD_NAME):
@@ -366,6 +555,21 @@ class EZSP:
 
     async def _get_nv3_restored_eui64_key(self) -> t.NV3KeyId | None:
         """Get the NV3 key for the device's restored EUI64, if one exists."""
+        capabilities = None if self._profile is None else self._profile.capabilities
+
+        if capabilities is not None and "nv3_restored_eui64_key" in capabilities:
+            key = capabilities["nv3_restored_eui64_key"]
+            return None if key is None else t.NV3KeyId[key]
+
+        key = await self._probe_nv3_restored_eui64_key()
+
+        if capabilities is not None:
+            capabilities["nv3_restored_eui64_key"] = None if key is None else key.name
+            await self._save_profile()
+
+        return key
+
+    async def _probe_nv3_restored_eui64_key(self) -> t.NV3KeyId | None:
         for key in (
             t.NV3KeyId.CREATOR_STACK_RESTORED_EUI64,  # NCP firmware
             t.NV3KeyId.NVM3KEY_STACK_RESTORED_EUI64,  # RCP firmware
@@ -468,20 +672,66 @@ class EZSP:
                 f" cannot be written again without erasing flash."
             )
 
-    def add_callback(self, cb):
+    def add_callback(self, cb, frame_names: Iterable[str] | None = None):
+        """Subscribe to the named callback frames, or to all frames if omitted."""
         id_ = hash(cb)
         while id_ in self._callbacks:
             id_ += 1
         self._callbacks[id_] = cb
+        self._callback_frames[id_] = (
+            None if frame_names is None else frozenset(frame_names)
+        )
+        self._subscriptions_changed()
         return id_
 
     def remove_callback(self, id_):
-        return self._callbacks.pop(id_)
+        cb = self._callbacks.pop(id_)
+        del self._callback_frames[id_]
+        self._subscriptions_changed()
+        return cb
+
+    def _subscriptions_changed(self) -> None:
+        self._callbacks_by_frame.clear()
+
+        # Replaced, not modified, since it is read from the serial thread
+        if any(names is None for names in self._callback_frames.values()):
+            self._subscribed_frames = None
+        else:
+            self._subscribed_frames = frozenset().union(*self._callback_frames.values())
 
-    def handle_callback(self, *args):
-        for _callback_id, handler in self._callbacks.items():
+    def _get_callbacks(self, frame_name: str) -> tuple[Callable, ...]:
+        """Callbacks subscribed to a frame, in the order they were added."""
+        try:
+            return self._callbacks_by_frame[frame_name]
+        except KeyError:
+            pass
+
+        callbacks = self._callbacks_by_frame[frame_name] = tuple(
+            cb
+            for id_, cb in self._callbacks.items()
+            if self._callback_frames[id_] is None
+            or frame_name in self._callback_frames[id_]
+        )
+
+        return callbacks
+
+    def has_callbacks(self, frame_name: str) -> bool:
+        """Check if any callback is subscribed to a frame, from any thread."""
+        subscribed = self._subscribed_frames
+        return subscribed is None or frame_name in subscribed
+
+    def host_ready_changed(self, ready: bool) -> None:
+        """Received frames have started or stopped backing up."""
+        if self._callback_poller is not None:
+            self._callback_poller.set_host_ready(ready)
+
+    def handle_callback(self, frame_name, *args):
+        if self._callback_poller is not None:
+            self._callback_poller.callback_received()
+
+        for handler in self._get_callbacks(frame_name):
             try:
-                handler(*args)
+                handler(frame_name, *args)
             except Exception as e:
                 LOGGER.exception("Exception running handler", exc_info=e)
 
@@ -511,6 +761,9 @@ class EZSP:
         """Mark EZSP stopped."""
         self._ezsp_event.clear()
 
+        if self._callback_poller is not None:
+            self._callback_poller.stop()
+
     @property
     def is_ezsp_running(self):
         """Return True if EZSP is running."""
@@ -567,12 +820,14 @@ class EZSP:
         # First, set the values
         for cfg in ezsp_values.values():
             # XXX: A read failure does not mean the value is not writeable!
-            status, current_value = await self.getValue(valueId=cfg.value_id)
+            current_value = await self._read_initial_value(cfg.value_id)
 
-            if t.sl_Status.from_ember_status(status) == t.sl_Status.OK:
+            if current_value is not None:
                 current_value, _ = type(cfg.value).deserialize(current_value)
-            else:
-                current_value = None
+
+            if self._profile is not None and current_value == cfg.value:
+                LOGGER.debug("Value %s is already %s", cfg.value_id.name, cfg.value)
+                continue
 
             LOGGER.debug(
                 "Setting value %s = %s (old value %s)",
@@ -596,16 +851,14 @@ class EZSP:
 
         # Finally, set the config
         for cfg in ezsp_config.values():
-            (status, current_value) = await self.getConfigurationValue(
-                configId=cfg.config_id
-            )
+            current_value = await self._read_initial_config(cfg.config_id)
+
+            if self._profile is not None and current_value == cfg.value:
+                LOGGER.debug("Config %s is already %s", cfg.config_id.name, cfg.value)
+                continue
 
             # Only grow some config entries, all others should be set
-            if (
-                t.sl_Status.from_ember_status(status) == t.sl_Status.OK
-                and cfg.minimum
-                and current_value >= cfg.value
-            ):
+            if current_value is not None and cfg.minimum and current_value >= cfg.value:
                 LOGGER.debug(
                     "Current config %s = %s exceeds the default of %s, skipping",
                     cfg.config_id.name,
@@ -632,3 +885,40 @@ class EZSP:
                     status,
                 )
                 continue
+
+        await self._save_profile()
+
+    async def _read_initial_value(self, value_id: t.EzspValueId) -> bytes | None:
+        """Read a value as it is after a reset, from the profile if it is known."""
+        profile = self._profile
+
+        if profile is not None and value_id.name in profile.values:
+            value = profile.values[value_id.name]
+            return None if value is None else bytes.fromhex(value)
+
+        status, value = await self.getValue(valueId=value_id)
+
+        if t.sl_Status.from_ember_status(status) != t.sl_Status.OK:
+            value = None
+
+        if profile is not None:
+            profile.values[value_id.name] = None if value is None else value.hex()
+
+        return value
+
+    async def _read_initial_config(self, config_id: t.EzspConfigId) -> int | None:
+        """Read a config entry as it is after a reset, from the profile if known."""
+        profile = self._profile
+
+        if profile is not None and config_id.name in profile.config:
+            return profile.config[config_id.name]
+
+        status, value = await self.getConfigurationValue(configId=config_id)
+
+        if t.sl_Status.from_ember_status(status) != t.sl_Status.OK:
+            value = None
+
+        if profile is not None:
+            profile.config[config_id.name] = None if value is None else int(value)
+
+        return value
@@ -0,0 +1,138 @@
+"""Cache of responses to EZSP commands that do not change while the NCP runs."""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+from typing import Any
+
+from bellows.ezsp.codec import CommandCodec
+import bellows.types as t
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedCommand:
+    """A command whose response only changes when the NCP is reset."""
+
+    # Only cache responses for these values of the first parameter, or all if `None`
+    keys: frozenset | None = None
+
+    # Commands that change the response
+    invalidated_by: frozenset[str] = frozenset()
+
+
+CACHED_COMMANDS: dict[str, CachedCommand] = {
+    "getEui64": CachedCommand(),
+    "getMfgToken": CachedCommand(invalidated_by=frozenset({"setMfgToken"})),
+    "getValue": CachedCommand(
+        keys=frozenset({t.EzspValueId.VALUE_VERSION_INFO}),
+        invalidated_by=frozenset({"setValue"}),
+    ),
+    "getConfigurationValue": CachedCommand(
+        keys=frozenset(
+            {
+                t.EzspConfigId.CONFIG_ADDRESS_TABLE_SIZE,
+                t.EzspConfigId.CONFIG_KEY_TABLE_SIZE,
+                t.EzspConfigId.CONFIG_MULTICAST_TABLE_SIZE,
+            }
+        ),
+        invalidated_by=frozenset({"setConfigurationValue"}),
+    ),
+    "getTokenData": CachedCommand(invalidated_by=frozenset({"setTokenData"})),
+}
+
+# Commands that reset the NCP or erase its tokens
+RESETTING_COMMANDS = frozenset({"resetNode", "tokenFactoryReset"})
+
+
+class ResponseCache:
+    """Responses to the commands of `CACHED_COMMANDS`, until the NCP is reset."""
+
+    def __init__(self, commands: dict[str, CachedCommand] = CACHED_COMMANDS) -> None:
+        self._commands = commands
+        self._responses: dict[tuple[str, bytes], Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+        # Serialized first parameters of the cacheable responses
+        self._prefixes = {
+            name: None if cmd.keys is None else tuple(k.serialize() for k in cmd.keys)
+            for name, cmd in commands.items()
+        }
+
+        self._invalidates: dict[str, set[str]] = {}
+
+        for name, cmd in commands.items():
+            for other in cmd.invalidated_by:
+                self._invalidates.setdefault(other, set()).add(name)
+
+    def get_key(
+        self, name: str, codec: CommandCodec, args: tuple, kwargs: dict
+    ) -> tuple[str, bytes] | None:
+        """Key of a command's cached response, `None` if it cannot be cached."""
+        if name not in self._commands:
+            return None
+
+        payload = codec.encode(b"", *args, **kwargs)
+        prefixes = self._prefixes[name]
+
+        if prefixes is not None and not payload.startswith(prefixes):
+            return None
+
+        return name, payload
+
+    def get(self, key: tuple[str, bytes]) -> Any:
+        """Return a cached response, raising `KeyError` if there is none."""
+        try:
+            response = self._responses[key]
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        LOGGER.debug("Using cached response for %s: %s", key[0], response)
+
+        # Responses are mutable lists, do not hand out the cached one
+        return list(response) if isinstance(response, list) else response
+
+    def set(self, key: tuple[str, bytes], response: Any, codec: CommandCodec) -> None:
+        """Cache a response, unless its status is not a success."""
+        if codec.rx_fields is None:
+            status = getattr(response, "status", None)
+        elif codec.rx_fields[:1] == ("status",):
+            status = response[0]
+        else:
+            status = None
+
+        if (
+            status is not None
+            and t.sl_Status.from_ember_status(status) != t.sl_Status.OK
+        ):
+            return
+
+        self._responses[key] = (
+            list(response) if isinstance(response, list) else response
+        )
+
+    def command_sent(self, name: str) -> None:
+        """Drop cached responses that may be changed by a command."""
+        if name in RESETTING_COMMANDS:
+            self.clear()
+            return
+
+        invalidated = self._invalidates.get(name)
+
+        if invalidated is None:
+            return
+
+        for key in [key for key in self._responses if key[0] in invalidated]:
+            del self._responses[key]
+
+    def clear(self) -> None:
+        self._responses.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._responses)}
@@ -0,0 +1,211 @@
+"""Specialized encoders and decoders for EZSP command schemas.
+
+Every entry of a `COMMANDS` table is compiled into a pair of functions generated
+for its schemas. Runs of fixed size integer fields are packed and unpacked with a
+single precomputed `struct.Struct`, other fields fall back to their own serialization.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import enum
+import keyword
+import struct
+from typing import Any, Callable
+
+from zigpy.types import FixedIntType
+
+import bellows.types as t
+
+_STRUCT_CODES = {
+    (8, False): "B",
+    (16, False): "H",
+    (32, False): "I",
+    (64, False): "Q",
+    (8, True): "b",
+    (16, True): "h",
+    (32, True): "i",
+    (64, True): "q",
+}
+
+
+def _struct_code(type_: type) -> str | None:
+    """Struct format code of a type, if it can be (de)serialized by `struct`."""
+    if not isinstance(type_, type) or not issubclass(type_, FixedIntType):
+        return None
+
+    # Types with their own serialization cannot be compiled
+    if (
+        type_.serialize is not FixedIntType.serialize
+        or type_.deserialize.__func__ is not FixedIntType.deserialize.__func__
+        or type_._byteorder != "little"
+    ):
+        return None
+
+    return _STRUCT_CODES.get((type_._bits, bool(type_._signed)))
+
+
+def _convert(type_: type, var: str, namespace: dict[str, Any]) -> str:
+    """Expression converting an unpacked integer `var` into `type_`."""
+    name = f"_t_{var}"
+    namespace[name] = type_
+
+    if issubclass(type_, enum.Flag):
+        return f"{name}({var})"
+
+    if issubclass(type_, enum.Enum):
+        # Enum construction is slow, look up known members directly
+        namespace[f"_m_{var}"] = type_._value2member_map_
+        return f"(_m_{var}[{var}] if {var} in _m_{var} else {name}({var}))"
+
+    if type_.__new__ is FixedIntType.__new__:
+        # Unpacked values are always within range of the type
+        return f"_int_new({name}, {var})"
+
+    return f"{name}({var})"
+
+
+def _can_compile(schema: dict[str, type]) -> bool:
+    return all(
+        name.isidentifier() and not keyword.iskeyword(name) and not name.startswith("_")
+        for name in schema
+    )
+
+
+def _segments(schema: dict[str, type]) -> list[tuple[str | None, list[str]]]:
+    """Split a schema into runs of struct fields and individual other fields."""
+    segments: list[tuple[str | None, list[str]]] = []
+
+    for name, type_ in schema.items():
+        code = _struct_code(type_)
+
+        if code is not None and segments and segments[-1][0] is not None:
+            segments[-1] = (segments[-1][0] + code, segments[-1][1] + [name])
+        else:
+            segments.append((code, [name]))
+
+    return segments
+
+
+def _compile(source: str, namespace: dict[str, Any], name: str) -> Callable:
+    exec(source, namespace)  # noqa: S102
+    return namespace[name]
+
+
+def compile_encoder(schema: dict[str, type] | type) -> Callable[..., bytes]:
+    """Compile a function serializing `(prefix, *args, **kwargs)` for a schema."""
+    if not isinstance(schema, dict):
+
+        def encode(_prefix: bytes, *args: Any, **kwargs: Any) -> bytes:
+            return _prefix + schema(*args, **kwargs).serialize()
+
+        return encode
+
+    if not _can_compile(schema):
+
+        def encode(_prefix: bytes, *args: Any, **kwargs: Any) -> bytes:
+            return t.serialize_dict(args, kwargs, schema, prefix=_prefix)
+
+        return encode
+
+    namespace: dict[str, Any] = {}
+    types = {name: f"_t{index}" for index, name in enumerate(schema)}
+    convert = {
+        name: f"({name} if {name}.__class__ is {types[name]} else {types[name]}({name}))"
+        for name in schema
+    }
+    namespace.update({types[name]: type_ for name, type_ in schema.items()})
+    parts = ["_prefix"]
+
+    for index, (code, names) in enumerate(_segments(schema)):
+        if code is None:
+            parts.append(f"{types[names[0]]}({names[0]}).serialize()")
+        else:
+            namespace[f"_s{index}"] = struct.Struct("<" + code)
+            values = ", ".join(convert[name] for name in names)
+            parts.append(f"_s{index}.pack({values})")
+
+    if len(parts) == 1:
+        body = "_prefix"
+    elif len(parts) == 2:
+        body = " + ".join(parts)
+    else:
+        body = f"b''.join(({', '.join(parts)}))"
+
+    params = ", ".join(["_prefix", *schema])
+    source = f"def encode({params}):\n    return {body}\n"
+
+    return _compile(source, namespace, "encode")
+
+
+def compile_decoder(
+    schema: dict[str, type] | type,
+) -> Callable[[bytes], tuple[Any, bytes]]:
+    """Compile a function deserializing a schema into a list of values."""
+    if not isinstance(schema, dict):
+        return schema.deserialize
+
+    namespace: dict[str, Any] = {"_int_new": int.__new__}
+    types = [f"_t{index}" for index in range(len(schema))]
+    namespace.update(dict(zip(types, schema.values())))
+    lines = ["def decode(_data):"]
+    values = []
+    offset = 0
+
+    for index, (code, names) in enumerate(_segments(schema)):
+        field = len(values)
+
+        if code is None:
+            data = f"_data[{offset}:]" if offset else "_data"
+            lines.append(f"    _v{field}, _data = {types[field]}.deserialize({data})")
+            values.append(f"_v{field}")
+            offset = 0
+            continue
+
+        s = namespace[f"_s{index}"] = struct.Struct("<" + code)
+        unpacked = ", ".join(f"_v{field + i}" for i in range(len(names)))
+        lines.append(f"    if len(_data) < {offset + s.size}:")
+        lines.append(
+            f"        raise ValueError('Data is too short to contain"
+            f" {offset + s.size} bytes')"
+        )
+        lines.append(f"    {unpacked}, = _s{index}.unpack_from(_data, {offset})")
+        values.extend(
+            _convert(schema[name], f"_v{field + i}", namespace)
+            for i, name in enumerate(names)
+        )
+        offset += s.size
+
+    remaining = f"_data[{offset}:]" if offset else "_data"
+    lines.append(f"    return [{', '.join(values)}], {remaining}")
+
+    return _compile("\n".join(lines) + "\n", namespace, "decode")
+
+
+@dataclasses.dataclass(frozen=True)
+class CommandCodec:
+    """Compiled encoder and decoder of a single EZSP command."""
+
+    name: str
+    frame_id: int
+    encode: Callable[..., bytes]
+    decode: Callable[[bytes], tuple[Any, bytes]]
+
+    # Names of the decoded values, only for dict schemas
+    rx_fields: tuple[str, ...] | None
+
+    @classmethod
+    def compile(
+        cls,
+        name: str,
+        frame_id: int,
+        tx_schema: dict[str, type] | type,
+        rx_schema: dict[str, type] | type,
+    ) -> CommandCodec:
+        return cls(
+            name=name,
+            frame_id=frame_id,
+            encode=compile_encoder(tx_schema),
+            decode=compile_decoder(rx_schema),
+            rx_fields=tuple(rx_schema) if isinstance(rx_schema, dict) else None,
+        )
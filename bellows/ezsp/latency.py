@@ -0,0 +1,99 @@
+"""Response times of EZSP commands, used to derive per-command timeouts."""
+
+from __future__ import annotations
+
+import bisect
+import dataclasses
+
+# Upper bounds of the histogram buckets, in seconds. Responses slower than the last
+# bound are counted in an extra overflow bucket.
+BUCKET_BOUNDS: tuple[float, ...] = tuple(0.001 * 2**i for i in range(15))
+
+# Timeouts are only derived once a command has been timed this many times
+MIN_SAMPLES = 20
+
+# Old samples are aged out by halving every count once a histogram has this many
+MAX_SAMPLES = 1000
+
+TIMEOUT_QUANTILE = 0.99
+TIMEOUT_MULTIPLIER = 4
+
+# ASH retransmits an unacknowledged frame after up to 3.2s, derived timeouts leave
+# room for at least one retransmission
+MIN_TIMEOUT = 4.0
+
+
+@dataclasses.dataclass
+class LatencyHistogram:
+    """Fixed-bucket histogram of response times.
+
+    Old samples are aged out once there are `max_samples`, or never if `None`.
+    """
+
+    counts: list[int] = dataclasses.field(
+        default_factory=lambda: [0] * (len(BUCKET_BOUNDS) + 1)
+    )
+    total: int = 0
+    max_samples: int | None = MAX_SAMPLES
+
+    def add(self, latency: float) -> None:
+        if self.max_samples is not None and self.total >= self.max_samples:
+            self.counts = [count // 2 for count in self.counts]
+            self.total = sum(self.counts)
+
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, latency)] += 1
+        self.total += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the `q` quantile, `inf` if unbounded."""
+        rank = q * self.total
+        seen = 0
+
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            seen += count
+
+            if seen >= rank:
+                return bound
+
+        return float("inf")
+
+
+class CommandLatency:
+    """Response times of every command, and the timeouts derived from them.
+
+    A command's timeout is a multiple of its 99th percentile response time, no
+    shorter than `MIN_TIMEOUT` and no longer than the default timeout. Commands in
+    `overrides` always use the given timeout instead.
+    """
+
+    def __init__(
+        self, overrides: dict[str, float] | None = None, adaptive: bool = True
+    ) -> None:
+        self.overrides = dict(overrides or {})
+        self.adaptive = adaptive
+        self.histograms: dict[str, LatencyHistogram] = {}
+
+    def record(self, name: str, latency: float) -> None:
+        """Record the time a command took to get a response."""
+        try:
+            histogram = self.histograms[name]
+        except KeyError:
+            histogram = self.histograms[name] = LatencyHistogram()
+
+        histogram.add(latency)
+
+    def timeout(self, name: str, default: float) -> float:
+        """Time to wait for a response to a command."""
+        try:
+            return self.overrides[name]
+        except KeyError:
+            pass
+
+        histogram = self.histograms.get(name)
+
+        if not self.adaptive or histogram is None or histogram.total < MIN_SAMPLES:
+            return default
+
+        timeout = TIMEOUT_MULTIPLIER * histogram.quantile(TIMEOUT_QUANTILE)
+
+        return min(default, max(MIN_TIMEOUT, timeout))
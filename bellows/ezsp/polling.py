@@ -0,0 +1,141 @@
+"""Host-paced delivery of EZSP callbacks during callback floods."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from bellows.exception import EzspError
+import bellows.types as t
+
+if TYPE_CHECKING:
+    from bellows.ezsp import EZSP
+
+LOGGER = logging.getLogger(__name__)
+
+# Receiving this many asynchronous callbacks within the window starts polling
+FLOOD_THRESHOLD = 50
+FLOOD_WINDOW = 1.0
+
+# Callbacks polled before consumers get a chance to run
+BATCH_SIZE = 10
+
+# Time consumers get to run between batches, limiting the rate callbacks are polled at
+POLL_INTERVAL = 0.05
+
+
+class CallbackPoller:
+    """Polls the NCP for callbacks while they arrive faster than the host wants.
+
+    The NCP normally sends callbacks as soon as they occur. During a flood it is
+    switched to synchronous callbacks, which it holds until the host asks for one
+    with `callback`. Callbacks are then polled in batches, with pending tasks
+    running for `poll_interval` between batches, until the NCP has none left and is
+    switched back to asynchronous callbacks.
+
+    Polling pauses while received frames are waiting to be processed, the same
+    backlog that makes the host signal the NCP that it is not ready.
+    """
+
+    def __init__(
+        self,
+        ezsp: EZSP,
+        *,
+        threshold: int = FLOOD_THRESHOLD,
+        batch_size: int = BATCH_SIZE,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self._ezsp = ezsp
+        self._threshold = threshold
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._host_ready = asyncio.Event()
+        self._host_ready.set()
+        self._window_start = 0.0
+        self._window_count = 0
+        self._task: asyncio.Task | None = None
+        self._supported = True
+
+    @property
+    def polling(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def callback_received(self) -> None:
+        """Count a received callback, polling for the rest if there is a flood."""
+        if self.polling or not self._supported:
+            return
+
+        now = time.monotonic()
+
+        if now - self._window_start > FLOOD_WINDOW:
+            self._window_start = now
+            self._window_count = 0
+
+        self._window_count += 1
+
+        if self._window_count >= self._threshold:
+            self._window_count = 0
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    def set_host_ready(self, ready: bool) -> None:
+        """Pause polling while received frames are backlogged."""
+        if ready:
+            self._host_ready.set()
+        else:
+            self._host_ready.clear()
+
+    def stop(self) -> None:
+        """Stop polling, the NCP is reset or disconnected."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self._window_count = 0
+
+    async def _set_synchronous(self, enabled: bool) -> None:
+        (status,) = await self._ezsp.setValue(
+            valueId=t.EzspValueId.VALUE_UART_SYNCH_CALLBACKS,
+            value=t.uint8_t(enabled).serialize(),
+        )
+
+        if t.sl_Status.from_ember_status(status) != t.sl_Status.OK:
+            raise EzspError(f"Failed to set synchronous callbacks: {status!r}")
+
+    async def _poll(self) -> None:
+        LOGGER.debug("Callback flood, polling the NCP for callbacks")
+
+        try:
+            await self._set_synchronous(True)
+        except (asyncio.TimeoutError, EzspError) as exc:
+            LOGGER.warning("NCP does not support polling for callbacks: %r", exc)
+            self._supported = False
+            return
+
+        polled = 0
+
+        try:
+            while True:
+                if not self._host_ready.is_set():
+                    LOGGER.debug("Received frames are backlogged, pausing polling")
+                    await self._host_ready.wait()
+
+                if await self._ezsp.callback() == "noCallbacks":
+                    break
+
+                polled += 1
+
+                if polled % self._batch_size == 0:
+                    await asyncio.sleep(self._poll_interval)
+        except (asyncio.TimeoutError, EzspError) as exc:
+            LOGGER.warning("Failed to poll for callbacks: %r", exc)
+
+        LOGGER.debug("Polled %d callbacks, switching back to async callbacks", polled)
+
+        # If this fails the NCP is unresponsive and will be reset by the watchdog,
+        # which restores async callbacks
+        try:
+            await self._set_synchronous(False)
+        except (asyncio.TimeoutError, EzspError) as exc:
+            LOGGER.warning("Failed to switch back to async callbacks: %r", exc)
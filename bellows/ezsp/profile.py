@@ -0,0 +1,107 @@
+"""Persisted knowledge about an NCP, used to skip redundant startup work."""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+from typing import Any
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILE_FORMAT_VERSION = 1
+
+
+@dataclasses.dataclass
+class NcpProfile:
+    """What is known about an NCP running a specific firmware version.
+
+    Configuration and values are the ones the firmware has right after a reset,
+    before bellows writes its own, `None` if they could not be read. Values are
+    stored hex encoded.
+    """
+
+    ieee: str
+    stack_version: int
+    protocol_version: int
+    config: dict[str, int | None] = dataclasses.field(default_factory=dict)
+    values: dict[str, str | None] = dataclasses.field(default_factory=dict)
+    board_info: list[str | None] | None = None
+    capabilities: dict[str, Any] = dataclasses.field(default_factory=dict)
+
+    def matches(self, ieee: str, stack_version: int) -> bool:
+        return self.ieee == ieee and self.stack_version == stack_version
+
+    def copy(self) -> NcpProfile:
+        return NcpProfile(**json.loads(json.dumps(dataclasses.asdict(self))))
+
+
+class NcpProfileStore:
+    """JSON file of NCP profiles, keyed by device path."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._profiles: dict[str, NcpProfile] | None = None
+
+    def _load(self) -> dict[str, NcpProfile]:
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+
+            if data["format_version"] != PROFILE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported format: {data['format_version']}")
+
+            return {
+                device: NcpProfile(**profile)
+                for device, profile in data["profiles"].items()
+            }
+        except FileNotFoundError:
+            return {}
+        except Exception as exc:
+            LOGGER.warning("Ignoring invalid NCP profile file %s: %r", self._path, exc)
+            return {}
+
+    def _save(self, profiles: dict[str, NcpProfile]) -> None:
+        data = {
+            "format_version": PROFILE_FORMAT_VERSION,
+            "profiles": {
+                device: dataclasses.asdict(profile)
+                for device, profile in profiles.items()
+            },
+        }
+
+        tmp_path = f"{self._path}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+        os.replace(tmp_path, self._path)
+
+    async def get(self, device: str) -> NcpProfile | None:
+        """Return a copy of the profile of the NCP last seen on a device path."""
+        if self._profiles is None:
+            loop = asyncio.get_running_loop()
+            self._profiles = await loop.run_in_executor(None, self._load)
+
+        profile = self._profiles.get(device)
+
+        return None if profile is None else profile.copy()
+
+    async def save(self, device: str, profile: NcpProfile) -> None:
+        """Store the profile of the NCP on a device path, if it has changed."""
+        if self._profiles is None:
+            await self.get(device)
+
+        if self._profiles.get(device) == profile:
+            return
+
+        self._profiles[device] = profile.copy()
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._save, dict(self._profiles)
+            )
+        except OSError as exc:
+            LOGGER.warning("Failed to write NCP profile file %s: %r", self._path, exc)
@@ -3,6 +3,7 @@ from __future__ import annotations
 import abc
 import asyncio
 import binascii
+import dataclasses
 import functools
 import logging
 import sys
@@ -19,7 +20,11 @@ else:
 from zigpy.datastructures import PriorityDynamicBoundedSemaphore
 
 from bellows.config import CONF_EZSP_POLICIES
-from bellows.exception import InvalidCommandError
+from bellows.exception import EzspError, InvalidCommandError
+from bellows.ezsp.cache import ResponseCache
+from bellows.ezsp.codec import CommandCodec
+from bellows.ezsp.latency import CommandLatency
+from bellows.ezsp.telemetry import EzspStatistics
 import bellows.types as t
 
 if TYPE_CHECKING:
@@ -30,40 +35,105 @@ LOGGER = logging.getLogger(__name__)
 EZSP_CMD_TIMEOUT = 10
 MAX_COMMAND_CONCURRENCY = 1
 
+# Statuses of `invalidCommand` responses with which the NCP rejects a command sent
+# while others are still pending
+PIPELINING_REJECTED_STATUSES = frozenset(
+    {t.EzspStatus.ERROR_OUT_OF_MEMORY, t.EzspStatus.NO_RX_SPACE}
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class UndecodedFrame:
+    """Raw payload of a frame that was not decoded since nobody needed it."""
+
+    data: bytes
+
+
+def _command_method(name: str) -> Callable:
+    async def method(self, *args: Any, **kwargs: Any) -> Any:
+        return await self.command(name, *args, **kwargs)
+
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = f"Send the `{name}` command."
+
+    return method
+
+
+class _UnsupportedCommand:
+    """Hide a command inherited from a protocol version that no longer has it."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __get__(self, obj: Any, objtype: type | None = None) -> Any:
+        raise AttributeError(f"{self._name} not found in COMMANDS")
+
 
 class ProtocolHandler(abc.ABC):
     """EZSP protocol specific handler."""
 
     COMMANDS = {}
+    COMMANDS_BY_ID = {}
     VERSION = None
 
-    def __init__(self, cb_handler: Callable, gateway: Gateway) -> None:
+    _codecs: dict[str, CommandCodec] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+
+        cls.COMMANDS_BY_ID = {
+            cmd_id: (name, tx_schema, rx_schema)
+            for name, (cmd_id, tx_schema, rx_schema) in cls.COMMANDS.items()
+        }
+
+        # Codecs are compiled on first use, most commands are never sent
+        cls._codecs = {}
+
+        for name in cls.COMMANDS:
+            if name not in cls.__dict__:
+                setattr(cls, name, _command_method(name))
+
+        for base in cls.__mro__[1:]:
+            for name in getattr(base, "COMMANDS", {}):
+                if name not in cls.COMMANDS and name not in cls.__dict__:
+                    setattr(cls, name, _UnsupportedCommand(name))
+
+    def __init__(
+        self,
+        cb_handler: Callable,
+        gateway: Gateway,
+        max_concurrency: int = MAX_COMMAND_CONCURRENCY,
+        has_callbacks: Callable[[str], bool] | None = None,
+        response_cache: ResponseCache | None = None,
+        command_latency: CommandLatency | None = None,
+        statistics: EzspStatistics | None = None,
+    ) -> None:
         self._handle_callback = cb_handler
+        self._has_callbacks = has_callbacks
+        self._response_cache = response_cache
+        self._command_latency = command_latency
+        self._statistics = statistics
         self._awaiting = {}
         self._gw = gateway
         self._seq = 0
-        self.COMMANDS_BY_ID = {
-            cmd_id: (name, tx_schema, rx_schema)
-            for name, (cmd_id, tx_schema, rx_schema) in self.COMMANDS.items()
-        }
         self.tc_policy = 0
-        self._send_semaphore = PriorityDynamicBoundedSemaphore(
-            value=MAX_COMMAND_CONCURRENCY
-        )
+        self._send_semaphore = PriorityDynamicBoundedSemaphore(value=max_concurrency)
 
         # Cached by `set_extended_timeout` so subsequent calls are a little faster
         self._address_table_size: int | None = None
 
+    def _get_codec(self, name: str) -> CommandCodec:
+        try:
+            return self._codecs[name]
+        except KeyError:
+            pass
+
+        codec = self._codecs[name] = CommandCodec.compile(name, *self.COMMANDS[name])
+        return codec
+
     def _ezsp_frame(self, name: str, *args: Any, **kwargs: Any) -> bytes:
         """Serialize the named frame and data."""
-        c, tx_schema, rx_schema = self.COMMANDS[name]
-        frame = self._ezsp_frame_tx(name)
-
-        if isinstance(tx_schema, dict):
-            data = t.serialize_dict(args, kwargs, tx_schema)
-        else:
-            data = tx_schema(*args, **kwargs).serialize()
-        return frame + data
+        return self._get_codec(name).encode(self._ezsp_frame_tx(name), *args, **kwargs)
 
     @abc.abstractmethod
     def _ezsp_frame_rx(self, data: bytes) -> tuple[int, int, bytes]:
@@ -88,15 +158,69 @@ class ProtocolHandler(abc.ABC):
             "getValue": 999,
         }.get(name, 0)
 
+    def _get_command_timeout(self, name: str) -> float:
+        """Time to wait for a response, starting once the command has been sent."""
+        if self._command_latency is None:
+            return EZSP_CMD_TIMEOUT
+
+        return self._command_latency.timeout(name, default=EZSP_CMD_TIMEOUT)
+
+    def _next_free_sequence(self) -> None:
+        """Skip over sequence numbers of commands still awaiting a response.
+
+        Commands that timed out keep their sequence number until their response
+        arrives, so that a late response is never matched to a newer command.
+        """
+        for _ in range(2):
+            for _ in range(256):
+                if self._seq not in self._awaiting:
+                    return
+
+                self._seq = (self._seq + 1) % 256
+
+            # Every sequence number is taken, forget about commands that timed out
+            for seq, (_, _, future) in list(self._awaiting.items()):
+                if future.done():
+                    del self._awaiting[seq]
+
+        raise EzspError("No free sequence numbers, too many commands are pending")
+
+    def _disable_pipelining(self, exc: InvalidCommandError) -> None:
+        LOGGER.warning(
+            "NCP rejected a pipelined command (%s), sending commands one at a time",
+            exc,
+        )
+        self._send_semaphore.max_value = 1
+
     async def command(self, name, *args, **kwargs) -> Any:
         """Serialize command and send it."""
-        delayed = False
-        send_time = None
+        cache = self._response_cache
+
+        if cache is None:
+            return await self._command(name, *args, **kwargs)
+
+        cache.command_sent(name)
+        codec = self._get_codec(name)
+        key = cache.get_key(name, codec, args, kwargs)
 
-        if self._send_semaphore.locked():
-            delayed = True
-            send_time = time.monotonic()
+        if key is None:
+            return await self._command(name, *args, **kwargs)
 
+        try:
+            return cache.get(key)
+        except KeyError:
+            pass
+
+        response = await self._command(name, *args, **kwargs)
+        cache.set(key, response, codec)
+
+        return response
+
+    async def _command(self, name, *args, **kwargs) -> Any:
+        delayed = self._send_semaphore.locked()
+        queued = time.monotonic()
+
+        if delayed:
             LOGGER.debug(
                 "Send semaphore is locked, delaying before sending %s(%r, %r)",
                 name,
@@ -105,28 +229,76 @@ class ProtocolHandler(abc.ABC):
             )
 
         async with self._send_semaphore(priority=self._get_command_priority(name)):
+            queue_time = time.monotonic() - queued
+
+            if self._statistics is not None:
+                self._statistics[name].queue_time += queue_time
+
             if delayed:
                 LOGGER.debug(
                     "Sending command  %s: %s %s after %0.2fs delay",
                     name,
                     args,
                     kwargs,
-                    time.monotonic() - send_time,
+                    queue_time,
                 )
             else:
                 LOGGER.debug("Sending command  %s: %s %s", name, args, kwargs)
 
-            data = self._ezsp_frame(name, *args, **kwargs)
-            cmd_id, _, rx_schema = self.COMMANDS[name]
+            try:
+                return await self._send_command(name, *args, **kwargs)
+            except InvalidCommandError as exc:
+                if (
+                    exc.status not in PIPELINING_REJECTED_STATUSES
+                    or self._send_semaphore.max_value == 1
+                ):
+                    raise
+
+                self._disable_pipelining(exc)
+
+            return await self._send_command(name, *args, **kwargs)
+
+    async def _send_command(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        self._next_free_sequence()
+
+        data = self._ezsp_frame(name, *args, **kwargs)
+        cmd_id, _, rx_schema = self.COMMANDS[name]
 
-            future = asyncio.get_running_loop().create_future()
-            self._awaiting[self._seq] = (cmd_id, rx_schema, future)
-            self._seq = (self._seq + 1) % 256
+        future = asyncio.get_running_loop().create_future()
+        self._awaiting[self._seq] = (cmd_id, rx_schema, future)
+        self._seq = (self._seq + 1) % 256
 
-            await self._gw.send_data(data)
+        await self._gw.send_data(data)
+        sent = time.monotonic()
+        stats = None if self._statistics is None else self._statistics[name]
 
-            async with asyncio_timeout(EZSP_CMD_TIMEOUT):
-                return await future
+        if stats is not None:
+            stats.tx_count += 1
+            stats.tx_bytes += len(data)
+
+        try:
+            async with asyncio_timeout(self._get_command_timeout(name)):
+                result = await future
+        except asyncio.TimeoutError:
+            if stats is not None:
+                stats.timeouts += 1
+
+            raise
+        except InvalidCommandError:
+            if stats is not None:
+                stats.invalid_commands += 1
+
+            raise
+
+        latency = time.monotonic() - sent
+
+        if self._command_latency is not None:
+            self._command_latency.record(name, latency)
+
+        if stats is not None:
+            stats.latency.add(latency)
+
+        return result
 
     async def update_policies(self, policy_config: dict) -> None:
         """Set up the policies for what the NCP should do."""
@@ -142,11 +314,23 @@ class ProtocolHandler(abc.ABC):
 
     def __call__(self, data: bytes) -> None:
         """Handler for received data frame."""
+        decoded = self.decode_frame(data)
+
+        if decoded is not None:
+            self.frame_decoded(*decoded)
+
+    def decode_frame(self, data: bytes) -> tuple[int, int, str, Any] | None:
+        """Decode a received data frame into its sequence, ID, name, and result.
+
+        Decoding only updates receive statistics and can be done outside of the
+        event loop. Callbacks without subscribers are not decoded, their result is
+        an `UndecodedFrame`.
+        """
         orig_data = data
         sequence, frame_id, data = self._ezsp_frame_rx(data)
 
         try:
-            frame_name, _, rx_schema = self.COMMANDS_BY_ID[frame_id]
+            frame_name = self.COMMANDS_BY_ID[frame_id][0]
         except KeyError:
             LOGGER.warning(
                 "Unknown application frame 0x%04X received: %s (%s).  This is a bug!",
@@ -154,16 +338,36 @@ class ProtocolHandler(abc.ABC):
                 binascii.hexlify(data),
                 binascii.hexlify(orig_data),
             )
-            return
+            return None
+
+        if self._statistics is not None:
+            stats = self._statistics[frame_name]
+            stats.rx_count += 1
+            stats.rx_bytes += len(orig_data)
+
+        if not self._needs_decoding(sequence, frame_name):
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.debug(
+                    "Received command %s, not decoded: %s",
+                    frame_name,
+                    binascii.hexlify(data),
+                )
 
+            return sequence, frame_id, frame_name, UndecodedFrame(data)
+
+        return sequence, frame_id, frame_name, self._decode_payload(frame_name, data)
+
+    def _needs_decoding(self, sequence: int, frame_name: str) -> bool:
+        return (
+            self._has_callbacks is None
+            or sequence in self._awaiting
+            or self._has_callbacks(frame_name)
+        )
+
+    def _decode_payload(self, frame_name: str, data: bytes) -> Any:
         try:
-            if isinstance(rx_schema, dict):
-                result, data = t.deserialize_dict(data, rx_schema)
-                LOGGER.debug("Received command %s: %s", frame_name, result)
-                result = list(result.values())
-            else:
-                result, data = rx_schema.deserialize(data)
-                LOGGER.debug("Received command %s: %s", frame_name, result)
+            codec = self._get_codec(frame_name)
+            result, data = codec.decode(data)
         except Exception:
             LOGGER.warning(
                 "Failed to parse frame %s: %s",
@@ -173,9 +377,31 @@ class ProtocolHandler(abc.ABC):
             )
             raise
 
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug(
+                "Received command %s: %s",
+                frame_name,
+                result
+                if codec.rx_fields is None
+                else dict(zip(codec.rx_fields, result)),
+            )
+
         if data:
             LOGGER.debug("Frame contains trailing data: %s", data)
 
+        return result
+
+    def frame_decoded(
+        self, sequence: int, frame_id: int, frame_name: str, result: Any
+    ) -> None:
+        """Dispatch a decoded frame to the awaiting command or callback handler."""
+        if isinstance(result, UndecodedFrame):
+            # Subscriptions may have changed since the frame was received
+            if not self._needs_decoding(sequence, frame_name):
+                return
+
+            result = self._decode_payload(frame_name, result.data)
+
         if sequence in self._awaiting:
             expected_id, schema, future = self._awaiting.pop(sequence)
             try:
@@ -184,11 +410,21 @@ class ProtocolHandler(abc.ABC):
                     future.set_exception(
                         InvalidCommandError(
                             f"{sent_cmd_name} command is an {frame_name}, was sent "
-                            f"under {sequence} sequence number: {result[0].name}"
+                            f"under {sequence} sequence number: {result[0].name}",
+                            status=result[0],
                         )
                     )
                     return
 
+                if expected_id == self.COMMANDS["callback"][0]:
+                    # A polled callback is the response to `callback`, `noCallbacks`
+                    # if there are none left
+                    if frame_name != "noCallbacks":
+                        self._handle_callback(frame_name, result)
+
+                    future.set_result(frame_name)
+                    return
+
                 assert expected_id == frame_id
                 future.set_result(result)
             except asyncio.InvalidStateError:
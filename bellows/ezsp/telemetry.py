@@ -0,0 +1,65 @@
+"""Per-frame statistics of the EZSP traffic with the NCP."""
+
+from __future__ import annotations
+
+import dataclasses
+
+from bellows.ezsp.latency import BUCKET_BOUNDS, LatencyHistogram
+
+
+@dataclasses.dataclass
+class FrameStatistics:
+    """Counters describing the traffic of a single EZSP frame."""
+
+    tx_count: int = 0
+    tx_bytes: int = 0
+    rx_count: int = 0
+    rx_bytes: int = 0
+    timeouts: int = 0
+    invalid_commands: int = 0
+    queue_time: float = 0.0
+    latency: LatencyHistogram = dataclasses.field(
+        default_factory=lambda: LatencyHistogram(max_samples=None)
+    )
+
+    def as_dict(self) -> dict[str, int]:
+        """Flatten the statistics into integer counters, omitting unused ones."""
+        counters = {
+            field.name: getattr(self, field.name)
+            for field in dataclasses.fields(self)
+            if field.type == "int"
+        }
+        counters["queue_time_ms"] = round(1000 * self.queue_time)
+
+        for bound, count in zip(BUCKET_BOUNDS, self.latency.counts):
+            counters[f"latency_le_{round(1000 * bound)}ms"] = count
+
+        counters[
+            f"latency_gt_{round(1000 * BUCKET_BOUNDS[-1])}ms"
+        ] = self.latency.counts[-1]
+
+        return {name: value for name, value in counters.items() if value}
+
+
+class EzspStatistics:
+    """Statistics of every EZSP frame sent or received, by frame name.
+
+    Received frames are counted by the thread decoding them, everything else on
+    the event loop. Each counter has a single writer.
+    """
+
+    def __init__(self) -> None:
+        self.frames: dict[str, FrameStatistics] = {}
+
+    def __getitem__(self, name: str) -> FrameStatistics:
+        try:
+            return self.frames[name]
+        except KeyError:
+            # Both threads can add a frame, `setdefault` keeps whichever is first
+            return self.frames.setdefault(name, FrameStatistics())
+
+    def clear(self) -> None:
+        self.frames.clear()
+
+    def as_dict(self) -> dict[str, dict[str, int]]:
+        return {name: stats.as_dict() for name, stats in list(self.frames.items())}
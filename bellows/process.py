@@ -0,0 +1,547 @@
+"""Run the serial link with the NCP in a separate process.
+
+The `Gateway` and `AshProtocol` stack runs in a child process, leaving the parent's
+GIL to the application. EZSP frames and gateway calls cross between the processes
+as records in two single producer, single consumer ring buffers in shared memory,
+one per direction. A pipe is only used to wake up the other side, once per batch
+of records.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import itertools
+import logging
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+import os
+import pickle
+import struct
+from typing import Any, Callable
+
+from bellows.exception import EzspError
+import bellows.types as t
+import bellows.uart
+
+LOGGER = logging.getLogger(__name__)
+
+# Size of the data area of each ring buffer
+RING_SIZE = 256 * 1024
+
+# Records that do not fit into a full ring buffer are retried after this delay
+RING_FULL_RETRY_DELAY = 0.001
+
+# Time allowed for the worker process to exit after the connection is closed
+WORKER_EXIT_TIMEOUT = 5
+
+# Parent to worker
+MSG_SEND_DATA = 0x01
+MSG_CALL = 0x02
+MSG_CLOSE = 0x03
+
+# Worker to parent
+MSG_FRAME = 0x81
+MSG_RESULT = 0x82
+MSG_FAILED = 0x83
+MSG_CONNECTION_LOST = 0x84
+MSG_CONNECTED = 0x85
+
+
+class SharedMemoryRing:
+    """Ring buffer of `(kind, payload)` records in shared memory.
+
+    Only one process may write records and only one may read them. The writer owns
+    the `head` counter and the reader owns the `tail` counter, both count bytes and
+    never wrap around.
+    """
+
+    HEADER = struct.Struct("<QQQ")
+    RECORD_HEADER = struct.Struct("<BI")
+
+    def __init__(self, shm: SharedMemory) -> None:
+        self._shm = shm
+        self._buf = shm.buf
+        _, _, self.capacity = self.HEADER.unpack_from(self._buf, 0)
+
+    @classmethod
+    def create(cls, capacity: int = RING_SIZE) -> SharedMemoryRing:
+        shm = SharedMemory(create=True, size=cls.HEADER.size + capacity)
+        cls.HEADER.pack_into(shm.buf, 0, 0, 0, capacity)
+
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> SharedMemoryRing:
+        return cls(SharedMemory(name=name))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _write(self, position: int, data: bytes) -> None:
+        offset = position % self.capacity
+        start = self.HEADER.size + offset
+        first = min(len(data), self.capacity - offset)
+
+        self._buf[start : start + first] = data[:first]
+
+        if first < len(data):
+            self._buf[self.HEADER.size : self.HEADER.size + len(data) - first] = data[
+                first:
+            ]
+
+    def _read(self, position: int, size: int) -> bytes:
+        offset = position % self.capacity
+        start = self.HEADER.size + offset
+        first = min(size, self.capacity - offset)
+
+        if first == size:
+            return bytes(self._buf[start : start + size])
+
+        return bytes(self._buf[start : start + first]) + bytes(
+            self._buf[self.HEADER.size : self.HEADER.size + size - first]
+        )
+
+    def put(self, kind: int, payload: bytes) -> bool:
+        """Write a record, returning `False` if there is not enough free space."""
+        head, tail, _ = self.HEADER.unpack_from(self._buf, 0)
+        size = self.RECORD_HEADER.size + len(payload)
+
+        if size > self.capacity - (head - tail):
+            return False
+
+        self._write(head, self.RECORD_HEADER.pack(kind, len(payload)))
+        self._write(head + self.RECORD_HEADER.size, memoryview(payload))
+
+        # The record becomes visible to the reader only once it is complete
+        struct.pack_into("<Q", self._buf, 0, head + size)
+
+        return True
+
+    def get_all(self) -> list[tuple[int, bytes]]:
+        """Read all available records."""
+        head, tail, _ = self.HEADER.unpack_from(self._buf, 0)
+        records = []
+
+        while tail < head:
+            kind, length = self.RECORD_HEADER.unpack(
+                self._read(tail, self.RECORD_HEADER.size)
+            )
+            records.append((kind, self._read(tail + self.RECORD_HEADER.size, length)))
+            tail += self.RECORD_HEADER.size + length
+
+        struct.pack_into("<Q", self._buf, 8, tail)
+
+        return records
+
+    def close(self) -> None:
+        self._buf.release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        self._shm.unlink()
+
+
+class SharedMemoryChannel:
+    """Bidirectional record channel between two processes."""
+
+    def __init__(
+        self,
+        tx_ring: SharedMemoryRing,
+        tx_fd: int,
+        rx_ring: SharedMemoryRing,
+        rx_fd: int,
+        records_received: Callable[[list[tuple[int, bytes]]], None],
+        connection_lost: Callable[[], None],
+    ) -> None:
+        self._tx_ring = tx_ring
+        self._tx_fd = tx_fd
+        self._rx_ring = rx_ring
+        self._rx_fd = rx_fd
+        self._records_received = records_received
+        self._connection_lost = connection_lost
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: collections.deque[tuple[int, bytes]] = collections.deque()
+        self._wakeup_handle: asyncio.Handle | None = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        os.set_blocking(self._tx_fd, False)
+        os.set_blocking(self._rx_fd, False)
+        loop.add_reader(self._rx_fd, self._read_ready)
+
+    def send(self, kind: int, payload: bytes = b"", *, flush: bool = False) -> None:
+        # Records are never reordered, later ones wait behind any pending ones
+        if self._pending or not self._tx_ring.put(kind, payload):
+            self._pending.append((kind, payload))
+
+        # The other side is woken up once per event loop iteration, unless the record
+        # is latency sensitive
+        if flush:
+            self._wakeup()
+        elif self._wakeup_handle is None:
+            self._wakeup_handle = self._loop.call_soon(self._wakeup)
+
+    def _wakeup(self) -> None:
+        if self._wakeup_handle is not None:
+            self._wakeup_handle.cancel()
+            self._wakeup_handle = None
+
+        while self._pending and self._tx_ring.put(*self._pending[0]):
+            self._pending.popleft()
+
+        try:
+            os.write(self._tx_fd, b"\x00")
+        except BlockingIOError:
+            # The other side has plenty of wakeups pending already
+            pass
+        except OSError:
+            LOGGER.debug("Failed to wake up the other process", exc_info=True)
+            return
+
+        if self._pending:
+            self._wakeup_handle = self._loop.call_later(
+                RING_FULL_RETRY_DELAY, self._wakeup
+            )
+
+    def _read_ready(self) -> None:
+        try:
+            data = os.read(self._rx_fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+
+        # The ring is read even after the other side exits, it may contain records
+        records = self._rx_ring.get_all()
+
+        if records:
+            self._records_received(records)
+
+        if not data:
+            self.close()
+            self._connection_lost()
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.remove_reader(self._rx_fd)
+
+        if self._wakeup_handle is not None:
+            self._wakeup_handle.cancel()
+            self._wakeup_handle = None
+
+
+def _dumps_result(result: Any, exc: BaseException | None) -> bytes:
+    """Pickle a call result, replacing exceptions that cannot be unpickled."""
+    if exc is None:
+        return pickle.dumps((result, None))
+
+    try:
+        data = pickle.dumps((None, exc))
+        pickle.loads(data)
+    except Exception:
+        data = pickle.dumps((None, EzspError(repr(exc))))
+
+    return data
+
+
+class _WorkerApplication:
+    """Application stand-in forwarding gateway callbacks to the parent process."""
+
+    def __init__(self, channel: SharedMemoryChannel) -> None:
+        self._channel = channel
+
+    def frame_received(self, data: bytes) -> None:
+        self._channel.send(MSG_FRAME, data)
+
+    def enter_failed_state(self, code: t.NcpResetCode) -> None:
+        self._channel.send(MSG_FAILED, t.NcpResetCode(code).serialize())
+
+    def connection_lost(self, exc: Exception) -> None:
+        self._channel.send(MSG_CONNECTION_LOST, _dumps_result(None, exc))
+
+
+async def _worker_main(
+    config: dict,
+    tx_ring_name: str,
+    tx_conn: multiprocessing.connection.Connection,
+    rx_ring_name: str,
+    rx_conn: multiprocessing.connection.Connection,
+) -> None:
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    tasks = set()
+
+    tx_ring = SharedMemoryRing.attach(tx_ring_name)
+    rx_ring = SharedMemoryRing.attach(rx_ring_name)
+    gateway = None
+    close_requested = False
+
+    def records_received(records: list[tuple[int, bytes]]) -> None:
+        nonlocal close_requested
+
+        for kind, payload in records:
+            if kind == MSG_CLOSE:
+                # The parent gave up while the serial port was still being opened
+                if gateway is None:
+                    close_requested = True
+                else:
+                    gateway.close()
+            elif kind == MSG_SEND_DATA:
+                request_id, data = payload[:4], payload[4:]
+                start_request(request_id, gateway.send_data(data))
+            elif kind == MSG_CALL:
+                request_id, (name, args) = payload[:4], pickle.loads(payload[4:])
+                start_request(request_id, getattr(gateway, name)(*args))
+
+    def start_request(request_id: bytes, coro) -> None:
+        task = loop.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(lambda task: request_done(request_id, task))
+
+    def request_done(request_id: bytes, task: asyncio.Task) -> None:
+        tasks.discard(task)
+
+        if task.cancelled():
+            result = _dumps_result(None, asyncio.CancelledError())
+        elif task.exception() is not None:
+            result = _dumps_result(None, task.exception())
+        else:
+            result = _dumps_result(task.result(), None)
+
+        channel.send(MSG_RESULT, request_id + result)
+
+    def stop() -> None:
+        if not done.done():
+            done.set_result(None)
+
+    channel = SharedMemoryChannel(
+        tx_ring,
+        tx_conn.fileno(),
+        rx_ring,
+        rx_conn.fileno(),
+        records_received,
+        stop,
+    )
+    channel.start(loop)
+
+    try:
+        gateway, connection_done = await bellows.uart._connect(
+            config, _WorkerApplication(channel)
+        )
+    except Exception as exc:
+        channel.send(MSG_CONNECTION_LOST, _dumps_result(None, exc))
+    else:
+        connection_done.add_done_callback(lambda _: stop())
+
+        if close_requested:
+            gateway.close()
+        else:
+            channel.send(MSG_CONNECTED)
+
+        await done
+
+    for task in tasks:
+        task.cancel()
+
+    # Deliver any remaining records before exiting
+    await asyncio.sleep(0)
+    channel.close()
+    channel._wakeup()
+
+    tx_ring.close()
+    rx_ring.close()
+
+
+def _worker_process_main(*args: Any) -> None:
+    asyncio.run(_worker_main(*args))
+
+
+class ProcessGateway:
+    """Parent side of a `Gateway` running in a worker process."""
+
+    def __init__(
+        self,
+        application,
+        process: multiprocessing.process.BaseProcess,
+        tx_ring: SharedMemoryRing,
+        tx_conn: multiprocessing.connection.Connection,
+        rx_ring: SharedMemoryRing,
+        rx_conn: multiprocessing.connection.Connection,
+    ) -> None:
+        self._application = application
+        self._process = process
+        self._rings = (tx_ring, rx_ring)
+        self._conns = (tx_conn, rx_conn)
+        self._loop = asyncio.get_running_loop()
+
+        self._request_ids = itertools.count()
+        self._requests: dict[bytes, asyncio.Future] = {}
+        self._closing = False
+        self._connected: asyncio.Future = self._loop.create_future()
+        self._closed: asyncio.Future = self._loop.create_future()
+
+        self._channel = SharedMemoryChannel(
+            tx_ring,
+            tx_conn.fileno(),
+            rx_ring,
+            rx_conn.fileno(),
+            self._records_received,
+            self._worker_exited,
+        )
+        self._channel.start(self._loop)
+
+    def _records_received(self, records: list[tuple[int, bytes]]) -> None:
+        for kind, payload in records:
+            if kind == MSG_FRAME:
+                self._application.frame_received(payload)
+            elif kind == MSG_RESULT:
+                self._result_received(payload[:4], payload[4:])
+            elif kind == MSG_FAILED:
+                code, _ = t.NcpResetCode.deserialize(payload)
+                self._application.enter_failed_state(code)
+            elif kind == MSG_CONNECTION_LOST:
+                _, exc = pickle.loads(payload)
+                self._connection_lost(exc)
+            elif kind == MSG_CONNECTED:
+                # `connect` may have been cancelled in the meantime
+                if not self._connected.done():
+                    self._connected.set_result(None)
+
+    def _result_received(self, request_id: bytes, payload: bytes) -> None:
+        future = self._requests.pop(request_id, None)
+
+        if future is None or future.done():
+            return
+
+        result, exc = pickle.loads(payload)
+
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def _connection_lost(self, exc: Exception) -> None:
+        if not self._connected.done():
+            self._connected.set_exception(exc)
+        elif not self._closing:
+            LOGGER.error("Lost serial connection: %r", exc)
+            self._application.connection_lost(exc)
+
+        self._closing = True
+
+    def _worker_exited(self) -> None:
+        """The worker process has exited, by request or otherwise."""
+        exc = ConnectionResetError("Serial I/O worker process exited")
+
+        for future in self._requests.values():
+            if not future.done():
+                future.set_exception(exc)
+
+        self._requests.clear()
+        self._connection_lost(exc)
+        self._cleanup_task = self._loop.create_task(self._cleanup())
+
+    async def _cleanup(self) -> None:
+        await self._loop.run_in_executor(None, self._process.join, WORKER_EXIT_TIMEOUT)
+
+        if self._process.is_alive():
+            LOGGER.warning("Serial I/O worker process did not exit, terminating")
+            self._process.terminate()
+            await self._loop.run_in_executor(None, self._process.join)
+
+        for ring in self._rings:
+            ring.close()
+            ring.unlink()
+
+        for conn in self._conns:
+            conn.close()
+
+        self._closed.set_result(None)
+
+    async def wait_closed(self) -> None:
+        """Wait for the worker process to exit and its resources to be released."""
+        await asyncio.shield(self._closed)
+
+    async def _abort(self) -> None:
+        """Close the connection before it is established, stopping a stuck worker."""
+        self.close()
+
+        try:
+            await asyncio.wait_for(self.wait_closed(), WORKER_EXIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            LOGGER.warning("Serial I/O worker process did not exit, terminating")
+            self._process.terminate()
+
+            # The worker exiting closes its pipes, which releases everything else
+            await self.wait_closed()
+
+    def _request(self, kind: int, payload: bytes) -> asyncio.Future:
+        if self._closing:
+            raise EzspError("Serial I/O worker process is closed")
+
+        request_id = (next(self._request_ids) & 0xFFFFFFFF).to_bytes(4, "little")
+        future = self._loop.create_future()
+        self._requests[request_id] = future
+        # The application event loop may be too busy to batch requests
+        self._channel.send(kind, request_id + payload, flush=True)
+
+        return future
+
+    def _call(self, name: str, *args: Any) -> asyncio.Future:
+        return self._request(MSG_CALL, pickle.dumps((name, args)))
+
+    async def send_data(self, data: bytes) -> None:
+        await self._request(MSG_SEND_DATA, data)
+
+    async def reset(self):
+        return await self._call("reset")
+
+    async def wait_for_startup_reset(self) -> None:
+        await self._call("wait_for_startup_reset")
+
+    async def get_ash_statistics(self) -> dict[str, int]:
+        return await self._call("get_ash_statistics")
+
+    def close(self) -> None:
+        if self._closing:
+            return
+
+        self._closing = True
+        self._channel.send(MSG_CLOSE, flush=True)
+
+
+async def connect(config, application) -> ProcessGateway:
+    """Start a worker process running the serial link with the NCP."""
+    # Forking a process with running threads is unsafe
+    context = multiprocessing.get_context("spawn")
+
+    # Rings and pipes are named from the point of view of the parent
+    tx_ring = SharedMemoryRing.create()
+    rx_ring = SharedMemoryRing.create()
+    worker_rx_conn, tx_conn = context.Pipe(duplex=False)
+    rx_conn, worker_tx_conn = context.Pipe(duplex=False)
+
+    process = context.Process(
+        target=_worker_process_main,
+        args=(dict(config), rx_ring.name, worker_tx_conn, tx_ring.name, worker_rx_conn),
+        name=f"{__name__}.worker",
+        daemon=True,
+    )
+    process.start()
+
+    # Only the worker keeps its ends open, the parent notices when it exits
+    worker_rx_conn.close()
+    worker_tx_conn.close()
+
+    gateway = ProcessGateway(application, process, tx_ring, tx_conn, rx_ring, rx_conn)
+
+    try:
+        await gateway._connected
+    except BaseException:
+        await gateway._abort()
+        raise
+
+    return gateway
@@ -0,0 +1,268 @@
+"""Serial port transport read by a dedicated blocking thread.
+
+The serial port is opened and configured with `termios` directly. A plain thread
+waits on the file descriptor and hands received data to the event loop in batches,
+everything else (the ASH protocol, writes, timers) runs on the event loop itself.
+Compared to running pyserial-asyncio on a second event loop, no event loop, transport
+and protocol machinery runs in the second thread.
+
+This module is only available on POSIX platforms.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import selectors
+import termios
+import threading
+import typing
+
+from bellows.thread import ThreadsafeBatchedCall
+
+LOGGER = logging.getLogger(__name__)
+
+# Maximum number of bytes read from the serial port at once
+READ_SIZE = 4096
+
+
+def configure_serial_port(
+    fd: int, baudrate: int, *, xonxoff: bool, rtscts: bool
+) -> None:
+    """Configure a serial port for raw 8N1 communication."""
+    try:
+        speed = getattr(termios, f"B{baudrate}")
+    except AttributeError:
+        raise ValueError(f"Unsupported baudrate: {baudrate}") from None
+
+    iflag, oflag, cflag, lflag, _, _, cc = termios.tcgetattr(fd)
+
+    iflag &= ~(
+        termios.IGNBRK
+        | termios.BRKINT
+        | termios.PARMRK
+        | termios.ISTRIP
+        | termios.INLCR
+        | termios.IGNCR
+        | termios.ICRNL
+        | termios.IXON
+        | termios.IXOFF
+        | termios.IXANY
+    )
+    oflag &= ~termios.OPOST
+    lflag &= ~(
+        termios.ECHO | termios.ECHONL | termios.ICANON | termios.ISIG | termios.IEXTEN
+    )
+    cflag &= ~(termios.CSIZE | termios.PARENB | termios.CSTOPB)
+    cflag |= termios.CS8 | termios.CLOCAL | termios.CREAD
+
+    if xonxoff:
+        iflag |= termios.IXON | termios.IXOFF
+
+    # Not every platform exposes hardware flow control through `termios`
+    crtscts = getattr(termios, "CRTSCTS", 0)
+
+    if rtscts:
+        cflag |= crtscts
+    else:
+        cflag &= ~crtscts
+
+    # Reads return as soon as a single byte is available
+    cc[termios.VMIN] = 1
+    cc[termios.VTIME] = 0
+
+    termios.tcsetattr(
+        fd, termios.TCSANOW, [iflag, oflag, cflag, lflag, speed, speed, cc]
+    )
+
+
+class SerialReaderThreadTransport(asyncio.Transport):
+    """Serial transport with reads done by a dedicated thread."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        protocol: asyncio.Protocol,
+        fd: int,
+        url: str,
+    ) -> None:
+        super().__init__(extra={"url": url})
+
+        self._loop = loop
+        self._protocol = protocol
+        self._fd = fd
+        self._closing = False
+        self._write_buffer = bytearray()
+
+        # Data read while the event loop is busy is delivered with a single wakeup
+        self._data_received = ThreadsafeBatchedCall(protocol.data_received, loop)
+
+        # Written to by the event loop to stop the reader thread
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._thread = threading.Thread(
+            target=self._reader_main, name=f"{__name__}[{url}]", daemon=True
+        )
+
+    def _start(self) -> None:
+        self._protocol.connection_made(self)
+        self._thread.start()
+
+    def _reader_main(self) -> None:
+        exc: Exception | None = None
+
+        # `select.select` cannot wait on file descriptors above FD_SETSIZE
+        selector = selectors.DefaultSelector()
+
+        try:
+            selector.register(self._fd, selectors.EVENT_READ)
+            selector.register(self._wakeup_r, selectors.EVENT_READ)
+
+            while True:
+                events = selector.select()
+
+                if any(key.fd == self._wakeup_r for key, _ in events):
+                    return
+
+                try:
+                    data = os.read(self._fd, READ_SIZE)
+                except BlockingIOError:
+                    continue
+
+                if not data:
+                    exc = ConnectionResetError("Serial port was closed")
+                    break
+
+                self._data_received(data)
+        except OSError as err:
+            exc = err
+        finally:
+            selector.close()
+
+        # Scheduled after any pending data, which will be delivered first
+        try:
+            self._loop.call_soon_threadsafe(self._fatal_error, exc)
+        except RuntimeError:
+            LOGGER.warning("Attempted to use a closed event loop")
+
+    def _fatal_error(self, exc: Exception) -> None:
+        if self._closing:
+            return
+
+        LOGGER.debug("Fatal error on serial transport: %r", exc)
+        self._close(exc)
+
+    def _close(self, exc: Exception | None) -> None:
+        self._closing = True
+
+        if self._write_buffer:
+            self._loop.remove_writer(self._fd)
+            self._write_buffer.clear()
+
+        os.write(self._wakeup_w, b"\x00")
+        self._loop.call_soon(self._call_connection_lost, exc)
+
+    def _call_connection_lost(self, exc: Exception | None) -> None:
+        try:
+            # The reader thread exits as soon as it is woken up
+            self._thread.join()
+        finally:
+            os.close(self._fd)
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+
+        self._protocol.connection_lost(exc)
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        if self._closing:
+            return
+
+        self._close(None)
+
+    def abort(self) -> None:
+        self.close()
+
+    def get_protocol(self) -> asyncio.Protocol:
+        return self._protocol
+
+    def set_protocol(self, protocol: asyncio.Protocol) -> None:
+        # Data already read is still delivered to the previous protocol
+        self._protocol = protocol
+        self._data_received = ThreadsafeBatchedCall(protocol.data_received, self._loop)
+
+    def get_write_buffer_size(self) -> int:
+        return len(self._write_buffer)
+
+    def write(self, data: bytes) -> None:
+        if self._closing:
+            return
+
+        if not self._write_buffer:
+            try:
+                written = os.write(self._fd, data)
+            except BlockingIOError:
+                written = 0
+            except OSError as exc:
+                self._fatal_error(exc)
+                return
+
+            if written == len(data):
+                return
+
+            # The rest is written once the serial port is ready to accept more data
+            data = data[written:]
+            self._loop.add_writer(self._fd, self._write_ready)
+
+        self._write_buffer += data
+
+    def _write_ready(self) -> None:
+        try:
+            written = os.write(self._fd, self._write_buffer)
+        except BlockingIOError:
+            return
+        except OSError as exc:
+            self._fatal_error(exc)
+            return
+
+        del self._write_buffer[:written]
+
+        if not self._write_buffer:
+            self._loop.remove_writer(self._fd)
+
+
+async def create_serial_connection(
+    loop: asyncio.AbstractEventLoop,
+    protocol_factory: typing.Callable[[], asyncio.Protocol],
+    url: str,
+    *,
+    baudrate: int,
+    xonxoff: bool,
+    rtscts: bool,
+) -> tuple[SerialReaderThreadTransport, asyncio.Protocol]:
+    """Open a serial port and start reading it in a dedicated thread."""
+    LOGGER.debug(
+        "Opening a serial connection to %r with a reader thread"
+        " (baudrate=%s, xonxoff=%s, rtscts=%s)",
+        url,
+        baudrate,
+        xonxoff,
+        rtscts,
+    )
+
+    fd = os.open(url, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+
+    try:
+        configure_serial_port(fd, baudrate, xonxoff=xonxoff, rtscts=rtscts)
+        termios.tcflush(fd, termios.TCIOFLUSH)
+    except BaseException:
+        os.close(fd)
+        raise
+
+    protocol = protocol_factory()
+    transport = SerialReaderThreadTransport(loop, protocol, fd, url)
+    transport._start()
+
+    return transport, protocol
@@ -1,4 +1,5 @@
 import asyncio
+import collections
 from concurrent.futures import ThreadPoolExecutor
 import functools
 import logging
@@ -73,6 +74,60 @@ class EventLoopThread:
         self.loop.call_soon_threadsafe(cancel_tasks_and_stop_loop)
 
 
+class ThreadsafeBatchedCall:
+    """Call a function on another event loop, waking it up once per batch of calls.
+
+    Calls are queued in a deque and a single callback is scheduled to drain it, so any
+    number of calls made before the other loop gets around to it cost one wakeup.
+    """
+
+    def __init__(self, func, loop, drained_callback=None):
+        self._func = func
+        self._loop = loop
+        self._drained_callback = drained_callback
+        self._queue = collections.deque()
+        self._scheduled = False
+
+        # Only ever incremented by the thread running `loop`
+        self.processed = 0
+
+    def __call__(self, *args):
+        self._queue.append(args)
+
+        if self._scheduled:
+            return
+
+        if self._loop.is_closed():
+            # Disconnected
+            LOGGER.warning("Attempted to use a closed event loop")
+            return
+
+        self._scheduled = True
+        self._loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self):
+        # Calls queued after this point will schedule a new drain
+        self._scheduled = False
+
+        while self._queue:
+            args = self._queue.popleft()
+
+            try:
+                self._func(*args)
+            except Exception as exc:
+                self._loop.call_exception_handler(
+                    {
+                        "message": f"Exception in batched call to {self._func!r}",
+                        "exception": exc,
+                    }
+                )
+
+            self.processed += 1
+
+        if self._drained_callback is not None:
+            self._drained_callback()
+
+
 class ThreadsafeProxy:
     """Proxy class which enforces threadsafe non-blocking calls
     This class can be used to wrap an object to ensure any calls
@@ -83,6 +138,12 @@ class ThreadsafeProxy:
         self._obj = obj
         self._obj_loop = obj_loop
 
+    def batched(self, name, drained_callback=None):
+        """Create a batched caller for a method without a return value."""
+        return ThreadsafeBatchedCall(
+            getattr(self._obj, name), self._obj_loop, drained_callback
+        )
+
     def __getattr__(self, name):
         func = getattr(self._obj, name)
         if not callable(func):
@@ -92,31 +153,38 @@ class ThreadsafeProxy:
                 )
             )
 
+        loop = self._obj_loop
+        is_coroutine = asyncio.iscoroutinefunction(func)
+
+        def check_result_wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            if result is not None:
+                raise TypeError(
+                    (
+                        "ThreadsafeProxy can only wrap functions with no return"
+                        "value \nUse an async method to return values: {}.{}"
+                    ).format(self._obj.__class__.__name__, name)
+                )
+
         def func_wrapper(*args, **kwargs):
-            loop = self._obj_loop
             curr_loop = asyncio.get_running_loop()
-            call = functools.partial(func, *args, **kwargs)
             if loop == curr_loop:
-                return call()
+                return func(*args, **kwargs)
             if loop.is_closed():
                 # Disconnected
                 LOGGER.warning("Attempted to use a closed event loop")
                 return
-            if asyncio.iscoroutinefunction(func):
-                future = asyncio.run_coroutine_threadsafe(call(), loop)
+            if is_coroutine:
+                future = asyncio.run_coroutine_threadsafe(func(*args, **kwargs), loop)
                 return asyncio.wrap_future(future, loop=curr_loop)
+            elif kwargs:
+                loop.call_soon_threadsafe(
+                    functools.partial(check_result_wrapper, *args, **kwargs)
+                )
             else:
+                loop.call_soon_threadsafe(check_result_wrapper, *args)
 
-                def check_result_wrapper():
-                    result = call()
-                    if result is not None:
-                        raise TypeError(
-                            (
-                                "ThreadsafeProxy can only wrap functions with no return"
-                                "value \nUse an async method to return values: {}.{}"
-                            ).format(self._obj.__class__.__name__, name)
-                        )
-
-                loop.call_soon_threadsafe(check_result_wrapper)
+        # Cache the wrapper: `__getattr__` is only called for missing attributes
+        self.__dict__[name] = func_wrapper
 
         return func_wrapper
@@ -11,10 +11,11 @@ def deserialize_dict(data, schema):
     return result, data
 
 
-def serialize_dict(args, kwargs, schema):
+def serialize_dict(args, kwargs, schema, prefix=b""):
     params = {
         **dict(zip(schema.keys(), args)),
         **kwargs,
     }
 
-    return b"".join(t(params[k]).serialize() for k, t in schema.items())
+    # The prefix is joined along with the parameters to avoid copying them again
+    return b"".join([prefix, *(t(params[k]).serialize() for k, t in schema.items())])
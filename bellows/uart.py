@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import sys
+import urllib.parse
 
 if sys.version_info[:2] < (3, 11):
     from async_timeout import timeout as asyncio_timeout  # pragma: no cover
@@ -10,16 +11,30 @@ else:
 import zigpy.config
 import zigpy.serial
 
-from bellows.ash import AshProtocol
+from bellows.ash import TX_K, AshProtocol
+import bellows.config as conf
 from bellows.thread import EventLoopThread, ThreadsafeProxy
 import bellows.types as t
 
 LOGGER = logging.getLogger(__name__)
 RESET_TIMEOUT = 5
 
+# The NCP is asked to hold onto callbacks when this many received frames are still
+# waiting to be processed by the application event loop
+CALLBACK_QUEUE_HIGH_WATER = 64
+
+# And to resume sending them once the backlog has drained to this size
+CALLBACK_QUEUE_LOW_WATER = 8
+
 
 class Gateway(asyncio.Protocol):
-    def __init__(self, application, connected_future=None, connection_done_future=None):
+    def __init__(
+        self,
+        application,
+        connected_future=None,
+        connection_done_future=None,
+        frame_decoder=None,
+    ):
         self._application = application
 
         self._reset_future = None
@@ -28,6 +43,24 @@ class Gateway(asyncio.Protocol):
         self._connection_done_future = connection_done_future
 
         self._transport = None
+        self._loop = None
+
+        # When the application runs on its own event loop, received frames are handed
+        # over in batches. Frames are counted by both threads, each counter is only
+        # ever incremented by a single thread.
+        self._frame_channel = None
+        self._frames_received = 0
+        self._host_ready = True
+
+        # Frames can also be decoded by this thread, leaving only their dispatch to
+        # the application event loop
+        self._frame_decoder = frame_decoder
+
+        if isinstance(application, ThreadsafeProxy):
+            self._frame_channel = application.batched(
+                "frame_received" if frame_decoder is None else "frame_decoded",
+                self._frames_processed,
+            )
 
     def close(self):
         self._transport.close()
@@ -35,15 +68,57 @@ class Gateway(asyncio.Protocol):
     def connection_made(self, transport):
         """Callback when the uart is connected"""
         self._transport = transport
+        self._loop = asyncio.get_running_loop()
         if self._connected_future is not None:
             self._connected_future.set_result(True)
 
     async def send_data(self, data: bytes) -> None:
         await self._transport.send_data(data)
 
+    async def get_ash_statistics(self) -> dict[str, int]:
+        return self._transport.stats.as_dict()
+
     def data_received(self, data):
         """Callback when there is data received from the uart"""
-        self._application.frame_received(data)
+        # Without a separate event loop, the frame is processed immediately
+        if self._frame_channel is None:
+            self._application.frame_received(data)
+            return
+
+        self._frames_received += 1
+
+        if self._frame_decoder is None:
+            self._frame_channel(data)
+        else:
+            self._frame_channel(data, self._frame_decoder(data))
+
+        if self._host_ready and self._frames_pending() >= CALLBACK_QUEUE_HIGH_WATER:
+            self._set_host_ready(False)
+
+    def _frames_pending(self) -> int:
+        return self._frames_received - self._frame_channel.processed
+
+    def _frames_processed(self) -> None:
+        """Called on the application event loop after a batch of frames is processed."""
+        if not self._host_ready and self._frames_pending() <= CALLBACK_QUEUE_LOW_WATER:
+            self._loop.call_soon_threadsafe(self._check_host_ready)
+
+    def _check_host_ready(self) -> None:
+        if self._frames_pending() <= CALLBACK_QUEUE_LOW_WATER:
+            self._set_host_ready(True)
+
+    def _set_host_ready(self, ready: bool) -> None:
+        if self._host_ready == ready:
+            return
+
+        LOGGER.debug(
+            "%d received frames are pending, host ready: %s",
+            self._frames_pending(),
+            ready,
+        )
+        self._host_ready = ready
+        self._transport.set_host_ready(ready)
+        self._application.host_ready_changed(ready)
 
     def reset_received(self, code: t.NcpResetCode) -> None:
         """Reset acknowledgement frame receive handler"""
@@ -126,21 +201,51 @@ class Gateway(asyncio.Protocol):
             return await self._reset_future
 
 
-async def _connect(config, application):
+def _use_reader_thread(config) -> bool:
+    """Check if the serial port should be read by a dedicated thread."""
+    if not config.get(conf.CONF_SERIAL_READER_THREAD, False):
+        return False
+
+    # Only local serial ports can be opened directly, not pyserial URLs or sockets
+    if urllib.parse.urlparse(config[zigpy.config.CONF_DEVICE_PATH]).scheme:
+        LOGGER.warning(
+            "A serial reader thread is only supported for local serial ports,"
+            " not %r",
+            config[zigpy.config.CONF_DEVICE_PATH],
+        )
+        return False
+
+    return True
+
+
+async def _connect(config, application, reader_thread=False, frame_decoder=None):
     loop = asyncio.get_event_loop()
 
     connection_future = loop.create_future()
     connection_done_future = loop.create_future()
 
-    gateway = Gateway(application, connection_future, connection_done_future)
-    protocol = AshProtocol(gateway)
+    gateway = Gateway(
+        application, connection_future, connection_done_future, frame_decoder
+    )
+    protocol = AshProtocol(
+        gateway,
+        tx_k=config.get(conf.CONF_ASH_TX_WINDOW, TX_K),
+        ack_delay=config.get(conf.CONF_ASH_ACK_DELAY, 0),
+        baudrate=config[zigpy.config.CONF_DEVICE_BAUDRATE],
+    )
 
     if config[zigpy.config.CONF_DEVICE_FLOW_CONTROL] is None:
         xon_xoff, rtscts = True, False
     else:
         xon_xoff, rtscts = False, True
 
-    transport, _ = await zigpy.serial.create_serial_connection(
+    if reader_thread:
+        # Only available on POSIX platforms
+        from bellows.serial_thread import create_serial_connection
+    else:
+        create_serial_connection = zigpy.serial.create_serial_connection
+
+    transport, _ = await create_serial_connection(
         loop,
         lambda: protocol,
         url=config[zigpy.config.CONF_DEVICE_PATH],
@@ -156,13 +261,27 @@ async def _connect(config, application):
 
 
 async def connect(config, application, use_thread=True):
-    if use_thread:
+    if config.get(conf.CONF_IO_PROCESS, False):
+        # The worker process imports this module
+        import bellows.process
+
+        return await bellows.process.connect(config, application)
+
+    if _use_reader_thread(config):
+        # The serial port is read by a plain thread, everything else runs here
+        protocol, _ = await _connect(config, application, reader_thread=True)
+    elif use_thread:
+        frame_decoder = None
+
+        if config.get(conf.CONF_DECODE_IN_THREAD, False):
+            frame_decoder = application.decode_frame
+
         application = ThreadsafeProxy(application, asyncio.get_event_loop())
         thread = EventLoopThread()
         await thread.start()
         try:
             protocol, connection_done = await thread.run_coroutine_threadsafe(
-                _connect(config, application)
+                _connect(config, application, frame_decoder=frame_decoder)
             )
         except Exception:
             thread.force_stop()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 import os
 import statistics
@@ -28,10 +29,12 @@ from bellows.config import (
     CONF_EZSP_CONFIG,
     CONF_EZSP_POLICIES,
     CONF_USE_THREAD,
+    CONF_WARM_START_PROFILE,
     CONFIG_SCHEMA,
 )
 from bellows.exception import ControllerError, EzspError, StackAlreadyRunning
 import bellows.ezsp
+from bellows.ezsp.profile import NcpProfileStore
 import bellows.multicast
 import bellows.types as t
 from bellows.zigbee import repairs
@@ -40,6 +43,9 @@ import bellows.zigbee.util as util
 
 APS_ACK_TIMEOUT = 120
 RETRY_DELAYS = [0.5, 1.0, 1.5]
+COUNTER_ASH_RTTVAR = "rttvar_ms"
+COUNTER_ASH_SRTT = "srtt_ms"
+COUNTER_ASH_T_RX_ACK = "t_rx_ack_ms"
 COUNTER_EZSP_BUFFERS = "EZSP_FREE_BUFFERS"
 COUNTER_NWK_CONFLICTS = "nwk_conflicts"
 COUNTER_RESET_REQ = "reset_requests"
@@ -49,12 +55,25 @@ COUNTER_RX_MCAST = "multicast_rx"
 COUNTER_RX_UNICAST = "unicast_rx"
 COUNTER_UNKNOWN_DEVICE = "unknown_device_rx"
 COUNTER_WATCHDOG = "watchdog_reset_requests"
+COUNTERS_ASH = "ash_counters"
 COUNTERS_EZSP = "ezsp_counters"
+COUNTERS_EZSP_FRAMES = "ezsp_frame_counters"
 COUNTERS_CTRL = "controller_app_counters"
 DEFAULT_MFG_ID = 0x1049
 EZSP_COUNTERS_CLEAR_IN_WATCHDOG_PERIODS = 180
 EZSP_DEFAULT_RADIUS = 0
 EZSP_MULTICAST_NON_MEMBER_RADIUS = 3
+EZSP_CALLBACK_FRAMES = frozenset(
+    {
+        "incomingMessageHandler",
+        "messageSentHandler",
+        "trustCenterJoinHandler",
+        "incomingRouteRecordHandler",
+        "incomingRouteErrorHandler",
+        "_reset_controller_application",
+        "idConflictHandler",
+    }
+)
 MFG_ID_RESET_DELAY = 180
 RESET_ATTEMPT_BACKOFF_TIME = 5
 NETWORK_UP_TIMEOUT_S = 10
@@ -64,10 +83,15 @@ IEEE_PREFIX_MFG_ID = {
     "54:EF:44": 0x115F,  # Lumi
 }
 
-LIB_VERSION = importlib.metadata.version("bellows")
 LOGGER = logging.getLogger(__name__)
 
 
+@functools.cache
+def _lib_version() -> str:
+    # Reading package metadata is slow, only do it when needed
+    return importlib.metadata.version("bellows")
+
+
 class ControllerApplication(zigpy.application.ControllerApplication):
     SCHEMA = CONFIG_SCHEMA
 
@@ -141,7 +165,14 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         return None, None, None
 
     async def connect(self) -> None:
-        ezsp = bellows.ezsp.EZSP(self.config[zigpy.config.CONF_DEVICE])
+        profile_store = None
+
+        if self.config[CONF_WARM_START_PROFILE] is not None:
+            profile_store = NcpProfileStore(self.config[CONF_WARM_START_PROFILE])
+
+        ezsp = bellows.ezsp.EZSP(
+            self.config[zigpy.config.CONF_DEVICE], profile_store=profile_store
+        )
         await ezsp.connect(use_thread=self.config[CONF_USE_THREAD])
 
         try:
@@ -195,10 +226,15 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         await ezsp._protocol.update_policies(self.config[CONF_EZSP_POLICIES])
         await self.load_network_info(load_devices=False)
 
+        self._update_ezsp_frame_counters()
+
         for cnt_group in self.state.counters:
             cnt_group.reset()
 
-        ezsp.add_callback(self.ezsp_callback_handler)
+        # Frame counters are updated with cumulative values, start again from zero
+        ezsp.statistics.clear()
+
+        ezsp.add_callback(self.ezsp_callback_handler, EZSP_CALLBACK_FRAMES)
         self.controller_event.set()
 
         group_membership = {}
@@ -288,7 +324,7 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         can_rewrite_custom_eui64 = await ezsp.can_rewrite_custom_eui64()
 
         self.state.network_info = zigpy.state.NetworkInfo(
-            source=f"bellows@{LIB_VERSION}",
+            source=f"bellows@{_lib_version()}",
             extended_pan_id=zigpy.types.ExtendedPanId(nwk_params.extendedPanId),
             pan_id=zigpy.types.PanId(nwk_params.panId),
             nwk_update_id=zigpy.types.uint8_t(nwk_params.nwkUpdateId),
@@ -878,8 +914,34 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         self._watchdog_feed_counter = 0
         await super()._watchdog_loop()
 
+    async def _update_ash_counters(self) -> None:
+        counters = self.state.counters[COUNTERS_ASH]
+
+        for name, value in (await self._ezsp.get_ash_statistics()).items():
+            if name in (COUNTER_ASH_T_RX_ACK, COUNTER_ASH_SRTT, COUNTER_ASH_RTTVAR):
+                # RTT estimates are gauges and can decrease
+                cnt = counters[name]
+                cnt._raw_value = value
+                cnt._last_reset_value = 0
+            else:
+                counters[name].update(value)
+
+    def _update_ezsp_frame_counters(self) -> None:
+        counters = self.state.counters[COUNTERS_EZSP_FRAMES]
+
+        for frame_name, frame_counters in self._ezsp.statistics.as_dict().items():
+            group = counters.setdefault(
+                frame_name, zigpy.state.CounterGroup(frame_name)
+            )
+
+            for name, value in frame_counters.items():
+                group[name].update(value)
+
     async def _watchdog_feed(self):
         try:
+            await self._update_ash_counters()
+            self._update_ezsp_frame_counters()
+
             if self._ezsp.ezsp_version == 4:
                 await self._ezsp.nop()
             else:
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the ASH layer.
+
+Run from the repository root: `python script/benchmark_ash.py`
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import time
+import timeit
+import tracemalloc
+from unittest.mock import MagicMock
+
+from bellows import ash
+from bellows.ezsp.v8 import EZSPv8
+import bellows.types as t
+
+FRAME_SIZES = [8, 64, 128, 220]
+NUMBER = 20_000
+
+
+def _report(name: str, size: int, seconds: float, number: int = NUMBER) -> None:
+    print(f"{name:<24} {size:>4} bytes {1_000_000 * seconds / number:>8.2f} us/call")
+
+
+def benchmark_codec() -> None:
+    random.seed(0)
+
+    for size in FRAME_SIZES:
+        data = random.randbytes(size)
+        stuffed = ash.AshProtocol._stuff_bytes(data)
+
+        for name, func, arg in [
+            ("stuff", ash.AshProtocol._stuff_bytes, data),
+            ("unstuff", ash.AshProtocol._unstuff_bytes, stuffed),
+            ("randomize", ash.DataFrame._randomize, data),
+        ]:
+            _report(name, size, timeit.timeit(lambda: func(arg), number=NUMBER))
+
+
+def benchmark_parsing() -> None:
+    for name, frame in [
+        ("parse ACK", ash.AckFrame(res=0, ncp_ready=0, ack_num=1)),
+        ("parse NAK", ash.NakFrame(res=0, ncp_ready=0, ack_num=1)),
+        (
+            "parse DATA",
+            ash.DataFrame(frm_num=0, re_tx=False, ack_num=1, ezsp_frame=bytes(64)),
+        ),
+    ]:
+        data = frame.to_bytes()
+        _report(
+            name,
+            len(data),
+            timeit.timeit(lambda: ash.parse_frame(data), number=NUMBER),
+        )
+
+
+def benchmark_scanner(num_frames: int = 2_000, payload_size: int = 20) -> None:
+    random.seed(0)
+
+    frames = [
+        ash.DataFrame(
+            frm_num=i % 8,
+            re_tx=False,
+            ack_num=0,
+            ezsp_frame=random.randbytes(payload_size),
+        )
+        for i in range(num_frames)
+    ]
+    stream = b"".join(
+        [ash.AshProtocol._stuff_bytes(f.to_bytes()) + b"\x7E" for f in frames]
+    )
+
+    for chunk_size in [1, 64, 4096, len(stream)]:
+        received = []
+        protocol = ash.AshProtocol(MagicMock())
+        protocol.frame_received = received.append
+
+        start = time.perf_counter()
+
+        for offset in range(0, len(stream), chunk_size):
+            protocol.data_received(stream[offset : offset + chunk_size])
+
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"scanner chunk={chunk_size:<6} {len(received) / elapsed:>10.0f} frames/s"
+            f" ({len(received)}/{num_frames} frames parsed)"
+        )
+
+
+def _legacy_ezsp_frame(protocol: EZSPv8, name: str, **kwargs) -> bytes:
+    """EZSP frame serialization before the header was joined with the parameters."""
+    _, tx_schema, _ = protocol.COMMANDS[name]
+    return protocol._ezsp_frame_tx(name) + t.serialize_dict((), kwargs, tx_schema)
+
+
+def _legacy_write(frame: ash.AshFrame, buffer: bytearray) -> None:
+    """ASH framing before frames were written as chunks joined on flush."""
+    buffer += (
+        bytes(()) + ash.stuff_bytes(frame.to_bytes()) + bytes((ash.Reserved.FLAG,))
+    )
+
+
+def _write(frame: ash.AshFrame, chunks: list[bytes]) -> None:
+    chunks.extend(frame.to_stuffed_chunks())
+    chunks.append(ash._SINGLE_BYTES[ash.Reserved.FLAG])
+
+
+def _peak_allocation(func, frame: ash.AshFrame, buffer) -> int:
+    """Peak memory allocated while writing a single frame."""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    func(frame, buffer)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return peak
+
+
+def _buffered_allocations(
+    func, frame: ash.AshFrame, buffer, number: int = 1_000
+) -> tuple[float, float]:
+    """Memory blocks and bytes held per frame by the write buffer until it is flushed.
+
+    Temporary objects freed before `func` returns are not counted, CPython has no
+    cumulative allocation counter. They show up in the peak allocation instead.
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    for _ in range(number):
+        func(frame, buffer)
+
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in diff)
+    size = sum(stat.size_diff for stat in diff)
+
+    return blocks / number, size / number
+
+
+def benchmark_tx_path(number: int = 2_000) -> None:
+    random.seed(0)
+    protocol = EZSPv8(MagicMock(), MagicMock())
+
+    for size in FRAME_SIZES:
+        payload = random.randbytes(size)
+        kwargs = {
+            "type": t.EmberOutgoingMessageType.OUTGOING_DIRECT,
+            "indexOrDestination": t.EmberNodeId(0x1234),
+            "apsFrame": t.EmberApsFrame(
+                profileId=260,
+                clusterId=6,
+                sourceEndpoint=1,
+                destinationEndpoint=1,
+                options=t.EmberApsOption.APS_OPTION_NONE,
+                groupId=0,
+                sequence=1,
+            ),
+            "messageTag": 1,
+            "messageContents": payload,
+        }
+        frame = ash.DataFrame(frm_num=0, re_tx=False, ack_num=0, ezsp_frame=payload)
+
+        for name, func, args in [
+            ("ezsp frame legacy", _legacy_ezsp_frame, (protocol, "sendUnicast")),
+            ("ezsp frame", protocol._ezsp_frame, ("sendUnicast",)),
+        ]:
+            _report(
+                name,
+                size,
+                min(timeit.repeat(lambda: func(*args, **kwargs), number=number)),
+                number,
+            )
+
+        for name, func, new_buffer in [
+            ("ash write legacy", _legacy_write, bytearray),
+            ("ash write", _write, list),
+        ]:
+            # Timings vary between runs, the spread is shown along with the median
+            timings = [
+                1_000_000 * seconds / number
+                for seconds in timeit.repeat(
+                    lambda: func(frame, new_buffer()), number=number, repeat=7
+                )
+            ]
+            blocks, buffered = _buffered_allocations(func, frame, new_buffer())
+
+            print(
+                f"{name:<24} {size:>4} bytes"
+                f" {statistics.median(timings):>8.2f} us/call"
+                f" ({min(timings):.2f}-{max(timings):.2f})"
+            )
+            print(
+                f"{name:<24} {size:>4} bytes"
+                f" {_peak_allocation(func, frame, new_buffer()):>8} bytes peak,"
+                f" {blocks:.2f} blocks/{buffered:.0f} bytes buffered per frame"
+            )
+
+
+if __name__ == "__main__":
+    benchmark_codec()
+    benchmark_parsing()
+    benchmark_scanner()
+    benchmark_tx_path()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Compare generic schema (de)serialization with the compiled command codecs.
+
+Every command schema of EZSP v4 to v14 is encoded and decoded with sample values
+deserialized from zeroed data, schemas shared between versions are counted once.
+
+Run from the repository root: `python script/benchmark_commands.py`
+"""
+
+from __future__ import annotations
+
+import timeit
+
+from bellows.ezsp import EZSP
+from bellows.ezsp.codec import CommandCodec, _struct_code
+import bellows.types as t
+
+NUMBER = 200
+PREFIX = bytes(5)
+SAMPLE = bytes(512)
+
+
+def _legacy_encode(tx_schema, args: list) -> bytes:
+    if isinstance(tx_schema, dict):
+        return t.serialize_dict(args, {}, tx_schema, prefix=PREFIX)
+
+    return PREFIX + tx_schema(*args).serialize()
+
+
+def _legacy_decode(rx_schema, data: bytes) -> tuple:
+    if isinstance(rx_schema, dict):
+        result, data = t.deserialize_dict(data, rx_schema)
+        return list(result.values()), data
+
+    return rx_schema.deserialize(data)
+
+
+def _schemas() -> dict[tuple[int, int], tuple[str, object, object]]:
+    schemas = {}
+
+    for version, protocol in sorted(EZSP._BY_VERSION.items()):
+        for name, (_, tx_schema, rx_schema) in protocol.COMMANDS.items():
+            if isinstance(tx_schema, (dict, type)):
+                schemas.setdefault(
+                    (id(tx_schema), id(rx_schema)),
+                    (f"v{version}.{name}", tx_schema, rx_schema),
+                )
+
+    return schemas
+
+
+def _is_fixed_size(schema) -> bool:
+    return isinstance(schema, dict) and all(map(_struct_code, schema.values()))
+
+
+def main() -> None:
+    totals = {}
+    counts = {}
+
+    for name, tx_schema, rx_schema in _schemas().values():
+        kind = (
+            "fixed size"
+            if _is_fixed_size(tx_schema) and _is_fixed_size(rx_schema)
+            else "other"
+        )
+        counts[kind] = counts.get(kind, 0) + 1
+        codec = CommandCodec.compile(name, 0x00, tx_schema, rx_schema)
+
+        args, _ = _legacy_decode(tx_schema, SAMPLE)
+        rx_data = _legacy_decode(rx_schema, SAMPLE)[0]
+
+        if not isinstance(tx_schema, dict):
+            args = list(args.as_dict().values())
+
+        if isinstance(rx_schema, dict):
+            rx_data = t.serialize_dict(rx_data, {}, rx_schema)
+        else:
+            rx_data = rx_data.serialize()
+
+        assert codec.encode(PREFIX, *args) == _legacy_encode(tx_schema, args)
+        assert codec.decode(rx_data) == _legacy_decode(rx_schema, rx_data)
+
+        for mode, encode, decode in [
+            (
+                "legacy",
+                lambda: _legacy_encode(tx_schema, args),
+                lambda: _legacy_decode(rx_schema, rx_data),
+            ),
+            (
+                "compiled",
+                lambda: codec.encode(PREFIX, *args),
+                lambda: codec.decode(rx_data),
+            ),
+        ]:
+            total = totals.setdefault((kind, mode), [0.0, 0.0])
+            total[0] += timeit.timeit(encode, number=NUMBER) / NUMBER
+            total[1] += timeit.timeit(decode, number=NUMBER) / NUMBER
+
+    print("Mean time per command schema, schemas shared by versions counted once")
+
+    for (kind, mode), (encode, decode) in sorted(totals.items()):
+        count = counts[kind]
+        print(
+            f"{kind:<10} ({count:>3} schemas) {mode:<9}"
+            f" encode {1_000_000 * encode / count:>6.2f} us"
+            f"  decode {1_000_000 * decode / count:>6.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
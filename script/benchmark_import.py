@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Measure how long importing bellows takes, using `python -X importtime`.
+
+Each statement runs in a fresh interpreter. The cumulative import time of its
+modules and the time spent importing EZSP protocol version modules are reported,
+as the median of several runs.
+
+Run from the repository root: `python script/benchmark_import.py`
+"""
+
+from __future__ import annotations
+
+import re
+import statistics
+import subprocess
+import sys
+
+RUNS = 7
+STATEMENTS = [
+    "import bellows.ezsp",
+    "import bellows.ezsp; bellows.ezsp.EZSP._BY_VERSION[14]",
+    "import bellows.cli.main",
+    "import bellows.zigbee.application",
+]
+
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+VERSION_MODULE = re.compile(r"bellows\.ezsp\.v\d+(\.|$)")
+
+
+def _measure(statement: str) -> tuple[float, float, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total = 0
+    versions = 0
+    version_modules = set()
+
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+
+        if match is None:
+            continue
+
+        self_us, cumulative_us, indent, module = match.groups()
+
+        # Top level imports include the time of everything they import
+        if len(indent) == 1:
+            total += int(cumulative_us)
+
+        if VERSION_MODULE.match(module):
+            versions += int(self_us)
+            version_modules.add(module.split(".")[2])
+
+    return total / 1000, versions / 1000, len(version_modules)
+
+
+def main() -> None:
+    print(f"Median of {RUNS} runs")
+
+    for statement in STATEMENTS:
+        runs = [_measure(statement) for _ in range(RUNS)]
+        total = statistics.median(run[0] for run in runs)
+        versions = statistics.median(run[1] for run in runs)
+        count = runs[0][2]
+
+        print(
+            f"{statement:<56} total {total:>7.1f} ms"
+            f"  protocol versions ({count:>2}) {versions:>6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Compare the serial I/O thread with the serial I/O worker process.
+
+A simulated NCP answers every EZSP frame over a pty pair. The round trip time from
+`send_data` until the response reaches the application is measured, with an idle
+application event loop and with one that is kept busy with pure Python work.
+
+Linux only. Run from the repository root: `python script/benchmark_process.py`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+import zigpy.config
+
+from bellows import ash, config
+import bellows.types as t
+import bellows.uart
+
+NUM_FRAMES = 1_000
+PAYLOAD = bytes(range(40))
+
+
+class SimulatedNcp(threading.Thread):
+    """Reply to every DATA frame with an ACK and a DATA frame of the same payload."""
+
+    def __init__(self, controller: int) -> None:
+        super().__init__(daemon=True)
+        self._controller = controller
+        self._frm_num = 0
+
+    def _write(self, *frames: ash.AshFrame) -> None:
+        os.write(
+            self._controller,
+            b"".join([ash.stuff_bytes(f.to_bytes()) + b"\x7E" for f in frames]),
+        )
+
+    def _frame_received(self, frame: ash.AshFrame) -> None:
+        if isinstance(frame, ash.RstFrame):
+            self._frm_num = 0
+            self._write(
+                ash.RStackFrame(version=2, reset_code=t.NcpResetCode.RESET_SOFTWARE)
+            )
+        elif isinstance(frame, ash.DataFrame):
+            ack_num = (frame.frm_num + 1) % 8
+            self._write(
+                ash.AckFrame(res=0, ncp_ready=0, ack_num=ack_num),
+                ash.DataFrame(
+                    frm_num=self._frm_num,
+                    re_tx=False,
+                    ack_num=ack_num,
+                    ezsp_frame=frame.ezsp_frame,
+                ),
+            )
+            self._frm_num = (self._frm_num + 1) % 8
+
+    def run(self) -> None:
+        buffer = b""
+
+        while True:
+            try:
+                buffer += os.read(self._controller, 4096)
+            except OSError:
+                return
+
+            *chunks, buffer = buffer.split(b"\x7E")
+
+            for chunk in chunks:
+                chunk = chunk.split(b"\x1A")[-1]
+
+                try:
+                    frame = ash.parse_frame(ash.unstuff_bytes(chunk))
+                except Exception:
+                    continue
+
+                self._frame_received(frame)
+
+
+class Application:
+    def __init__(self) -> None:
+        self.received: asyncio.Future | None = None
+
+    def frame_received(self, data: bytes) -> None:
+        if self.received is not None and not self.received.done():
+            self.received.set_result(data)
+
+    def enter_failed_state(self, code: t.NcpResetCode) -> None:
+        pass
+
+    def connection_lost(self, exc: Exception) -> None:
+        pass
+
+
+async def _busy_application() -> None:
+    """Keep the event loop busy, yielding every millisecond."""
+    while True:
+        start = time.perf_counter()
+
+        while time.perf_counter() - start < 0.001:
+            pass
+
+        await asyncio.sleep(0)
+
+
+async def benchmark_mode(name: str, device_config: dict, busy: bool) -> None:
+    controller, port = os.openpty()
+    ncp = SimulatedNcp(controller)
+    ncp.start()
+
+    app = Application()
+    gw = await bellows.uart.connect(
+        config.SCHEMA_DEVICE(
+            {
+                zigpy.config.CONF_DEVICE_PATH: os.ttyname(port),
+                zigpy.config.CONF_DEVICE_BAUDRATE: 115200,
+                **device_config,
+            }
+        ),
+        app,
+        use_thread=True,
+    )
+    await gw.reset()
+
+    busy_task = asyncio.create_task(_busy_application()) if busy else None
+    loop = asyncio.get_running_loop()
+    latencies = []
+
+    cpu_start = time.process_time()
+
+    for _ in range(NUM_FRAMES):
+        app.received = loop.create_future()
+        start = time.perf_counter()
+        await gw.send_data(PAYLOAD)
+        await app.received
+        latencies.append(time.perf_counter() - start)
+
+    cpu = time.process_time() - cpu_start
+
+    if busy_task is not None:
+        busy_task.cancel()
+
+    gw.close()
+    await asyncio.sleep(0.2)
+    os.close(controller)
+    os.close(port)
+
+    latencies.sort()
+    print(
+        f"{name:<8} {'busy' if busy else 'idle'} application:"
+        f" round trip median {1_000 * statistics.median(latencies):>6.2f} ms"
+        f" p99 {1_000 * latencies[int(0.99 * len(latencies))]:>6.2f} ms"
+        f" | main process cpu {1_000_000 * cpu / NUM_FRAMES:>7.1f} us/frame"
+    )
+
+
+async def main() -> None:
+    for busy in (False, True):
+        for name, device_config in [
+            ("thread", {}),
+            ("process", {config.CONF_IO_PROCESS: True}),
+        ]:
+            await benchmark_mode(name, device_config, busy)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Compare frame-receive latency and CPU usage of the serial I/O modes.
+
+A pty pair stands in for the serial port. Frames are written to one end by a
+separate thread and the time until the main event loop sees them is measured for:
+
+ - same loop: pyserial-asyncio running on the main event loop
+ - event loop thread: pyserial-asyncio on a second event loop (`use_thread=True`)
+ - reader thread: a blocking reader thread (`serial_reader_thread: true`)
+
+Linux only. Run from the repository root: `python script/benchmark_serial.py`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+import zigpy.serial
+
+from bellows import ash, serial_thread
+from bellows.thread import EventLoopThread, ThreadsafeProxy
+
+NUM_FRAMES = 2_000
+FRAME = (
+    ash.stuff_bytes(
+        ash.DataFrame(
+            frm_num=0, re_tx=False, ack_num=0, ezsp_frame=bytes(range(40))
+        ).to_bytes()
+    )
+    + b"\x7E"
+)
+
+
+class Receiver(asyncio.Protocol):
+    """Count frames on the main event loop and wake up the writer thread."""
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.received = threading.Event()
+
+    def data_received(self, data: bytes) -> None:
+        self.frames += data.count(b"\x7E")
+        self.received.set()
+
+
+class Forwarder(asyncio.Protocol):
+    """Forward data from the serial event loop to the main event loop."""
+
+    def __init__(self, receiver: ThreadsafeProxy) -> None:
+        self._receiver = receiver
+
+    def data_received(self, data: bytes) -> None:
+        self._receiver.data_received(data)
+
+
+async def open_same_loop(path: str, receiver: Receiver):
+    transport, _ = await zigpy.serial.create_serial_connection(
+        asyncio.get_running_loop(), lambda: receiver, url=path, baudrate=115200
+    )
+
+    async def close():
+        transport.close()
+
+    return close
+
+
+async def open_event_loop_thread(path: str, receiver: Receiver):
+    proxy = ThreadsafeProxy(receiver, asyncio.get_running_loop())
+    thread = EventLoopThread()
+    await thread.start()
+
+    async def connect():
+        return await zigpy.serial.create_serial_connection(
+            asyncio.get_running_loop(),
+            lambda: Forwarder(proxy),
+            url=path,
+            baudrate=115200,
+        )
+
+    transport, _ = await thread.run_coroutine_threadsafe(connect())
+
+    async def close():
+        thread.loop.call_soon_threadsafe(transport.close)
+        await asyncio.sleep(0.1)
+        thread.force_stop()
+
+    return close
+
+
+async def open_reader_thread(path: str, receiver: Receiver):
+    transport, _ = await serial_thread.create_serial_connection(
+        asyncio.get_running_loop(),
+        lambda: receiver,
+        path,
+        baudrate=115200,
+        xonxoff=False,
+        rtscts=False,
+    )
+
+    async def close():
+        transport.close()
+
+    return close
+
+
+def _ping(controller: int, receiver: Receiver, latencies: list[float]) -> None:
+    """Write frames one at a time, waiting for each to be received."""
+    for _ in range(NUM_FRAMES):
+        receiver.received.clear()
+        start = time.perf_counter()
+        os.write(controller, FRAME)
+        receiver.received.wait(1)
+        latencies.append(time.perf_counter() - start)
+
+
+def _burst(controller: int) -> None:
+    """Write frames as quickly as the pty accepts them."""
+    for _ in range(NUM_FRAMES):
+        os.write(controller, FRAME)
+
+
+async def benchmark_mode(name: str, open_mode) -> None:
+    controller, port = os.openpty()
+    receiver = Receiver()
+    close = await open_mode(os.ttyname(port), receiver)
+    loop = asyncio.get_running_loop()
+
+    try:
+        latencies: list[float] = []
+        cpu_start = time.process_time()
+        await loop.run_in_executor(None, _ping, controller, receiver, latencies)
+        ping_cpu = time.process_time() - cpu_start
+
+        receiver.frames = 0
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        await loop.run_in_executor(None, _burst, controller)
+
+        while receiver.frames < NUM_FRAMES:
+            await asyncio.sleep(0.001)
+
+        burst_elapsed = time.perf_counter() - start
+        burst_cpu = time.process_time() - cpu_start
+    finally:
+        await close()
+        os.close(controller)
+        os.close(port)
+
+    latencies.sort()
+    print(
+        f"{name:<18}"
+        f" latency median {1_000_000 * statistics.median(latencies):>7.1f} us"
+        f" p99 {1_000_000 * latencies[int(0.99 * len(latencies))]:>7.1f} us"
+        f" cpu {1_000_000 * ping_cpu / NUM_FRAMES:>6.1f} us/frame |"
+        f" burst {NUM_FRAMES / burst_elapsed:>8.0f} frames/s"
+        f" cpu {1_000_000 * burst_cpu / NUM_FRAMES:>6.1f} us/frame"
+    )
+
+
+async def main() -> None:
+    for name, open_mode in [
+        ("same loop", open_same_loop),
+        ("event loop thread", open_event_loop_thread),
+        ("reader thread", open_reader_thread),
+    ]:
+        await benchmark_mode(name, open_mode)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
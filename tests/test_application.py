@@ -102,6 +102,7 @@ def _create_app_for_startup(
     app._in_flight_msg = None
 
     gateway = AsyncMock()
+    gateway.get_ash_statistics.return_value = {}
     ezsp_mock = ezsp.EZSP(device_config={})
     ezsp_mock._gw = gateway
     ezsp_mock._ezsp_version = ezsp_version
@@ -1875,3 +1876,45 @@ async def test_write_network_info(
             )
         )
     ]
+
+
+async def test_ash_counters(app):
+    from bellows.zigbee import application
+
+    app._ezsp._gw.get_ash_statistics.return_value = {
+        "frames_rx": 10,
+        application.COUNTER_ASH_T_RX_ACK: 1600,
+    }
+    await app._watchdog_feed()
+
+    counters = app.state.counters[application.COUNTERS_ASH]
+    assert counters["frames_rx"] == 10
+    assert counters[application.COUNTER_ASH_T_RX_ACK] == 1600
+
+    # The ACK timeout can decrease without counting as a reset
+    app._ezsp._gw.get_ash_statistics.return_value = {
+        "frames_rx": 12,
+        application.COUNTER_ASH_T_RX_ACK: 400,
+    }
+    await app._watchdog_feed()
+
+    assert counters["frames_rx"] == 12
+    assert counters[application.COUNTER_ASH_T_RX_ACK] == 400
+    assert counters[application.COUNTER_ASH_T_RX_ACK].reset_count == 0
+
+
+async def test_ezsp_frame_counters(app):
+    from bellows.zigbee import application
+
+    statistics = app._ezsp.statistics
+    statistics["nop"].tx_count = 2
+    statistics["incomingMessageHandler"].rx_bytes = 100
+    await app._watchdog_feed()
+
+    counters = app.state.counters[application.COUNTERS_EZSP_FRAMES]
+    assert counters["nop"]["tx_count"] == 2
+    assert counters["incomingMessageHandler"]["rx_bytes"] == 100
+
+    statistics["nop"].tx_count = 5
+    await app._watchdog_feed()
+    assert counters["nop"]["tx_count"] == 5
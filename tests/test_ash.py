@@ -147,6 +147,39 @@ def test_parse_frame_failure() -> None:
         ash.parse_frame(b"test")
 
 
+def test_frame_type_table() -> None:
+    for control_byte, frame_type in enumerate(ash.FRAME_TYPES_BY_CONTROL_BYTE):
+        matching = [
+            cls
+            for cls in [
+                ash.DataFrame,
+                ash.AckFrame,
+                ash.NakFrame,
+                ash.RstFrame,
+                ash.RStackFrame,
+                ash.ErrorFrame,
+            ]
+            if control_byte & cls.MASK == cls.MASK_VALUE
+        ]
+
+        assert matching[:1] == ([frame_type] if frame_type is not None else [])
+
+
+def test_interned_frames() -> None:
+    ack = ash.AckFrame(res=0, ncp_ready=1, ack_num=5)
+    nak = ash.NakFrame(res=0, ncp_ready=0, ack_num=3)
+
+    assert ash.parse_frame(ack.to_bytes()) == ack
+    assert ash.parse_frame(ack.to_bytes()) is ash.parse_frame(ack.to_bytes())
+    assert ash.parse_frame(nak.to_bytes()) is ash.parse_frame(nak.to_bytes())
+
+    # Frames are lightweight
+    assert not hasattr(ack, "__dict__")
+    assert not hasattr(
+        ash.DataFrame(frm_num=0, re_tx=False, ack_num=0, ezsp_frame=b""), "__dict__"
+    )
+
+
 def test_ash_protocol_event_propagation() -> None:
     ezsp = MagicMock()
     protocol = ash.AshProtocol(ezsp)
@@ -182,6 +215,79 @@ def test_stuffing():
         assert ash.AshProtocol._unstuff_bytes(b"\x7D\xAB")
 
 
+def _reference_stuff_bytes(data: bytes) -> bytes:
+    out = bytearray()
+
+    for c in data:
+        if c in ash.RESERVED_BYTES:
+            out.extend([ash.Reserved.ESCAPE, c ^ 0b00100000])
+        else:
+            out.append(c)
+
+    return out
+
+
+def _reference_unstuff_bytes(data: bytes) -> bytes:
+    out = bytearray()
+    escaped = False
+
+    for c in data:
+        if escaped:
+            byte = c ^ 0b00100000
+            if byte not in ash.RESERVED_BYTES:
+                raise ash.ParsingError(f"Invalid escaped byte: 0x{byte:02X}")
+
+            out.append(byte)
+            escaped = False
+        elif c == ash.Reserved.ESCAPE:
+            escaped = True
+        else:
+            out.append(c)
+
+    return out
+
+
+def _reference_randomize(data: bytes) -> bytes:
+    return bytes([a ^ b for a, b in zip(data, ash.PSEUDO_RANDOM_DATA_SEQUENCE)])
+
+
+def test_codec_differential():
+    random.seed(0)
+
+    # Bias the alphabet towards reserved bytes to exercise every escaping branch
+    alphabet = list(range(256)) + 20 * list(ash.RESERVED_BYTES)
+
+    for _ in range(2000):
+        data = bytes(random.choices(alphabet, k=random.randint(0, 256)))
+
+        assert ash.stuff_bytes(data) == _reference_stuff_bytes(data)
+        assert ash.unstuff_bytes(ash.stuff_bytes(data)) == data
+        assert ash.randomize(data) == _reference_randomize(data)
+        assert ash.randomize(ash.randomize(data)) == data
+
+        # Unstuffing arbitrary data must fail in exactly the same way
+        try:
+            expected = _reference_unstuff_bytes(data)
+        except ash.ParsingError as exc:
+            with pytest.raises(ash.ParsingError, match=str(exc)):
+                ash.unstuff_bytes(data)
+        else:
+            assert ash.unstuff_bytes(data) == expected
+
+
+def test_unstuffing_escape_edge_cases():
+    # A trailing escape byte is ignored
+    assert ash.unstuff_bytes(b"\x7D") == b""
+    assert ash.unstuff_bytes(b"\xAA\x7D\x5E\x7D") == b"\xAA\x7E"
+
+    # An escaped escape byte is invalid
+    with pytest.raises(ash.ParsingError, match="Invalid escaped byte: 0x5D"):
+        ash.unstuff_bytes(b"\xAA\x7D\x7D")
+
+    with pytest.raises(ash.ParsingError, match="Invalid escaped byte: 0x5D"):
+        ash.unstuff_bytes(b"\x7D\x7D\x5E")
+
+
 def test_pseudo_random_data_sequence():
     assert ash.PSEUDO_RANDOM_DATA_SEQUENCE.startswith(b"\x42\x21\xA8\x54\x2A")
 
@@ -270,7 +376,7 @@ def test_substitute_byte():
     assert not protocol._buffer
 
 
-def test_xon_xoff_bytes():
+async def test_xon_xoff_bytes():
     ezsp = MagicMock()
     protocol = ash.AshProtocol(ezsp)
     protocol.frame_received = MagicMock(wraps=protocol.frame_received)
@@ -316,7 +422,47 @@ def test_buffer_growth():
         protocol.data_received(b"\xEE" * 100)
 
     # Make sure our internal buffer doesn't blow up
-    assert len(protocol._buffer) == ash.MAX_BUFFER_SIZE
+    assert len(protocol._buffer) <= ash.MAX_BUFFER_SIZE
+
+
+def test_buffer_overflow_resync():
+    ezsp = MagicMock()
+    protocol = ash.AshProtocol(ezsp)
+    protocol.frame_received = MagicMock(wraps=protocol.frame_received)
+
+    # Garbage without a frame boundary overflows the buffer
+    protocol.data_received(b"\xEE" * (ash.MAX_BUFFER_SIZE + 1))
+    assert not protocol._buffer
+
+    # The tail end of the garbage is not mistaken for the start of a frame
+    protocol.data_received(bytes.fromhex("eeee c0 38bc 7e"))
+    assert protocol.frame_received.mock_calls == []
+
+    protocol.data_received(bytes.fromhex("c0 38bc 7e"))
+    assert protocol.frame_received.mock_calls == [call(ash.RstFrame())]
+
+
+def test_large_burst_of_frames():
+    ezsp = MagicMock()
+    protocol = ash.AshProtocol(ezsp)
+    protocol.frame_received = MagicMock(spec_set=protocol.frame_received)
+
+    frames = [
+        ash.DataFrame(frm_num=i % 8, re_tx=0, ack_num=0, ezsp_frame=bytes([i] * 20))
+        for i in range(200)
+    ]
+    data = b"".join(
+        [ash.AshProtocol._stuff_bytes(f.to_bytes()) + b"\x7E" for f in frames]
+    )
+
+    # A single chunk of many frames much larger than the maximum buffer size is fully
+    # parsed, as are frames split across chunks
+    assert len(data) > ash.MAX_BUFFER_SIZE
+    protocol.data_received(data[:-10])
+    protocol.data_received(data[-10:])
+
+    assert protocol.frame_received.mock_calls == [call(f) for f in frames]
+    assert not protocol._buffer
 
 
 async def test_sequence():
@@ -376,6 +522,180 @@ async def test_sequence():
         await protocol.send_data(b"tx 2")
 
 
+def test_invalid_tx_window() -> None:
+    with pytest.raises(ValueError):
+        ash.AshProtocol(MagicMock(), tx_k=0)
+
+    with pytest.raises(ValueError):
+        ash.AshProtocol(MagicMock(), tx_k=ash.MAX_TX_K + 1)
+
+
+async def test_sliding_window_cumulative_ack() -> None:
+    ezsp = MagicMock()
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(ezsp, tx_k=3)
+    protocol._write_frame = MagicMock(wraps=protocol._write_frame)
+    protocol.connection_made(transport)
+
+    send_tasks = [
+        asyncio.create_task(protocol.send_data(f"tx {i}".encode())) for i in range(4)
+    ]
+    await asyncio.sleep(0.01)
+
+    # Three frames are sent without waiting for an ACK, the fourth has to wait
+    assert protocol._write_frame.mock_calls == [
+        call(ash.DataFrame(frm_num=0, re_tx=False, ack_num=0, ezsp_frame=b"tx 0")),
+        call(ash.DataFrame(frm_num=1, re_tx=False, ack_num=0, ezsp_frame=b"tx 1")),
+        call(ash.DataFrame(frm_num=2, re_tx=False, ack_num=0, ezsp_frame=b"tx 2")),
+    ]
+    assert list(protocol._pending_data_frames) == [0, 1, 2]
+
+    # A stale ACK does not acknowledge anything
+    protocol.frame_received(ash.AckFrame(res=0, ncp_ready=0, ack_num=7))
+    await asyncio.sleep(0.01)
+    assert not any(task.done() for task in send_tasks)
+
+    # A single ACK acknowledges the first two frames
+    protocol._write_frame.reset_mock()
+    protocol.frame_received(ash.AckFrame(res=0, ncp_ready=0, ack_num=2))
+    await asyncio.sleep(0.01)
+
+    assert send_tasks[0].done()
+    assert send_tasks[1].done()
+    assert not send_tasks[2].done()
+    assert protocol._write_frame.mock_calls == [
+        call(ash.DataFrame(frm_num=3, re_tx=False, ack_num=0, ezsp_frame=b"tx 3")),
+    ]
+
+    protocol.frame_received(ash.AckFrame(res=0, ncp_ready=0, ack_num=4))
+    await asyncio.gather(*send_tasks)
+
+    assert protocol._tx_seq == 4
+    assert not protocol._pending_data_frames
+
+
+async def test_sliding_window_nak_fallback() -> None:
+    ezsp = MagicMock()
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(ezsp, tx_k=3)
+    protocol._write_frame = MagicMock(wraps=protocol._write_frame)
+    protocol.connection_made(transport)
+
+    send_tasks = [
+        asyncio.create_task(protocol.send_data(f"tx {i}".encode())) for i in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    first_sends = protocol._write_frame.mock_calls[:]
+    protocol._write_frame.reset_mock()
+
+    # The NCP received the first frame but rejects the rest
+    protocol.frame_received(ash.NakFrame(res=0, ncp_ready=0, ack_num=1))
+    await asyncio.sleep(0.01)
+
+    # Only the unacknowledged frames are retransmitted
+    assert send_tasks[0].done()
+    assert protocol._write_frame.mock_calls == [
+        call(ash.DataFrame(frm_num=1, re_tx=True, ack_num=0, ezsp_frame=b"tx 1")),
+        call(ash.DataFrame(frm_num=2, re_tx=True, ack_num=0, ezsp_frame=b"tx 2")),
+    ]
+
+    # Retransmitted frames are updated in place
+    assert protocol._write_frame.mock_calls[0].args[0] is first_sends[1].args[0]
+
+    # And we fall back to a window of one frame
+    assert protocol._send_data_frame_semaphore.max_value == 1
+
+    protocol.frame_received(ash.AckFrame(res=0, ncp_ready=0, ack_num=3))
+    await asyncio.gather(*send_tasks)
+
+    # A reset restores the configured window size
+    protocol.frame_received(
+        ash.RStackFrame(version=2, reset_code=t.NcpResetCode.RESET_SOFTWARE)
+    )
+    assert protocol._send_data_frame_semaphore.max_value == 3
+
+
+async def test_delayed_ack() -> None:
+    ezsp = MagicMock()
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(ezsp, ack_delay=0.01)
+    protocol._write_frame = MagicMock(wraps=protocol._write_frame)
+    protocol.connection_made(transport)
+
+    # A burst of DATA frames is not immediately acknowledged
+    for frm_num in range(3):
+        protocol.frame_received(
+            ash.DataFrame(frm_num=frm_num, re_tx=False, ack_num=0, ezsp_frame=b"rx")
+        )
+
+    assert protocol._write_frame.mock_calls == []
+    assert ezsp.data_received.mock_calls == [call(b"rx")] * 3
+
+    # A single cumulative ACK is sent for all of them
+    await asyncio.sleep(0.02)
+    assert protocol._write_frame.mock_calls == [
+        call(ash.AckFrame(res=0, ncp_ready=0, ack_num=3))
+    ]
+    assert protocol._rx_seq == 3
+
+    # Out of sequence frames are still immediately NAKed
+    protocol._write_frame.reset_mock()
+    protocol.frame_received(
+        ash.DataFrame(frm_num=5, re_tx=False, ack_num=0, ezsp_frame=b"rx")
+    )
+    assert protocol._write_frame.mock_calls == [
+        call(ash.NakFrame(res=0, ncp_ready=0, ack_num=3))
+    ]
+
+    # Retransmitted frames are still immediately ACKed
+    protocol._write_frame.reset_mock()
+    protocol.frame_received(
+        ash.DataFrame(frm_num=2, re_tx=True, ack_num=0, ezsp_frame=b"rx")
+    )
+    assert protocol._write_frame.mock_calls == [
+        call(ash.AckFrame(res=0, ncp_ready=0, ack_num=3))
+    ]
+
+
+async def test_delayed_ack_piggybacked() -> None:
+    ezsp = MagicMock()
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(ezsp, ack_delay=0.01)
+    protocol._write_frame = MagicMock(wraps=protocol._write_frame)
+    protocol.connection_made(transport)
+
+    protocol.frame_received(
+        ash.DataFrame(frm_num=0, re_tx=False, ack_num=0, ezsp_frame=b"rx")
+    )
+
+    # The outgoing DATA frame carries the acknowledgement
+    send_task = asyncio.create_task(protocol.send_data(b"tx"))
+    await asyncio.sleep(0.02)
+
+    assert protocol._write_frame.mock_calls == [
+        call(ash.DataFrame(frm_num=0, re_tx=False, ack_num=1, ezsp_frame=b"tx"))
+    ]
+
+    protocol.frame_received(ash.AckFrame(res=0, ncp_ready=0, ack_num=1))
+    await send_task
+
+    # The delayed ACK is discarded when the connection is closed
+    protocol.frame_received(
+        ash.DataFrame(frm_num=1, re_tx=False, ack_num=1, ezsp_frame=b"rx")
+    )
+    assert protocol._delayed_ack_handle is not None
+    protocol.close()
+    assert protocol._delayed_ack_handle is None
+
+
 async def test_frame_parsing_failure_recovery(caplog) -> None:
     ezsp = MagicMock()
     protocol = ash.AshProtocol(ezsp)
@@ -438,7 +758,7 @@ async def test_ash_protocol_startup(caplog):
 
     assert ezsp.reset_received.mock_calls == [call(t.NcpResetCode.RESET_SOFTWARE)]
     assert protocol._write_frame.mock_calls == [
-        call(ash.RstFrame(), prefix=(ash.Reserved.CANCEL,))
+        call(ash.RstFrame(), prefix=(ash.Reserved.CANCEL,), flush=True)
     ]
 
     protocol._write_frame.reset_mock()
@@ -500,14 +820,18 @@ async def test_ash_protocol_startup(caplog):
         FakeTransportWithDelays,
     ],
 )
-async def test_ash_end_to_end(transport_cls: type[FakeTransport]) -> None:
+@pytest.mark.parametrize("tx_k", [1, 3])
+@pytest.mark.parametrize("ack_delay", [0, ash.T_TX_ACK_DELAY / 1000])
+async def test_ash_end_to_end(
+    transport_cls: type[FakeTransport], tx_k: int, ack_delay: float
+) -> None:
     random.seed(2)
 
     host_ezsp = MagicMock()
     ncp_ezsp = MagicMock()
 
-    host = ash.AshProtocol(host_ezsp)
-    ncp = AshNcpProtocol(ncp_ezsp)
+    host = ash.AshProtocol(host_ezsp, tx_k=tx_k, ack_delay=ack_delay)
+    ncp = AshNcpProtocol(ncp_ezsp, tx_k=tx_k, ack_delay=ack_delay)
 
     host_transport = transport_cls(ncp)
     ncp_transport = transport_cls(host)
@@ -543,11 +867,8 @@ async def test_ash_end_to_end(transport_cls: type[FakeTransport]) -> None:
 
     # Let's let a request fail due to a connectivity issue
     with patch.object(ncp_transport, "paused", True):
-        send_task = asyncio.create_task(host.send_data(b"host failure"))
-        await asyncio.sleep(host._t_rx_ack * 15)
-
-    with pytest.raises(asyncio.TimeoutError):
-        await send_task
+        with pytest.raises(asyncio.TimeoutError):
+            await host.send_data(b"host failure")
 
     ncp_ezsp.data_received.reset_mock()
     host_ezsp.data_received.reset_mock()
@@ -569,11 +890,11 @@ async def test_ash_end_to_end(transport_cls: type[FakeTransport]) -> None:
     assert ncp._ncp_reset_code is None
 
     with patch.object(host_transport, "paused", True):
-        send_task = asyncio.create_task(ncp.send_data(b"ncp failure"))
-        await asyncio.sleep(ncp._t_rx_ack * 15)
+        with pytest.raises(asyncio.TimeoutError):
+            await ncp.send_data(b"ncp failure")
 
-    with pytest.raises(asyncio.TimeoutError):
-        await send_task
+    # The NCP informs the host with an ERROR frame
+    await asyncio.sleep(0.01)
 
     assert (
         host._ncp_reset_code is t.NcpResetCode.ERROR_EXCEEDED_MAXIMUM_ACK_TIMEOUT_COUNT
@@ -589,14 +910,351 @@ async def test_ash_end_to_end(transport_cls: type[FakeTransport]) -> None:
     with pytest.raises(ash.NcpFailure):
         await host.send_data(b"test")
 
-    host.send_reset()
-    await asyncio.sleep(0.01)
+    # The RST frame itself can be lost
+    while host._ncp_state != ash.NcpState.CONNECTED:
+        host.send_reset()
+        await asyncio.sleep(0.01)
+
     await host.send_data(b"test")
 
-    # Trigger a failure caused by excessive NAKs
-    ncp._t_rx_ack = ash.T_RX_ACK_INIT / 1000
-    host._t_rx_ack = ash.T_RX_ACK_INIT / 1000
+    # Trigger a failure caused by excessive NAKs, which arrive before the ACK timeout
+    ncp._t_rx_ack = ash.T_RX_ACK_MIN
+    host._t_rx_ack = ash.T_RX_ACK_MAX
 
     with patch.object(ncp, "nak_state", True):
         with pytest.raises(ash.NotAcked):
             await host.send_data(b"ncp NAKing until failure")
+
+
+async def test_write_coalescing() -> None:
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(MagicMock())
+    protocol.connection_made(transport)
+
+    frames = [
+        ash.AckFrame(res=0, ncp_ready=0, ack_num=1),
+        ash.NakFrame(res=0, ncp_ready=0, ack_num=2),
+        ash.DataFrame(frm_num=0, re_tx=False, ack_num=2, ezsp_frame=b"\x7e\x11"),
+    ]
+
+    for frame in frames:
+        protocol._write_frame(frame)
+
+    # Nothing is written until the event loop gets a chance to run
+    assert transport.write.mock_calls == []
+
+    await asyncio.sleep(0)
+
+    assert transport.write.mock_calls == [
+        call(
+            b"".join(
+                [ash.AshProtocol._stuff_bytes(f.to_bytes()) + b"\x7E" for f in frames]
+            )
+        )
+    ]
+
+    # Flushing sends anything already queued, in order
+    transport.write.reset_mock()
+    protocol._write_frame(frames[0])
+    protocol._write_frame(frames[1], prefix=(ash.Reserved.CANCEL,), flush=True)
+
+    assert transport.write.mock_calls == [
+        call(
+            ash.AshProtocol._stuff_bytes(frames[0].to_bytes())
+            + b"\x7E\x1A"
+            + ash.AshProtocol._stuff_bytes(frames[1].to_bytes())
+            + b"\x7E"
+        )
+    ]
+
+    # The scheduled flush has nothing left to do
+    transport.write.reset_mock()
+    await asyncio.sleep(0)
+    assert transport.write.mock_calls == []
+
+    # Pending data is written out before the transport is closed
+    protocol._write_frame(frames[0])
+    protocol.close()
+
+    assert transport.mock_calls[-2:] == [
+        call.write(ash.AshProtocol._stuff_bytes(frames[0].to_bytes()) + b"\x7E"),
+        call.close(),
+    ]
+
+
+async def test_xon_xoff_flow_control() -> None:
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(MagicMock())
+    protocol.connection_made(transport)
+
+    ack = ash.AckFrame(res=0, ncp_ready=0, ack_num=1)
+    ack_bytes = ash.AshProtocol._stuff_bytes(ack.to_bytes()) + b"\x7E"
+
+    # Frames written while paused are queued
+    protocol.data_received(bytes([ash.Reserved.XOFF]))
+    protocol._write_frame(ack)
+    protocol._write_frame(ack, flush=True)
+    await asyncio.sleep(0)
+
+    assert transport.write.mock_calls == []
+    assert protocol.stats.xoff_count == 1
+
+    # Repeated XOFF bytes do not count as a new pause
+    protocol.data_received(bytes([ash.Reserved.XOFF]))
+    assert protocol.stats.xoff_count == 1
+
+    # And are flushed at once when transmission resumes
+    await asyncio.sleep(0.01)
+    protocol.data_received(bytes([ash.Reserved.XON]))
+
+    assert transport.write.mock_calls == [call(ack_bytes + ack_bytes)]
+    assert protocol.stats.tx_paused_time >= 0.01
+    assert protocol.stats.xoff_timeouts == 0
+
+
+async def test_xoff_timeout() -> None:
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(MagicMock())
+    protocol.connection_made(transport)
+
+    ack = ash.AckFrame(res=0, ncp_ready=0, ack_num=1)
+
+    with patch("bellows.ash.T_XOFF_MAX", 0.01):
+        protocol.data_received(bytes([ash.Reserved.XOFF]))
+        protocol._write_frame(ack)
+
+        await asyncio.sleep(0)
+        assert transport.write.mock_calls == []
+
+        # A lost XON byte does not deadlock the link
+        await asyncio.sleep(0.02)
+
+    assert transport.write.mock_calls == [
+        call(ash.AshProtocol._stuff_bytes(ack.to_bytes()) + b"\x7E")
+    ]
+    assert protocol.stats.xoff_timeouts == 1
+
+
+async def test_xoff_delays_data_frame() -> None:
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(MagicMock())
+    protocol.connection_made(transport)
+    protocol._t_rx_ack = 0.05
+
+    protocol.data_received(bytes([ash.Reserved.XOFF]))
+    send_task = asyncio.create_task(protocol.send_data(b"test"))
+
+    # The ACK timer does not run while transmission is paused
+    await asyncio.sleep(0.1)
+    assert transport.write.mock_calls == []
+    assert not send_task.done()
+
+    protocol.data_received(bytes([ash.Reserved.XON]))
+    await asyncio.sleep(0.01)
+    assert len(transport.write.mock_calls) == 1
+
+    protocol.frame_received(ash.AckFrame(res=0, ncp_ready=0, ack_num=1))
+    await send_task
+
+
+async def test_host_not_ready() -> None:
+    protocol = ash.AshProtocol(MagicMock())
+    protocol._write_frame = MagicMock()
+    protocol._rx_seq = 3
+
+    # The NCP is told to hold onto callbacks
+    with patch("bellows.ash.T_REMOTE_NOTRDY", 0.02):
+        protocol.set_host_ready(False)
+        protocol.set_host_ready(False)
+
+        assert protocol._write_frame.mock_calls == [
+            call(ash.AckFrame(res=0, ncp_ready=1, ack_num=3))
+        ]
+
+        # All acknowledgements carry the flag
+        protocol.frame_received(
+            ash.DataFrame(frm_num=3, re_tx=False, ack_num=0, ezsp_frame=b"rx")
+        )
+        assert protocol._write_frame.mock_calls[-1] == call(
+            ash.AckFrame(res=0, ncp_ready=1, ack_num=4)
+        )
+
+        # And it is periodically repeated so the NCP does not resume on its own
+        protocol._write_frame.reset_mock()
+        await asyncio.sleep(0.015)
+
+    assert protocol._write_frame.mock_calls == [
+        call(ash.AckFrame(res=0, ncp_ready=1, ack_num=4))
+    ]
+
+    # Once the host is ready again, the NCP is notified immediately
+    protocol._write_frame.reset_mock()
+    protocol.set_host_ready(True)
+
+    assert protocol._write_frame.mock_calls == [
+        call(ash.AckFrame(res=0, ncp_ready=0, ack_num=4))
+    ]
+    assert protocol._host_not_ready_handle is None
+
+
+async def test_statistics() -> None:
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(MagicMock())
+    protocol.connection_made(transport)
+
+    rst_ack = bytes.fromhex("c1 02 0b 0a 52 7e")  # RSTACK frame
+    protocol.data_received(rst_ack)
+    protocol.data_received(bytes.fromhex("12 34 1a"))  # Cancelled data
+    protocol.data_received(bytes.fromhex("12 34 7e"))  # Corrupted frame
+    protocol.data_received(bytes.fromhex("12 18 34 7e"))  # Substituted data
+
+    assert protocol.stats.frames_rx == 1
+    assert protocol.stats.bytes_rx == len(rst_ack) + 3 + 3 + 4
+    assert protocol.stats.parse_failures == 1
+    assert protocol.stats.discarded_bytes == 2 + 2 + 2
+    assert protocol.stats.naks_tx == 1
+
+    # The NAK is sent for the corrupted frame
+    await asyncio.sleep(0)
+    assert protocol.stats.frames_tx == 1
+    assert protocol.stats.bytes_tx == len(transport.write.mock_calls[0].args[0])
+
+    # Acknowledgement round trip times are recorded
+    protocol.stats.record_rtt(0.001)
+    protocol.stats.record_rtt(0.01)
+    protocol.stats.record_rtt(0.3)
+    protocol.stats.record_rtt(5)
+
+    counters = protocol.stats.as_dict()
+    assert counters["rtt_le_5ms"] == 1
+    assert counters["rtt_le_10ms"] == 1
+    assert counters["rtt_le_500ms"] == 1
+    assert counters["rtt_gt_1000ms"] == 1
+    assert counters["t_rx_ack_ms"] == round(1000 * ash.T_RX_ACK_INIT)
+    assert counters["naks_tx"] == 1
+    assert all(isinstance(v, int) for v in counters.values())
+
+
+async def test_statistics_retransmit() -> None:
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+
+    protocol = ash.AshProtocol(MagicMock())
+    protocol.connection_made(transport)
+    protocol._t_rx_ack = 0.01
+
+    send_task = asyncio.create_task(protocol.send_data(b"test"))
+    await asyncio.sleep(0.015)
+    assert protocol.stats.ack_timeouts == 1
+    assert protocol.stats.retransmits == 1
+
+    protocol.frame_received(ash.NakFrame(res=0, ncp_ready=0, ack_num=0))
+    await asyncio.sleep(0.001)
+    assert protocol.stats.naks_rx == 1
+    assert protocol.stats.retransmits == 2
+
+    protocol.frame_received(ash.AckFrame(res=0, ncp_ready=0, ack_num=1))
+    await send_task
+
+    # Retransmitted frames do not produce RTT samples
+    assert sum(protocol.stats.rtt_histogram) == 0
+    assert protocol.stats.t_rx_ack == protocol._t_rx_ack
+
+
+def test_rtt_estimator() -> None:
+    protocol = ash.AshProtocol(MagicMock())
+    assert protocol._t_rx_ack == ash.T_RX_ACK_INIT
+
+    # The first sample initializes the estimator
+    protocol._update_rtt_estimator(0.1)
+    assert protocol._srtt == pytest.approx(0.1)
+    assert protocol._rttvar == pytest.approx(0.05)
+    assert protocol._t_rx_ack == pytest.approx(0.1 + 4 * 0.05)
+
+    # A stable, fast link converges near the real RTT
+    for _ in range(50):
+        protocol._update_rtt_estimator(0.01)
+
+    assert protocol._srtt == pytest.approx(0.01, abs=0.001)
+    assert protocol._t_rx_ack == pytest.approx(ash.T_RX_ACK_MIN)
+    assert protocol.stats.srtt == protocol._srtt
+    assert protocol.stats.as_dict()["srtt_ms"] == 10
+
+    # Jitter increases the timeout
+    protocol._update_rtt_estimator(0.2)
+    assert protocol._t_rx_ack == pytest.approx(protocol._srtt + 4 * protocol._rttvar)
+    assert protocol._t_rx_ack > 0.2
+
+    # Resetting the NCP resets the estimator
+    protocol._ezsp_protocol = MagicMock()
+    protocol.rstack_frame_received(
+        ash.RStackFrame(version=2, reset_code=t.NcpResetCode.RESET_SOFTWARE)
+    )
+    assert protocol._srtt is None
+    assert protocol._t_rx_ack == ash.T_RX_ACK_INIT
+
+
+async def test_ack_timeout_large_frames() -> None:
+    protocol = ash.AshProtocol(MagicMock(), baudrate=57600)
+
+    # The NCP takes 15ms to respond once it has received the whole frame
+    def write(data: bytes) -> None:
+        asyncio.get_running_loop().call_later(
+            0.015 + len(data) * ash.BITS_PER_BYTE / 57600,
+            protocol.frame_received,
+            ash.AckFrame(res=0, ncp_ready=0, ack_num=protocol._tx_seq),
+        )
+
+    transport = MagicMock()
+    transport.is_closing.return_value = False
+    transport.write.side_effect = write
+    protocol.connection_made(transport)
+
+    # Small frames bring the ACK timeout down to its minimum
+    for _ in range(5):
+        await protocol.send_data(b"small")
+
+    assert protocol._t_rx_ack == pytest.approx(ash.T_RX_ACK_MIN)
+
+    # Large frames take ~40ms to send at this baudrate and do not time out
+    for _ in range(3):
+        await protocol.send_data(bytes(220))
+        await protocol.send_data(b"small")
+
+    assert protocol.stats.ack_timeouts == 0
+    assert protocol.stats.retransmits == 0
+    assert protocol._t_rx_ack == pytest.approx(ash.T_RX_ACK_MIN)
+
+
+def test_stuffed_chunks() -> None:
+    random.seed(0)
+
+    frames = [
+        ash.RstFrame(),
+        ash.AckFrame(res=0, ncp_ready=1, ack_num=5),
+        ash.NakFrame(res=0, ncp_ready=0, ack_num=3),
+        ash.RStackFrame(version=2, reset_code=t.NcpResetCode.RESET_SOFTWARE),
+        # The control byte of this frame is a reserved byte
+        ash.DataFrame(frm_num=7, re_tx=True, ack_num=6, ezsp_frame=b"\x7e\x7d"),
+    ] + [
+        ash.DataFrame(
+            frm_num=random.randint(0, 7),
+            re_tx=random.choice([True, False]),
+            ack_num=random.randint(0, 7),
+            ezsp_frame=random.randbytes(random.randint(0, 200)),
+        )
+        for _ in range(500)
+    ]
+
+    for frame in frames:
+        assert b"".join(frame.to_stuffed_chunks()) == ash.stuff_bytes(frame.to_bytes())
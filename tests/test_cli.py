@@ -1,3 +1,33 @@
+import importlib
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
 import bellows.cli
+from bellows.cli.main import COMMAND_MODULES, main
 
 # Just being able to import is a small test..
+
+
+def test_lazy_commands():
+    code = (
+        "import sys, bellows.cli.main;"
+        "print(sorted(m for m in sys.modules if m.startswith('bellows.cli.')))"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    assert "bellows.cli.application" not in output
+    assert "bellows.cli.ncp" not in output
+
+    result = CliRunner().invoke(main, ["--help"])
+    assert result.exit_code == 0
+    assert all(name in result.output for name in COMMAND_MODULES)
+
+
+def test_command_modules():
+    # Every subcommand module registers exactly the commands it is mapped to
+    for module in set(COMMAND_MODULES.values()):
+        importlib.import_module(f"bellows.cli.{module}")
+
+    assert sorted(main.commands) == sorted(COMMAND_MODULES)
+    assert all(main.get_command(None, name) for name in COMMAND_MODULES)
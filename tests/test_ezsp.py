@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import functools
 import logging
+import subprocess
 import sys
 
 import pytest
@@ -80,6 +81,69 @@ async def test_reset(ezsp_f):
     assert len(ezsp_f._callbacks) == 1
 
 
+async def test_command_timeouts_config():
+    api = ezsp.EZSP(
+        {
+            **DEVICE_CONFIG,
+            config.CONF_EZSP_COMMAND_TIMEOUTS: {"formNetwork": 30},
+            config.CONF_EZSP_ADAPTIVE_TIMEOUTS: False,
+        }
+    )
+
+    with patch("bellows.uart.connect", new=AsyncMock(return_value=MagicMock())):
+        await api.connect()
+
+    # Command latency is kept across protocol versions
+    api._switch_protocol_version(8)
+    assert api._protocol._command_latency is api.command_latency
+    assert api._protocol._get_command_timeout("formNetwork") == 30
+    assert not api.command_latency.adaptive
+
+
+async def test_callback_polling():
+    api = ezsp.EZSP({**DEVICE_CONFIG, config.CONF_EZSP_CALLBACK_POLLING: True})
+    api._callback_poller = poller = MagicMock(wraps=api._callback_poller)
+
+    api.handle_callback("stackStatusHandler", [t.EmberStatus.NETWORK_UP])
+    assert poller.callback_received.call_count == 1
+
+    api.host_ready_changed(False)
+    assert poller.set_host_ready.mock_calls == [call(False)]
+
+    api.stop_ezsp()
+    assert poller.stop.call_count == 1
+
+    # Polling is disabled by default
+    assert ezsp.EZSP(DEVICE_CONFIG)._callback_poller is None
+
+
+async def test_response_cache_cleared(ezsp_f):
+    assert ezsp_f._protocol._response_cache is ezsp_f.response_cache
+
+    def fill_cache():
+        ezsp_f.response_cache.set(
+            ("getEui64", b""),
+            [t.EUI64.convert("00" * 8)],
+            ezsp_f._protocol._get_codec("getEui64"),
+        )
+
+    fill_cache()
+    ezsp_f._switch_protocol_version(8)
+    assert ezsp_f._protocol._response_cache is ezsp_f.response_cache
+    assert ezsp_f.response_cache.stats["size"] == 0
+
+    fill_cache()
+    ezsp_f.stop_ezsp = MagicMock()
+    ezsp_f.start_ezsp = MagicMock()
+    ezsp_f._gw.reset = AsyncMock()
+    await ezsp_f.reset()
+    assert ezsp_f.response_cache.stats["size"] == 0
+
+    fill_cache()
+    ezsp_f.enter_failed_state(sentinel.error)
+    assert ezsp_f.response_cache.stats["size"] == 0
+
+
 def test_close(ezsp_f):
     closed = False
 
@@ -111,6 +175,21 @@ async def test_command(ezsp_f):
     assert cmd_mock.call_count == 1
 
 
+async def test_command_lookup_cached(ezsp_f):
+    nop = ezsp_f.nop
+    assert ezsp_f.nop is nop
+
+    # Switching protocol versions looks commands up again
+    ezsp_f._switch_protocol_version(13)
+    assert ezsp_f.nop is not nop
+    assert ezsp_f.nop is ezsp_f.nop
+
+    ezsp_f.start_ezsp()
+    with patch.object(ezsp_f._protocol, "command") as cmd_mock:
+        await ezsp_f.nop()
+    assert cmd_mock.call_count == 1
+
+
 async def test_command_ezsp_stopped(ezsp_f):
     ezsp_f.stop_ezsp()
 
@@ -186,6 +265,19 @@ async def test_form_network_fail_stack_status(ezsp_f):
         await _test_form_network(ezsp_f, [t.EmberStatus.SUCCESS], b"\x00")
 
 
+async def test_max_command_concurrency():
+    api = ezsp.EZSP({**DEVICE_CONFIG, config.CONF_EZSP_MAX_CONCURRENCY: 3})
+    gw = MagicMock(spec_set=uart.Gateway)
+
+    with patch("bellows.uart.connect", new=AsyncMock(return_value=gw)):
+        await api.connect()
+
+    assert api._protocol._send_semaphore.max_value == 3
+
+    api._switch_protocol_version(8)
+    assert api._protocol._send_semaphore.max_value == 3
+
+
 def test_receive_new(ezsp_f):
     callback = MagicMock()
     ezsp_f.add_callback(callback)
@@ -193,6 +285,51 @@ def test_receive_new(ezsp_f):
     assert callback.call_count == 1
 
 
+def test_decode_frame(ezsp_f):
+    callback = MagicMock()
+    ezsp_f.add_callback(callback)
+
+    decoded = ezsp_f.decode_frame(b"\x00\xff\x00\x04\x05\x06\x00")
+    assert decoded == (ezsp_f._protocol, (0, 0x00, "version", [4, 5, 6]))
+    assert callback.call_args_list == []
+
+    ezsp_f.frame_decoded(b"\x00\xff\x00\x04\x05\x06\x00", decoded)
+    assert callback.call_args_list == [call("version", [4, 5, 6])]
+
+
+def test_decode_frame_invalid(ezsp_f, caplog):
+    ezsp_f.add_callback(MagicMock())
+    assert ezsp_f.decode_frame(b"") == (ezsp_f._protocol, None)
+
+    with caplog.at_level(logging.WARNING):
+        decoded = ezsp_f.decode_frame(b"\x00\xff\x00\x04")
+
+    assert decoded == (ezsp_f._protocol, None)
+    assert "Failed to parse frame" in caplog.text
+
+    # Nothing is dispatched
+    ezsp_f._protocol = MagicMock(wraps=ezsp_f._protocol)
+    ezsp_f.frame_decoded(b"\x00\xff\x00\x04", (ezsp_f._protocol, None))
+    assert ezsp_f._protocol.frame_decoded.mock_calls == []
+
+    ezsp_f._protocol = None
+    assert ezsp_f.decode_frame(b"\x00\xff\x00\x04\x05\x06\x00") == (None, None)
+
+
+def test_decode_frame_protocol_changed(ezsp_f):
+    callback = MagicMock()
+    ezsp_f.add_callback(callback)
+
+    # Decoded with the old protocol version
+    data = b"\x00\xff\x00\x04\x05\x06\x00"
+    decoded = (MagicMock(), (0, 0x00, "version", [1, 2, 3]))
+
+    # The frame is decoded again with the current protocol
+    ezsp_f.frame_decoded(data, decoded)
+    assert callback.call_args_list == [call("version", [4, 5, 6])]
+    assert decoded[0].frame_decoded.mock_calls == []
+
+
 def test_callback(ezsp_f):
     testcb = MagicMock()
 
@@ -222,6 +359,55 @@ def test_callback_multi(ezsp_f):
     testcb.assert_has_calls([call(1, 2, 3), call(1, 2, 3), call(4, 5, 6)])
 
 
+def test_callback_frame_names(ezsp_f):
+    status_cb = MagicMock()
+    any_cb = MagicMock()
+
+    status_id = ezsp_f.add_callback(status_cb, ["stackStatusHandler"])
+    assert not ezsp_f.has_callbacks("counterRolloverHandler")
+
+    ezsp_f.handle_callback("counterRolloverHandler", [1])
+    ezsp_f.handle_callback("stackStatusHandler", [2])
+    assert status_cb.call_args_list == [call("stackStatusHandler", [2])]
+
+    # Wildcard callbacks receive every frame
+    ezsp_f.add_callback(any_cb)
+    assert ezsp_f.has_callbacks("counterRolloverHandler")
+
+    ezsp_f.handle_callback("counterRolloverHandler", [3])
+    ezsp_f.handle_callback("stackStatusHandler", [4])
+    assert status_cb.call_args_list == [
+        call("stackStatusHandler", [2]),
+        call("stackStatusHandler", [4]),
+    ]
+    assert any_cb.call_args_list == [
+        call("counterRolloverHandler", [3]),
+        call("stackStatusHandler", [4]),
+    ]
+
+    ezsp_f.remove_callback(status_id)
+    ezsp_f.handle_callback("stackStatusHandler", [5])
+    assert len(status_cb.call_args_list) == 2
+    assert any_cb.call_args_list[-1] == call("stackStatusHandler", [5])
+
+
+def test_has_callbacks(ezsp_f):
+    assert ezsp_f._protocol._has_callbacks == ezsp_f.has_callbacks
+    assert ezsp_f.has_callbacks("stackStatusHandler")
+    assert not ezsp_f.has_callbacks("counterRolloverHandler")
+
+    cbid = ezsp_f.add_callback(MagicMock(), ["counterRolloverHandler"])
+    assert ezsp_f.has_callbacks("counterRolloverHandler")
+    assert not ezsp_f.has_callbacks("childJoinHandler")
+
+    wildcard = ezsp_f.add_callback(MagicMock())
+    assert ezsp_f.has_callbacks("childJoinHandler")
+
+    ezsp_f.remove_callback(wildcard)
+    ezsp_f.remove_callback(cbid)
+    assert not ezsp_f.has_callbacks("counterRolloverHandler")
+
+
 def test_callback_exc(ezsp_f):
     testcb = MagicMock()
     testcb.side_effect = Exception("Testing")
@@ -699,6 +885,26 @@ def test_ezsp_versions(ezsp_f):
         assert ezsp_f._BY_VERSION[version].__name__ == f"EZSPv{version}"
         assert ezsp_f._BY_VERSION[version].VERSION == version
 
+    assert list(ezsp_f._BY_VERSION) == list(range(4, ezsp.EZSP_LATEST + 1))
+    assert 3 not in ezsp_f._BY_VERSION
+    assert ezsp.EZSP_LATEST + 1 not in ezsp_f._BY_VERSION
+
+    with pytest.raises(KeyError):
+        ezsp_f._BY_VERSION[ezsp.EZSP_LATEST + 1]
+
+
+def test_ezsp_versions_lazy():
+    code = (
+        "import sys, bellows.ezsp;"
+        "print(sorted(m for m in sys.modules if m.startswith('bellows.ezsp.v')))"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+
+    # Only the bootstrap protocol version is imported
+    assert "bellows.ezsp.v4" in output
+    assert "bellows.ezsp.v5" not in output
+    assert "bellows.ezsp.v14" not in output
+
 
 async def test_config_initialize_husbzb1(ezsp_f):
     """Test timeouts are properly set for HUSBZB-1."""
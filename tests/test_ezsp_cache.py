@@ -0,0 +1,98 @@
+from unittest.mock import AsyncMock, MagicMock, call
+
+import pytest
+
+from bellows.ezsp.cache import ResponseCache
+import bellows.ezsp.v9
+from bellows.ezsp.v9.commands import GetTokenDataRsp
+import bellows.types as t
+
+
+@pytest.fixture
+def prot_hndl():
+    protocol = bellows.ezsp.v9.EZSPv9(
+        MagicMock(), MagicMock(), response_cache=ResponseCache()
+    )
+    protocol._command = AsyncMock(return_value=[t.EmberStatus.SUCCESS, 123])
+
+    return protocol
+
+
+async def test_cached_response(prot_hndl):
+    cache = prot_hndl._response_cache
+
+    config_id = t.EzspConfigId.CONFIG_ADDRESS_TABLE_SIZE
+    assert await prot_hndl.getConfigurationValue(config_id) == [
+        t.EmberStatus.SUCCESS,
+        123,
+    ]
+
+    # Arguments are compared once serialized
+    rsp = await prot_hndl.getConfigurationValue(configId=config_id)
+    assert rsp == [t.EmberStatus.SUCCESS, 123]
+    assert prot_hndl._command.mock_calls == [call("getConfigurationValue", config_id)]
+    assert cache.stats == {"hits": 1, "misses": 1, "size": 1}
+
+    # The cached response cannot be modified
+    rsp.append(456)
+    assert await prot_hndl.getConfigurationValue(config_id) == [
+        t.EmberStatus.SUCCESS,
+        123,
+    ]
+
+    # Other keys are not cached
+    await prot_hndl.getConfigurationValue(t.EzspConfigId.CONFIG_STACK_PROFILE)
+    await prot_hndl.getConfigurationValue(t.EzspConfigId.CONFIG_STACK_PROFILE)
+    await prot_hndl.nop()
+    assert len(prot_hndl._command.mock_calls) == 4
+    assert cache.stats == {"hits": 2, "misses": 1, "size": 1}
+
+
+async def test_cache_invalidation(prot_hndl):
+    cache = prot_hndl._response_cache
+
+    await prot_hndl.getEui64()
+    await prot_hndl.getMfgToken(t.EzspMfgTokenId.MFG_STRING)
+    await prot_hndl.getMfgToken(t.EzspMfgTokenId.MFG_BOARD_NAME)
+    assert cache.stats["size"] == 3
+
+    # Writing a token invalidates token reads
+    await prot_hndl.setMfgToken(t.EzspMfgTokenId.MFG_CUSTOM_EUI_64, b"test")
+    assert cache.stats["size"] == 1
+
+    await prot_hndl.getEui64()
+    assert cache.stats["hits"] == 1
+
+    # Resetting the NCP invalidates everything
+    await prot_hndl.resetNode()
+    assert cache.stats["size"] == 0
+
+    # Failed commands are not cached
+    prot_hndl._command.side_effect = RuntimeError()
+
+    with pytest.raises(RuntimeError):
+        await prot_hndl.getEui64()
+
+    assert cache.stats["size"] == 0
+
+
+async def test_unsuccessful_response_not_cached(prot_hndl):
+    cache = prot_hndl._response_cache
+    prot_hndl._command.return_value = [t.EzspStatus.ERROR_INVALID_ID, 0]
+
+    config_id = t.EzspConfigId.CONFIG_ADDRESS_TABLE_SIZE
+    await prot_hndl.getConfigurationValue(config_id)
+    await prot_hndl.getConfigurationValue(config_id)
+    assert len(prot_hndl._command.mock_calls) == 2
+    assert cache.stats["size"] == 0
+
+    # Also for struct responses
+    prot_hndl._command.return_value = GetTokenDataRsp(status=t.EmberStatus.ERR_FATAL)
+    await prot_hndl.getTokenData(token=0, index=0)
+    assert cache.stats["size"] == 0
+
+    prot_hndl._command.return_value = GetTokenDataRsp(
+        status=t.EmberStatus.SUCCESS, value=b"test"
+    )
+    await prot_hndl.getTokenData(token=0, index=0)
+    assert cache.stats["size"] == 1
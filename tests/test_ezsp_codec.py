@@ -0,0 +1,145 @@
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from bellows.ezsp import EZSP
+from bellows.ezsp.codec import CommandCodec, compile_decoder, compile_encoder
+import bellows.types as t
+
+
+def _samples():
+    rng = random.Random(0)
+
+    yield bytes(256)
+    yield b"\xFF" * 256
+
+    for _ in range(5):
+        yield bytes([rng.randrange(0, 256) for _ in range(256)])
+
+
+def _commands():
+    commands = {}
+
+    # Schemas shared between versions are only tested once
+    for version, protocol in sorted(EZSP._BY_VERSION.items()):
+        for name, (_, tx_schema, rx_schema) in protocol.COMMANDS.items():
+            if isinstance(tx_schema, (dict, type)):
+                commands.setdefault(
+                    (id(tx_schema), id(rx_schema)),
+                    pytest.param(tx_schema, rx_schema, id=f"v{version}-{name}"),
+                )
+
+    return list(commands.values())
+
+
+def _deserialize(schema, data):
+    if isinstance(schema, dict):
+        result, data = t.deserialize_dict(data, schema)
+        return list(result.values()), data
+
+    return schema.deserialize(data)
+
+
+@pytest.mark.parametrize("tx_schema, rx_schema", _commands())
+def test_codec_matches_schema(tx_schema, rx_schema):
+    encode = compile_encoder(tx_schema)
+    decode = compile_decoder(rx_schema)
+
+    for data in _samples():
+        # Decoded values match the generic deserialization, including their types
+        try:
+            expected = _deserialize(rx_schema, data)
+        except Exception as exc:
+            with pytest.raises(type(exc)):
+                decode(data)
+        else:
+            result, rest = decode(data)
+            assert (result, rest) == expected
+
+            if isinstance(rx_schema, dict):
+                assert [type(v) for v in result] == [type(v) for v in expected[0]]
+
+        # Encoding matches the generic serialization
+        try:
+            params, _ = _deserialize(tx_schema, data)
+        except Exception:
+            continue
+
+        if isinstance(tx_schema, dict):
+            args, kwargs = params, dict(zip(tx_schema, params))
+
+            def serialize():
+                return t.serialize_dict(params, {}, tx_schema, b"\x01\x02")
+
+        else:
+            args, kwargs = (), params.as_dict()
+
+            def serialize():
+                return b"\x01\x02" + params.serialize()
+
+        try:
+            expected = serialize()
+        except Exception as exc:
+            with pytest.raises(type(exc)):
+                encode(b"\x01\x02", **kwargs)
+
+            continue
+
+        assert encode(b"\x01\x02", *args) == expected
+        assert encode(b"\x01\x02", **kwargs) == expected
+
+
+def test_codec_short_data():
+    codec = CommandCodec.compile(
+        "test",
+        0x1234,
+        {"a": t.uint8_t, "b": t.uint16_t},
+        {"status": t.EmberStatus, "value": t.uint32_t, "rest": t.LVBytes},
+    )
+
+    assert codec.rx_fields == ("status", "value", "rest")
+    assert codec.encode(b"\xAA", 1, b=0x0302) == b"\xAA\x01\x02\x03"
+
+    with pytest.raises(ValueError):
+        codec.decode(b"\x00\x01\x02\x03")
+
+    with pytest.raises(ValueError):
+        codec.encode(b"", a=0x100, b=0)
+
+    with pytest.raises(TypeError):
+        codec.encode(b"", a=1)
+
+    result, rest = codec.decode(b"\x00\x01\x02\x03\x04\x02ab\xFF")
+    assert result == [t.EmberStatus.SUCCESS, 0x04030201, b"ab"]
+    assert type(result[0]) is t.EmberStatus
+    assert rest == b"\xFF"
+
+
+def test_codec_invalid_names():
+    # Field names that are not valid identifiers use the generic serialization
+    codec = CommandCodec.compile("test", 0x12, {"": t.uint8_t}, {"in": t.uint8_t})
+
+    assert codec.encode(b"\xAA", 1) == b"\xAA\x01"
+    assert codec.decode(b"\x02\x03") == ([2], b"\x03")
+
+
+async def test_command_methods():
+    for protocol in EZSP._BY_VERSION.values():
+        handler = protocol(MagicMock(), MagicMock())
+
+        for name in protocol.COMMANDS:
+            method = getattr(handler, name)
+            assert method.__func__ is getattr(protocol, name)
+            assert method.__name__ == name
+
+    # Commands removed in later versions are not inherited
+    v4 = EZSP._BY_VERSION[4](MagicMock(), MagicMock())
+    v6 = EZSP._BY_VERSION[6](MagicMock(), MagicMock())
+
+    removed = next(n for n in type(v4).COMMANDS if n not in type(v6).COMMANDS)
+    assert callable(getattr(v4, removed))
+    assert not hasattr(v6, removed)
+
+    with pytest.raises(AttributeError):
+        getattr(v6, removed)
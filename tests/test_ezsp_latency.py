@@ -0,0 +1,71 @@
+import pytest
+
+from bellows.ezsp.latency import (
+    MAX_SAMPLES,
+    MIN_SAMPLES,
+    MIN_TIMEOUT,
+    CommandLatency,
+    LatencyHistogram,
+)
+
+
+def test_histogram_quantile():
+    histogram = LatencyHistogram()
+
+    for _ in range(98):
+        histogram.add(0.003)
+
+    histogram.add(0.100)
+    assert histogram.quantile(0.5) == 0.004
+    assert histogram.quantile(0.99) == 0.128
+
+    histogram.add(100)
+    assert histogram.quantile(0.99) == 0.128
+    assert histogram.quantile(1) == float("inf")
+
+
+def test_histogram_aging():
+    histogram = LatencyHistogram()
+
+    for _ in range(MAX_SAMPLES):
+        histogram.add(0.010)
+
+    assert histogram.total == MAX_SAMPLES
+
+    # Old samples count half as much once the histogram is full
+    histogram.add(5)
+    assert histogram.total == MAX_SAMPLES // 2 + 1
+    assert histogram.quantile(0.99) == 0.016
+    assert histogram.quantile(1) == 8.192
+
+
+def test_timeout():
+    latency = CommandLatency()
+
+    # Not enough samples yet
+    for _ in range(MIN_SAMPLES - 1):
+        latency.record("nop", 0.010)
+
+    assert latency.timeout("nop", default=10) == 10
+
+    latency.record("nop", 0.010)
+    assert latency.timeout("nop", default=10) == MIN_TIMEOUT
+
+    # Timeouts are never longer than the default
+    for _ in range(MIN_SAMPLES):
+        latency.record("formNetwork", 8)
+
+    assert latency.timeout("formNetwork", default=10) == 10
+    assert latency.timeout("networkInit", default=10) == 10
+
+
+@pytest.mark.parametrize("adaptive", [True, False])
+def test_timeout_overrides(adaptive):
+    latency = CommandLatency(overrides={"formNetwork": 30}, adaptive=adaptive)
+
+    for _ in range(MIN_SAMPLES):
+        latency.record("formNetwork", 0.010)
+        latency.record("nop", 0.010)
+
+    assert latency.timeout("formNetwork", default=10) == 30
+    assert latency.timeout("nop", default=10) == (MIN_TIMEOUT if adaptive else 10)
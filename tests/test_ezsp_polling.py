@@ -0,0 +1,145 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, call
+
+import pytest
+
+from bellows.exception import EzspError
+from bellows.ezsp.polling import CallbackPoller
+import bellows.types as t
+
+
+@pytest.fixture
+def ezsp_f():
+    ezsp = MagicMock()
+    ezsp.setValue = AsyncMock(return_value=[t.EzspStatus.SUCCESS])
+    ezsp.callback = AsyncMock(
+        side_effect=["incomingMessageHandler"] * 25 + ["noCallbacks"]
+    )
+
+    return ezsp
+
+
+def _sync_calls(*enabled: bool) -> list:
+    return [
+        call(
+            valueId=t.EzspValueId.VALUE_UART_SYNCH_CALLBACKS,
+            value=t.uint8_t(value).serialize(),
+        )
+        for value in enabled
+    ]
+
+
+async def test_polling(ezsp_f):
+    poller = CallbackPoller(ezsp_f, threshold=5, batch_size=10)
+
+    for _ in range(4):
+        poller.callback_received()
+
+    assert not poller.polling
+
+    poller.callback_received()
+    assert poller.polling
+
+    # Callbacks received while polling do not start polling again
+    task = poller._task
+    poller.callback_received()
+    assert poller._task is task
+
+    await task
+    assert not poller.polling
+
+    # Callbacks are polled until there are none left, then async callbacks resume
+    assert ezsp_f.setValue.mock_calls == _sync_calls(True, False)
+    assert ezsp_f.callback.await_count == 26
+
+
+async def test_polling_paused_while_backlogged(ezsp_f):
+    loop = asyncio.get_running_loop()
+    poller = CallbackPoller(ezsp_f, threshold=1, batch_size=1, poll_interval=0)
+    polled = []
+
+    async def callback():
+        polled.append(poller._host_ready.is_set())
+
+        # Consumers fall behind after the third callback and catch up later
+        if len(polled) == 3:
+            poller.set_host_ready(False)
+            loop.call_later(0.05, poller.set_host_ready, True)
+
+        return "noCallbacks" if len(polled) == 10 else "incomingMessageHandler"
+
+    ezsp_f.callback.side_effect = callback
+
+    # Received frames are already backlogged when the flood is detected
+    poller.set_host_ready(False)
+    poller.callback_received()
+    await asyncio.sleep(0.05)
+
+    assert poller.polling
+    assert ezsp_f.setValue.mock_calls == _sync_calls(True)
+    assert polled == []
+
+    poller.set_host_ready(True)
+    await asyncio.sleep(0.02)
+    assert len(polled) == 3
+
+    await poller._task
+    assert polled == [True] * 10
+    assert ezsp_f.setValue.mock_calls == _sync_calls(True, False)
+
+
+async def test_polling_interval(ezsp_f):
+    poller = CallbackPoller(ezsp_f, threshold=1, batch_size=10, poll_interval=0.1)
+
+    poller.callback_received()
+    await asyncio.sleep(0.05)
+
+    # Consumers are given time to run between batches
+    assert ezsp_f.callback.await_count == 10
+
+    await poller._task
+    assert ezsp_f.callback.await_count == 26
+
+
+async def test_polling_unsupported(ezsp_f, caplog):
+    ezsp_f.setValue.return_value = [t.EzspStatus.ERROR_INVALID_ID]
+    poller = CallbackPoller(ezsp_f, threshold=1)
+
+    poller.callback_received()
+    await poller._task
+    assert "does not support polling" in caplog.text
+
+    poller.callback_received()
+    assert not poller.polling
+    assert ezsp_f.setValue.mock_calls == _sync_calls(True)
+    assert ezsp_f.callback.mock_calls == []
+
+
+@pytest.mark.parametrize("exc", [asyncio.TimeoutError(), EzspError()])
+async def test_polling_failure(ezsp_f, exc, caplog):
+    ezsp_f.callback.side_effect = ["incomingMessageHandler", exc]
+    poller = CallbackPoller(ezsp_f, threshold=1)
+
+    poller.callback_received()
+    await poller._task
+
+    assert "Failed to poll for callbacks" in caplog.text
+    assert ezsp_f.setValue.mock_calls == _sync_calls(True, False)
+
+
+async def test_polling_stop(ezsp_f):
+    async def hang():
+        await asyncio.sleep(1)
+
+    ezsp_f.callback.side_effect = hang
+    poller = CallbackPoller(ezsp_f, threshold=1)
+
+    poller.callback_received()
+    task = poller._task
+    await asyncio.sleep(0)
+
+    poller.stop()
+    assert not poller.polling
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
@@ -0,0 +1,205 @@
+import json
+import logging
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import pytest
+import zigpy.config
+
+from bellows.ezsp import EZSP
+from bellows.ezsp.profile import NcpProfile, NcpProfileStore
+from bellows.ezsp.v9.commands import GetTokenDataRsp
+import bellows.types as t
+
+DEVICE_PATH = "/dev/null"
+IEEE = t.EUI64.convert("00:11:22:33:44:55:66:77")
+
+
+@pytest.fixture
+def profile_path(tmp_path):
+    return str(tmp_path / "profiles.json")
+
+
+def _profile(**kwargs) -> NcpProfile:
+    return NcpProfile(
+        **{
+            "ieee": str(IEEE),
+            "stack_version": 0x7400,
+            "protocol_version": 13,
+            **kwargs,
+        }
+    )
+
+
+async def test_store(profile_path):
+    store = NcpProfileStore(profile_path)
+    assert await store.get(DEVICE_PATH) is None
+
+    profile = _profile(config={"CONFIG_STACK_PROFILE": 2}, values={"VALUE_X": None})
+    await store.save(DEVICE_PATH, profile)
+
+    # Stored profiles are copies
+    profile.config["CONFIG_STACK_PROFILE"] = 0
+    stored = await NcpProfileStore(profile_path).get(DEVICE_PATH)
+    assert stored == _profile(
+        config={"CONFIG_STACK_PROFILE": 2}, values={"VALUE_X": None}
+    )
+    assert stored.matches(str(IEEE), 0x7400)
+    assert not stored.matches(str(IEEE), 0x7401)
+
+
+async def test_store_unchanged(profile_path):
+    store = NcpProfileStore(profile_path)
+    await store.save(DEVICE_PATH, _profile())
+
+    with patch.object(store, "_save") as save:
+        await store.save(DEVICE_PATH, _profile())
+
+    assert save.mock_calls == []
+
+
+async def test_store_invalid(profile_path, caplog):
+    with open(profile_path, "w") as f:
+        json.dump({"format_version": 999, "profiles": {}}, f)
+
+    with caplog.at_level(logging.WARNING):
+        assert await NcpProfileStore(profile_path).get(DEVICE_PATH) is None
+
+    assert "Ignoring invalid NCP profile file" in caplog.text
+
+
+async def test_store_write_failure(tmp_path, caplog):
+    store = NcpProfileStore(str(tmp_path / "missing" / "profiles.json"))
+
+    with caplog.at_level(logging.WARNING):
+        await store.save(DEVICE_PATH, _profile())
+
+    assert "Failed to write NCP profile file" in caplog.text
+
+
+async def _make_ezsp(profile_path: str) -> EZSP:
+    api = EZSP(
+        {
+            zigpy.config.CONF_DEVICE_PATH: DEVICE_PATH,
+            zigpy.config.CONF_DEVICE_BAUDRATE: 115200,
+        },
+        profile_store=NcpProfileStore(profile_path),
+    )
+
+    with patch("bellows.uart.connect", new=AsyncMock(return_value=MagicMock())):
+        await api.connect()
+
+    api.start_ezsp()
+    return api
+
+
+def _mock_ncp() -> AsyncMock:
+    async def command(name, *args, **kwargs):
+        if name == "version":
+            return [13, 2, 0x7400]
+        elif name == "getEui64":
+            return [IEEE]
+        elif name == "getConfigurationValue":
+            return [t.EzspStatus.SUCCESS, 2]
+        elif name == "getValue":
+            return [t.EzspStatus.ERROR_INVALID_ID, b""]
+        elif name == "getMfgToken":
+            return [b"Board"]
+        elif name == "getTokenData":
+            return GetTokenDataRsp(status=t.EmberStatus.SUCCESS, value=IEEE.serialize())
+
+        return [t.EzspStatus.SUCCESS]
+
+    return AsyncMock(side_effect=command)
+
+
+async def test_warm_start(profile_path):
+    # Cold start: everything is read from the NCP and recorded
+    api = await _make_ezsp(profile_path)
+    api._command = cold = _mock_ncp()
+
+    await api.version()
+    await api.write_config({})
+    assert await api.get_board_info() == ("Board", "Board", None)
+    assert await api._get_nv3_restored_eui64_key() is not None
+
+    cold_names = [c.args[0] for c in cold.mock_calls]
+    assert cold_names.count("version") == 2
+    assert cold_names.count("getConfigurationValue") > 0
+    assert cold_names.count("getMfgToken") == 2
+    assert cold_names.count("getTokenData") == 1
+
+    # Config already matching the firmware defaults is not written
+    written = [
+        c.kwargs["configId"]
+        for c in cold.mock_calls
+        if c.args[0] == "setConfigurationValue"
+    ]
+    assert t.EzspConfigId.CONFIG_STACK_PROFILE not in written
+
+    stored = await NcpProfileStore(profile_path).get(DEVICE_PATH)
+    assert stored.protocol_version == 13
+    assert stored.config["CONFIG_STACK_PROFILE"] == 2
+    assert stored.board_info == ["Board", "Board", None]
+
+    # Warm start: the protocol version is requested directly and nothing is read
+    api = await _make_ezsp(profile_path)
+    api._command = warm = _mock_ncp()
+
+    await api.version()
+    assert api.ezsp_version == 13
+    assert warm.mock_calls[0] == call("version", desiredProtocolVersion=13)
+
+    await api.write_config({})
+    assert await api.get_board_info() == ("Board", "Board", None)
+    assert await api._get_nv3_restored_eui64_key() is not None
+
+    warm_names = [c.args[0] for c in warm.mock_calls]
+    assert warm_names.count("version") == 1
+    assert "getConfigurationValue" not in warm_names
+    assert "getValue" not in warm_names
+    assert "getMfgToken" not in warm_names
+    assert "getTokenData" not in warm_names
+    assert [c for c in warm.mock_calls if c.args[0] == "setConfigurationValue"] == [
+        c for c in cold.mock_calls if c.args[0] == "setConfigurationValue"
+    ]
+
+
+async def test_warm_start_firmware_changed(profile_path):
+    await NcpProfileStore(profile_path).save(
+        DEVICE_PATH, _profile(stack_version=0x7300, config={"CONFIG_STACK_PROFILE": 2})
+    )
+
+    api = await _make_ezsp(profile_path)
+    api._command = _mock_ncp()
+    await api.version()
+
+    # The stored profile is for other firmware and is not used
+    assert api._profile == _profile()
+
+
+async def test_warm_start_firmware_upgraded(profile_path):
+    await NcpProfileStore(profile_path).save(
+        DEVICE_PATH, _profile(stack_version=0x7300, protocol_version=12)
+    )
+
+    api = await _make_ezsp(profile_path)
+    api._command = ncp = _mock_ncp()
+    command = ncp.side_effect
+
+    # The upgraded firmware still accepts the previous protocol version
+    async def upgraded(name, *args, **kwargs):
+        if name == "version" and kwargs["desiredProtocolVersion"] == 12:
+            return [12, 2, 0x7400]
+
+        return await command(name, *args, **kwargs)
+
+    ncp.side_effect = upgraded
+    await api.version()
+
+    assert api.ezsp_version == 13
+    assert [c for c in ncp.mock_calls if c.args[0] == "version"] == [
+        call("version", desiredProtocolVersion=12),
+        call("version", desiredProtocolVersion=4),
+        call("version", desiredProtocolVersion=13),
+    ]
+    assert api._profile == _profile()
@@ -4,7 +4,11 @@ from unittest.mock import AsyncMock, MagicMock, call, patch
 
 import pytest
 
+from bellows.exception import EzspError, InvalidCommandError
 from bellows.ezsp import EZSP
+from bellows.ezsp.latency import MIN_SAMPLES, MIN_TIMEOUT, CommandLatency
+from bellows.ezsp.protocol import EZSP_CMD_TIMEOUT, UndecodedFrame
+from bellows.ezsp.telemetry import EzspStatistics
 import bellows.ezsp.v4
 import bellows.ezsp.v9
 from bellows.ezsp.v9.commands import GetTokenDataRsp
@@ -47,6 +51,212 @@ async def test_command(prot_hndl):
     assert mock_send_data.mock_calls == [call(b"\x00\x00\x05")]
 
 
+@pytest.fixture
+def prot_hndl_pipelined():
+    app = MagicMock()
+    gateway = Gateway(app)
+    gateway._transport = AsyncMock()
+
+    return bellows.ezsp.v4.EZSPv4(MagicMock(), gateway, max_concurrency=4)
+
+
+async def test_command_pipelined(prot_hndl_pipelined):
+    prot = prot_hndl_pipelined
+
+    with patch.object(prot._gw, "send_data") as mock_send_data:
+        tasks = [asyncio.create_task(prot.command("nop")) for _ in range(6)]
+        await asyncio.sleep(0)
+
+        # Four commands are in flight at once
+        assert mock_send_data.mock_calls == [
+            call(bytes([seq, 0x00, 0x05])) for seq in range(4)
+        ]
+
+        # Responses are matched by sequence number, in any order
+        prot(b"\x02\xff\x05")
+        prot(b"\x00\xff\x05")
+        await asyncio.sleep(0)
+        assert [task.done() for task in tasks] == [True, False, True] + [False] * 3
+
+        await asyncio.sleep(0)
+        assert len(mock_send_data.mock_calls) == 6
+
+        for seq in (1, 3, 4, 5):
+            prot(bytes([seq, 0xFF, 0x05]))
+
+        await asyncio.gather(*tasks)
+
+
+async def test_command_sequence_wraparound(prot_hndl_pipelined):
+    prot = prot_hndl_pipelined
+    timed_out = asyncio.get_running_loop().create_future()
+    timed_out.cancel()
+
+    # A command sent under sequence number 0 timed out, its response may still come
+    prot._awaiting[0] = (0x05, prot.COMMANDS["nop"][2], timed_out)
+    prot._seq = 255
+
+    with patch.object(prot._gw, "send_data") as mock_send_data:
+        tasks = [asyncio.create_task(prot.command("nop")) for _ in range(2)]
+        await asyncio.sleep(0)
+
+    assert mock_send_data.mock_calls == [
+        call(b"\xff\x00\x05"),
+        call(b"\x01\x00\x05"),
+    ]
+
+    # The late response is not matched to the newer command
+    prot(b"\x00\xff\x05")
+    assert not tasks[1].done()
+
+    prot(b"\xff\xff\x05")
+    prot(b"\x01\xff\x05")
+    await asyncio.gather(*tasks)
+
+
+async def test_command_sequence_exhausted(prot_hndl_pipelined):
+    prot = prot_hndl_pipelined
+    timed_out = asyncio.get_running_loop().create_future()
+    timed_out.cancel()
+    pending = asyncio.get_running_loop().create_future()
+
+    for seq in range(256):
+        prot._awaiting[seq] = (0x05, prot.COMMANDS["nop"][2], timed_out)
+
+    # Timed out commands are forgotten once there are no other sequence numbers
+    prot._awaiting[100] = (0x05, prot.COMMANDS["nop"][2], pending)
+    prot._next_free_sequence()
+    assert list(prot._awaiting) == [100]
+
+    for seq in range(256):
+        prot._awaiting[seq] = (0x05, prot.COMMANDS["nop"][2], pending)
+
+    with pytest.raises(EzspError):
+        prot._next_free_sequence()
+
+
+@patch("bellows.ezsp.protocol.EZSP_CMD_TIMEOUT", 0.01)
+async def test_command_timeout(prot_hndl_pipelined):
+    prot = prot_hndl_pipelined
+
+    with patch.object(prot._gw, "send_data"):
+        with pytest.raises(asyncio.TimeoutError):
+            await prot.command("nop")
+
+    # The sequence number stays reserved
+    assert prot._awaiting[0][2].cancelled()
+    assert prot._seq == 1
+
+
+async def test_command_latency(prot_hndl_pipelined):
+    prot = prot_hndl_pipelined
+    prot._command_latency = latency = CommandLatency()
+    assert prot._get_command_timeout("nop") == EZSP_CMD_TIMEOUT
+
+    with patch.object(prot._gw, "send_data"):
+        for _ in range(MIN_SAMPLES):
+            task = asyncio.create_task(prot.command("nop"))
+            await asyncio.sleep(0)
+            prot(bytes([prot._seq - 1]) + b"\xff\x05")
+            await task
+
+    assert latency.histograms["nop"].total == MIN_SAMPLES
+    assert prot._get_command_timeout("nop") == MIN_TIMEOUT
+
+    # Commands that time out are not timed
+    with patch.object(prot._gw, "send_data"), patch.object(
+        latency, "timeout", return_value=0.01
+    ):
+        with pytest.raises(asyncio.TimeoutError):
+            await prot.command("nop")
+
+    assert latency.histograms["nop"].total == MIN_SAMPLES
+
+
+async def test_command_statistics(prot_hndl_pipelined):
+    prot = prot_hndl_pipelined
+    prot._statistics = statistics = EzspStatistics()
+    prot._has_callbacks = MagicMock(return_value=False)
+
+    with patch.object(prot._gw, "send_data"):
+        task = asyncio.create_task(prot.command("nop"))
+        await asyncio.sleep(0)
+        prot(b"\x00\xff\x05")
+        await task
+
+        task = asyncio.create_task(prot.command("nop"))
+        await asyncio.sleep(0)
+        prot(b"\x01\xff\x58" + bytes([t.EzspStatus.ERROR_INVALID_FRAME_ID]))
+
+        with pytest.raises(InvalidCommandError):
+            await task
+
+        with patch.object(prot, "_get_command_timeout", return_value=0.01):
+            with pytest.raises(asyncio.TimeoutError):
+                await prot.command("nop")
+
+    # Callbacks are counted even if they are not decoded
+    prot(b"\x03\xff\x19\x90")
+
+    nop = statistics["nop"]
+    assert (nop.tx_count, nop.tx_bytes, nop.rx_count, nop.rx_bytes) == (3, 9, 1, 3)
+    assert (nop.timeouts, nop.invalid_commands, nop.latency.total) == (1, 1, 1)
+    assert nop.queue_time >= 0
+
+    assert statistics["invalidCommand"].rx_count == 1
+    assert statistics["stackStatusHandler"].rx_bytes == 4
+
+
+async def test_command_pipelining_rejected(prot_hndl_pipelined, caplog):
+    prot = prot_hndl_pipelined
+
+    with patch.object(prot._gw, "send_data") as mock_send_data:
+        tasks = [asyncio.create_task(prot.command("nop")) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        # The NCP rejects the second command
+        with caplog.at_level(logging.WARNING):
+            prot(b"\x01\xff\x58" + bytes([t.EzspStatus.ERROR_OUT_OF_MEMORY]))
+            await asyncio.sleep(0)
+
+        assert "sending commands one at a time" in caplog.text
+        assert prot._send_semaphore.max_value == 1
+
+        # And it is sent again
+        assert mock_send_data.mock_calls == [
+            call(b"\x00\x00\x05"),
+            call(b"\x01\x00\x05"),
+            call(b"\x02\x00\x05"),
+        ]
+
+        prot(b"\x00\xff\x05")
+        prot(b"\x02\xff\x05")
+        await asyncio.gather(*tasks)
+
+        # Later rejections are not retried
+        task = asyncio.create_task(prot.command("nop"))
+        await asyncio.sleep(0)
+        prot(b"\x03\xff\x58" + bytes([t.EzspStatus.ERROR_OUT_OF_MEMORY]))
+
+        with pytest.raises(InvalidCommandError):
+            await task
+
+
+async def test_command_invalid_not_retried(prot_hndl_pipelined):
+    prot = prot_hndl_pipelined
+
+    with patch.object(prot._gw, "send_data"):
+        task = asyncio.create_task(prot.command("nop"))
+        await asyncio.sleep(0)
+        prot(b"\x00\xff\x58" + bytes([t.EzspStatus.ERROR_INVALID_FRAME_ID]))
+
+        with pytest.raises(InvalidCommandError) as exc_info:
+            await task
+
+    assert exc_info.value.status == t.EzspStatus.ERROR_INVALID_FRAME_ID
+    assert prot._send_semaphore.max_value == 4
+
+
 def test_receive_reply(prot_hndl):
     callback_mock = MagicMock(spec_set=asyncio.Future)
     prot_hndl._awaiting[0] = (0, prot_hndl.COMMANDS["version"][2], callback_mock)
@@ -59,6 +269,52 @@ def test_receive_reply(prot_hndl):
     assert prot_hndl._handle_callback.call_count == 0
 
 
+def test_receive_unsubscribed(prot_hndl):
+    prot_hndl._has_callbacks = MagicMock(return_value=False)
+    prot_hndl._get_codec = MagicMock(wraps=prot_hndl._get_codec)
+
+    # Callbacks without subscribers are not decoded or dispatched
+    decoded = prot_hndl.decode_frame(b"\x00\xff\x00\x04\x05\x06\x00")
+    assert decoded == (0, 0x00, "version", UndecodedFrame(b"\x04\x05\x06\x00"))
+    assert prot_hndl._get_codec.mock_calls == []
+
+    prot_hndl.frame_decoded(*decoded)
+    assert prot_hndl._handle_callback.mock_calls == []
+
+    # Unless a subscriber has been added in the meantime
+    prot_hndl._has_callbacks.return_value = True
+    prot_hndl.frame_decoded(*decoded)
+    prot_hndl._handle_callback.assert_called_once_with("version", [4, 5, 6])
+
+    # Responses are always decoded
+    prot_hndl._has_callbacks.return_value = False
+    future = MagicMock(spec_set=asyncio.Future)
+    prot_hndl._awaiting[0] = (0, prot_hndl.COMMANDS["version"][2], future)
+    prot_hndl(b"\x00\xff\x00\x04\x05\x06\x00")
+    future.set_result.assert_called_once_with([4, 5, 6])
+
+
+async def test_receive_polled_callback(prot_hndl):
+    with patch.object(prot_hndl._gw, "send_data"):
+        # The response to `callback` is the polled callback
+        task = asyncio.create_task(prot_hndl.command("callback"))
+        await asyncio.sleep(0)
+        prot_hndl(b"\x00\x88\x19\x90")
+
+        assert await task == "stackStatusHandler"
+        prot_hndl._handle_callback.assert_called_once_with(
+            "stackStatusHandler", [t.EmberStatus.NETWORK_UP]
+        )
+
+        # Or `noCallbacks` if the NCP has none
+        task = asyncio.create_task(prot_hndl.command("callback"))
+        await asyncio.sleep(0)
+        prot_hndl(b"\x01\x80\x07")
+
+        assert await task == "noCallbacks"
+        assert len(prot_hndl._handle_callback.mock_calls) == 1
+
+
 def test_receive_reply_after_timeout(prot_hndl):
     callback_mock = MagicMock(spec_set=asyncio.Future)
     callback_mock.set_result.side_effect = asyncio.InvalidStateError()
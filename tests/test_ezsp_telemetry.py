@@ -0,0 +1,41 @@
+from bellows.ezsp.telemetry import EzspStatistics, FrameStatistics
+
+
+def test_frame_statistics():
+    stats = FrameStatistics(tx_count=2, tx_bytes=10, queue_time=0.0125)
+    stats.latency.add(0.003)
+    stats.latency.add(100)
+
+    assert stats.as_dict() == {
+        "tx_count": 2,
+        "tx_bytes": 10,
+        "queue_time_ms": 12,
+        "latency_le_4ms": 1,
+        "latency_gt_16384ms": 1,
+    }
+
+
+def test_frame_statistics_not_aged():
+    stats = FrameStatistics()
+
+    for _ in range(5000):
+        stats.latency.add(0.010)
+
+    assert stats.as_dict() == {"latency_le_16ms": 5000}
+
+
+def test_ezsp_statistics():
+    statistics = EzspStatistics()
+    assert statistics.as_dict() == {}
+
+    statistics["nop"].tx_count += 1
+    statistics["nop"].tx_count += 1
+    statistics["stackStatusHandler"].rx_count += 1
+
+    assert statistics.as_dict() == {
+        "nop": {"tx_count": 2},
+        "stackStatusHandler": {"rx_count": 1},
+    }
+
+    statistics.clear()
+    assert statistics.as_dict() == {}
@@ -0,0 +1,320 @@
+import asyncio
+from multiprocessing.shared_memory import SharedMemory
+import os
+import pickle
+from unittest.mock import MagicMock, patch
+
+import pytest
+import zigpy.config as conf
+
+from bellows import ash, config, process, uart
+from bellows.exception import EzspError
+import bellows.types as t
+
+
+@pytest.fixture
+def ring():
+    ring = process.SharedMemoryRing.create(capacity=64)
+
+    yield ring
+
+    ring.close()
+    ring.unlink()
+
+
+def test_ring(ring):
+    reader = process.SharedMemoryRing.attach(ring.name)
+    assert reader.capacity == 64
+
+    assert reader.get_all() == []
+
+    assert ring.put(0x01, b"test")
+    assert ring.put(0x02, b"")
+    assert reader.get_all() == [(0x01, b"test"), (0x02, b"")]
+    assert reader.get_all() == []
+
+    # Records wrap around the end of the buffer
+    for i in range(20):
+        payload = bytes([i]) * (i % 7 + 20)
+        assert ring.put(i, payload)
+        assert reader.get_all() == [(i, payload)]
+
+    reader.close()
+
+
+def test_ring_full(ring):
+    reader = process.SharedMemoryRing.attach(ring.name)
+
+    assert ring.put(0x01, bytes(30))
+    assert ring.put(0x02, bytes(24))
+    assert not ring.put(0x03, b"x")
+
+    assert reader.get_all() == [(0x01, bytes(30)), (0x02, bytes(24))]
+    assert ring.put(0x03, bytes(59))
+    assert not ring.put(0x04, b"")
+    assert reader.get_all() == [(0x03, bytes(59))]
+
+    reader.close()
+
+
+async def test_channel_ring_full():
+    rings = [process.SharedMemoryRing.create(capacity=16) for _ in range(2)]
+    pipes = [os.pipe() for _ in range(2)]
+    received = []
+
+    tx = process.SharedMemoryChannel(
+        rings[0], pipes[0][1], rings[1], pipes[1][0], received.extend, MagicMock()
+    )
+    rx = process.SharedMemoryChannel(
+        rings[1], pipes[1][1], rings[0], pipes[0][0], received.extend, MagicMock()
+    )
+    tx.start(asyncio.get_running_loop())
+    rx.start(asyncio.get_running_loop())
+
+    # Records that do not fit are sent once the other side has read the ring
+    for i in range(5):
+        tx.send(i, bytes([i]) * 8)
+
+    for _ in range(50):
+        if len(received) == 5:
+            break
+
+        await asyncio.sleep(0.01)
+
+    assert received == [(i, bytes([i]) * 8) for i in range(5)]
+
+    tx.close()
+    rx.close()
+
+    for ring in rings:
+        ring.close()
+        ring.unlink()
+
+    for r, w in pipes:
+        os.close(r)
+        os.close(w)
+
+
+def test_dumps_result():
+    assert pickle.loads(process._dumps_result(123, None)) == (123, None)
+
+    _, exc = pickle.loads(process._dumps_result(None, RuntimeError("test")))
+    assert isinstance(exc, RuntimeError)
+    assert exc.args == ("test",)
+
+    # ASH exceptions cannot be unpickled
+    _, exc = pickle.loads(
+        process._dumps_result(None, ash.NotAcked(ash.NakFrame(0, 0, 1)))
+    )
+    assert isinstance(exc, EzspError)
+    assert "NotAcked" in exc.args[0]
+
+
+def _device_config(path):
+    return config.SCHEMA_DEVICE(
+        {
+            conf.CONF_DEVICE_PATH: path,
+            conf.CONF_DEVICE_BAUDRATE: 115200,
+            config.CONF_IO_PROCESS: True,
+        }
+    )
+
+
+async def _read_frames(controller: int) -> list[ash.AshFrame]:
+    data = b""
+
+    for _ in range(200):
+        try:
+            data += os.read(controller, 1024)
+        except BlockingIOError:
+            pass
+
+        if data.endswith(b"\x7E"):
+            break
+
+        await asyncio.sleep(0.01)
+
+    frames = []
+
+    for chunk in data.split(b"\x7E")[:-1]:
+        chunk = chunk.split(b"\x1A")[-1]
+        frames.append(ash.parse_frame(ash.unstuff_bytes(chunk)))
+
+    return frames
+
+
+def _write_frames(controller: int, *frames: ash.AshFrame) -> None:
+    os.write(
+        controller,
+        b"".join([ash.stuff_bytes(frame.to_bytes()) + b"\x7E" for frame in frames]),
+    )
+
+
+@pytest.fixture
+def pty():
+    controller, port = os.openpty()
+    os.set_blocking(controller, False)
+
+    yield controller, os.ttyname(port)
+
+    for fd in (controller, port):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+async def test_process_end_to_end(pty):
+    controller, path = pty
+    app = MagicMock()
+
+    gw = await uart.connect(_device_config(path), app)
+    assert isinstance(gw, process.ProcessGateway)
+    assert gw._process.is_alive()
+
+    # Reset
+    reset = asyncio.create_task(gw.reset())
+    assert await _read_frames(controller) == [ash.RstFrame()]
+
+    _write_frames(
+        controller,
+        ash.RStackFrame(version=2, reset_code=t.NcpResetCode.RESET_SOFTWARE),
+    )
+    assert await asyncio.wait_for(reset, 5) is True
+
+    # Send a frame and receive one
+    send = asyncio.create_task(gw.send_data(b"\x01\x02\x03"))
+    assert await _read_frames(controller) == [
+        ash.DataFrame(frm_num=0, re_tx=False, ack_num=0, ezsp_frame=b"\x01\x02\x03")
+    ]
+
+    _write_frames(
+        controller,
+        ash.AckFrame(res=0, ncp_ready=0, ack_num=1),
+        ash.DataFrame(frm_num=0, re_tx=False, ack_num=1, ezsp_frame=b"\x04\x05"),
+    )
+    assert await asyncio.wait_for(send, 5) is None
+
+    for _ in range(100):
+        if app.frame_received.mock_calls:
+            break
+
+        await asyncio.sleep(0.01)
+
+    app.frame_received.assert_called_once_with(b"\x04\x05")
+
+    stats = await gw.get_ash_statistics()
+    assert stats["frames_rx"] == 3
+
+    # An unexpected reset puts the application into a failed state
+    _write_frames(
+        controller,
+        ash.RStackFrame(version=2, reset_code=t.NcpResetCode.RESET_POWER_ON),
+    )
+
+    for _ in range(100):
+        if app.enter_failed_state.mock_calls:
+            break
+
+        await asyncio.sleep(0.01)
+
+    app.enter_failed_state.assert_called_once_with(t.NcpResetCode.RESET_POWER_ON)
+
+    gw.close()
+    gw.close()
+    await asyncio.wait_for(gw.wait_closed(), 5)
+    assert not gw._process.is_alive()
+
+    assert app.connection_lost.mock_calls == []
+
+    with pytest.raises(EzspError):
+        await gw.send_data(b"test")
+
+
+async def test_process_worker_killed(pty):
+    _, path = pty
+    app = MagicMock()
+
+    gw = await uart.connect(_device_config(path), app)
+    reset = asyncio.create_task(gw.reset())
+    await asyncio.sleep(0.1)
+
+    gw._process.kill()
+    await asyncio.wait_for(gw.wait_closed(), 5)
+    assert not gw._process.is_alive()
+
+    with pytest.raises(ConnectionResetError):
+        await reset
+
+    assert len(app.connection_lost.mock_calls) == 1
+    assert isinstance(app.connection_lost.mock_calls[0].args[0], ConnectionResetError)
+
+
+async def test_process_connect_failure():
+    with pytest.raises(Exception):
+        await uart.connect(_device_config("/dev/does_not_exist"), MagicMock())
+
+
+async def _cancel_connect(path) -> process.ProcessGateway:
+    gateways = []
+    gateway_cls = process.ProcessGateway
+
+    def create_gateway(*args):
+        gateways.append(gateway_cls(*args))
+        return gateways[-1]
+
+    with patch.object(process, "ProcessGateway", create_gateway):
+        task = asyncio.create_task(uart.connect(_device_config(path), MagicMock()))
+
+        # The worker process is still starting up
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, 10)
+
+    (gw,) = gateways
+    assert not gw._process.is_alive()
+
+    for ring in gw._rings:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(ring.name)
+
+    return gw
+
+
+async def test_process_connect_cancelled(pty):
+    _, path = pty
+    gw = await _cancel_connect(path)
+
+    # The worker exits on its own once it has connected
+    assert gw._process.exitcode == 0
+
+
+async def test_process_connect_cancelled_worker_stuck(pty):
+    _, path = pty
+
+    # The worker never learns that the connection was closed
+    with patch.object(process, "WORKER_EXIT_TIMEOUT", 1), patch.object(
+        process.ProcessGateway, "close"
+    ):
+        gw = await _cancel_connect(path)
+
+    assert gw._process.exitcode != 0
+
+
+async def test_process_serial_port_lost(pty):
+    controller, path = pty
+    app = MagicMock()
+
+    gw = await uart.connect(_device_config(path), app)
+    os.close(controller)
+
+    await asyncio.wait_for(gw.wait_closed(), 5)
+
+    # The error from the worker process is reported, not the worker exiting
+    assert len(app.connection_lost.mock_calls) == 1
+    assert not isinstance(
+        app.connection_lost.mock_calls[0].args[0], ConnectionResetError
+    )
@@ -0,0 +1,322 @@
+import asyncio
+import os
+import resource
+import termios
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from bellows import serial_thread
+
+
+@pytest.fixture
+def pty():
+    controller, port = os.openpty()
+    path = os.ttyname(port)
+
+    yield controller, path
+
+    for fd in (controller, port):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+class RecordingProtocol(asyncio.Protocol):
+    def __init__(self):
+        self.transport = None
+        self.received = bytearray()
+        self.data_event = asyncio.Event()
+        self.lost = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.received += data
+        self.data_event.set()
+
+    def connection_lost(self, exc):
+        self.lost.set_result(exc)
+
+
+async def _read_until(protocol, size):
+    while len(protocol.received) < size:
+        protocol.data_event.clear()
+        await asyncio.wait_for(protocol.data_event.wait(), 1)
+
+
+async def _connect(path, **kwargs):
+    kwargs = {"baudrate": 115200, "xonxoff": False, "rtscts": False, **kwargs}
+
+    return await serial_thread.create_serial_connection(
+        asyncio.get_running_loop(), RecordingProtocol, path, **kwargs
+    )
+
+
+@pytest.mark.parametrize(
+    "xonxoff, rtscts", [(False, False), (True, False), (False, True)]
+)
+def test_configure_serial_port(pty, xonxoff, rtscts):
+    _, path = pty
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+
+    try:
+        serial_thread.configure_serial_port(fd, 57600, xonxoff=xonxoff, rtscts=rtscts)
+        iflag, oflag, cflag, lflag, ispeed, ospeed, cc = termios.tcgetattr(fd)
+    finally:
+        os.close(fd)
+
+    assert ispeed == ospeed == termios.B57600
+    assert cflag & termios.CSIZE == termios.CS8
+    assert not lflag & (termios.ICANON | termios.ECHO | termios.ISIG)
+    assert not oflag & termios.OPOST
+    assert bool(iflag & termios.IXON) is xonxoff
+    assert bool(iflag & termios.IXOFF) is xonxoff
+    assert cc[termios.VMIN] == 1
+    assert cc[termios.VTIME] == 0
+
+
+def test_configure_serial_port_bad_baudrate(pty):
+    _, path = pty
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+
+    try:
+        with pytest.raises(ValueError):
+            serial_thread.configure_serial_port(fd, 12345, xonxoff=False, rtscts=False)
+    finally:
+        os.close(fd)
+
+
+async def test_create_serial_connection_failure(pty):
+    _, path = pty
+
+    with patch("os.close", wraps=os.close) as mock_close:
+        with pytest.raises(ValueError):
+            await _connect(path, baudrate=12345)
+
+    assert len(mock_close.mock_calls) == 1
+
+
+async def test_read_write(pty):
+    controller, path = pty
+    transport, protocol = await _connect(path)
+
+    assert protocol.transport is transport
+    assert transport.get_protocol() is protocol
+    assert transport.get_extra_info("url") == path
+
+    # Data containing bytes that a terminal would normally interpret
+    data = bytes(range(256)) * 4
+    os.write(controller, data)
+    await _read_until(protocol, len(data))
+    assert protocol.received == data
+
+    transport.write(b"\x1A\x7E\x0D\x0A")
+    await asyncio.sleep(0.01)
+    assert os.read(controller, 100) == b"\x1A\x7E\x0D\x0A"
+
+    assert not transport.is_closing()
+    transport.close()
+    transport.close()
+    assert transport.is_closing()
+
+    assert (await protocol.lost) is None
+
+    # Closed transports ignore writes
+    transport.write(b"test")
+
+
+async def test_set_protocol(pty):
+    controller, path = pty
+    transport, protocol = await _connect(path)
+
+    new_protocol = RecordingProtocol()
+    transport.set_protocol(new_protocol)
+    assert transport.get_protocol() is new_protocol
+
+    os.write(controller, b"test")
+    await _read_until(new_protocol, 4)
+    assert new_protocol.received == b"test"
+    assert protocol.received == b""
+
+    transport.close()
+    assert (await new_protocol.lost) is None
+    assert not protocol.lost.done()
+
+
+@pytest.mark.skipif(
+    resource.getrlimit(resource.RLIMIT_NOFILE)[0] <= 2000,
+    reason="Not enough file descriptors",
+)
+async def test_read_high_file_descriptor(pty):
+    controller, path = pty
+    os_open = os.open
+
+    # File descriptors above FD_SETSIZE cannot be used with `select.select`
+    def open_high(*args):
+        fd = os_open(*args)
+
+        try:
+            return os.dup2(fd, 2000)
+        finally:
+            os.close(fd)
+
+    with patch("os.open", open_high):
+        transport, protocol = await _connect(path)
+
+    assert transport._fd == 2000
+
+    os.write(controller, b"test")
+    await _read_until(protocol, 4)
+    assert protocol.received == b"test"
+
+    transport.close()
+    assert (await protocol.lost) is None
+
+
+async def test_reads_batched(pty):
+    controller, path = pty
+    transport, protocol = await _connect(path)
+
+    # Multiple reads happen while the event loop is blocked
+    for _ in range(3):
+        os.write(controller, b"test")
+        time.sleep(0.05)
+
+    assert protocol.received == b""
+    assert transport._data_received.processed == 0
+
+    await _read_until(protocol, 12)
+    assert protocol.received == b"test" * 3
+    assert transport._data_received.processed == 3
+
+    transport.close()
+    await protocol.lost
+
+
+async def test_connection_lost(pty):
+    controller, path = pty
+    transport, protocol = await _connect(path)
+
+    # Closing the other end of a pty causes reads to fail
+    os.close(controller)
+
+    exc = await asyncio.wait_for(protocol.lost, 1)
+    assert isinstance(exc, OSError)
+    assert transport.is_closing()
+
+
+async def test_connection_eof(pty):
+    _, path = pty
+
+    with patch("os.read", return_value=b""):
+        transport, protocol = await _connect(path)
+        os.write(pty[0], b"x")
+
+        exc = await asyncio.wait_for(protocol.lost, 1)
+
+    assert isinstance(exc, ConnectionResetError)
+
+
+async def test_write_buffered(pty):
+    controller, path = pty
+    transport, protocol = await _connect(path)
+    loop = asyncio.get_running_loop()
+
+    with patch("os.write", side_effect=[2, BlockingIOError()]), patch.object(
+        loop, "add_writer"
+    ) as mock_add_writer:
+        transport.write(b"test")
+        transport.write(b"1234")
+
+    assert transport.get_write_buffer_size() == 6
+    mock_add_writer.assert_called_once_with(transport._fd, transport._write_ready)
+
+    with patch("os.write", side_effect=BlockingIOError()):
+        transport._write_ready()
+
+    assert transport.get_write_buffer_size() == 6
+
+    with patch("os.write", return_value=2), patch.object(
+        loop, "remove_writer"
+    ) as mock_remove_writer:
+        transport._write_ready()
+
+    assert transport._write_buffer == b"1234"
+    assert mock_remove_writer.mock_calls == []
+
+    with patch("os.write", return_value=4), patch.object(
+        loop, "remove_writer"
+    ) as mock_remove_writer:
+        transport._write_ready()
+
+    assert transport.get_write_buffer_size() == 0
+    mock_remove_writer.assert_called_once_with(transport._fd)
+
+    transport.close()
+    await protocol.lost
+
+
+async def test_write_blocked(pty):
+    controller, path = pty
+    transport, protocol = await _connect(path)
+    loop = asyncio.get_running_loop()
+
+    with patch("os.write", side_effect=BlockingIOError()), patch.object(
+        loop, "add_writer"
+    ):
+        transport.write(b"test")
+
+    assert transport.get_write_buffer_size() == 4
+
+    # Buffered data is discarded when closing
+    with patch.object(loop, "remove_writer") as mock_remove_writer:
+        transport.close()
+
+    mock_remove_writer.assert_called_once_with(transport._fd)
+    assert transport.get_write_buffer_size() == 0
+    await protocol.lost
+
+
+@pytest.mark.parametrize("method", ["write", "_write_ready"])
+async def test_write_error(pty, method):
+    controller, path = pty
+    transport, protocol = await _connect(path)
+    transport._write_buffer += b"test"
+
+    real_write = os.write
+
+    def write(fd, data):
+        if fd == transport._fd:
+            raise OSError()
+
+        return real_write(fd, data)
+
+    with patch("os.write", side_effect=write):
+        if method == "write":
+            transport._write_buffer.clear()
+            transport.write(b"test")
+        else:
+            with patch.object(asyncio.get_running_loop(), "remove_writer"):
+                transport._write_ready()
+
+    exc = await asyncio.wait_for(protocol.lost, 1)
+    assert isinstance(exc, OSError)
+
+
+async def test_loop_closed(pty):
+    controller, path = pty
+    loop = MagicMock()
+    loop.call_soon_threadsafe.side_effect = RuntimeError()
+
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    transport = serial_thread.SerialReaderThreadTransport(loop, MagicMock(), fd, path)
+    transport._start()
+    os.close(controller)
+
+    transport._thread.join(1)
+    assert not transport._thread.is_alive()
+    os.close(fd)
@@ -186,3 +186,77 @@ async def test_thread_task_cancellation_after_stop(thread):
         # This will stall forever without the patch
         async with asyncio_timeout(1):
             await proxy.wait_forever()
+
+
+async def test_proxy_wrapper_cached(thread):
+    obj = mock.MagicMock()
+    obj.test.return_value = None
+    proxy = ThreadsafeProxy(obj, thread.loop)
+
+    assert proxy.test is proxy.test
+
+    proxy.test(1)
+    proxy.test(2, key="value")
+    await yield_other_thread(thread)
+    assert obj.test.mock_calls == [mock.call(1), mock.call(2, key="value")]
+
+
+async def test_proxy_batched(thread):
+    calls = []
+    drained = []
+    obj = mock.MagicMock()
+    obj.test = calls.append
+    proxy = ThreadsafeProxy(obj, thread.loop)
+    batched = proxy.batched("test", lambda: drained.append(batched.processed))
+
+    # Keep the other event loop busy while the calls are made
+    busy = threading.Event()
+    thread.loop.call_soon_threadsafe(busy.wait)
+
+    with mock.patch.object(
+        thread.loop, "call_soon_threadsafe", wraps=thread.loop.call_soon_threadsafe
+    ) as call_soon_threadsafe:
+        for i in range(100):
+            batched(i)
+
+    busy.set()
+    await yield_other_thread(thread)
+
+    # Only a single wakeup is needed for all of the calls
+    assert call_soon_threadsafe.call_count == 1
+    assert calls == list(range(100))
+    assert drained == [100]
+
+    # Later calls are batched again
+    batched(100)
+    await yield_other_thread(thread)
+    assert calls == list(range(101))
+    assert drained == [100, 101]
+
+
+async def test_proxy_batched_exception():
+    loop = asyncio.get_running_loop()
+    obj = mock.MagicMock()
+    obj.test.side_effect = [RuntimeError(), None]
+    proxy = ThreadsafeProxy(obj, loop)
+    batched = proxy.batched("test")
+
+    with mock.patch.object(loop, "call_exception_handler") as exception_handler:
+        batched(1)
+        batched(2)
+        await asyncio.sleep(0)
+
+    # An exception does not prevent the rest of the batch from being processed
+    assert obj.test.mock_calls == [mock.call(1), mock.call(2)]
+    assert exception_handler.call_count == 1
+    assert batched.processed == 2
+
+
+async def test_proxy_batched_loop_closed():
+    loop = asyncio.new_event_loop()
+    obj = mock.MagicMock()
+    batched = ThreadsafeProxy(obj, loop).batched("test")
+    loop.close()
+
+    batched(1)
+    assert obj.test.call_count == 0
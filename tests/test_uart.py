@@ -1,4 +1,5 @@
 import asyncio
+import os
 import threading
 from unittest.mock import AsyncMock, MagicMock, call, patch, sentinel
 
@@ -6,7 +7,8 @@ import pytest
 import serial_asyncio
 import zigpy.config as conf
 
-from bellows import uart
+from bellows import ash, config, uart
+from bellows.thread import ThreadsafeProxy
 import bellows.types as t
 
 
@@ -138,6 +140,110 @@ async def test_connect_threaded_failure_cancellation_propagation(monkeypatch):
     assert len(threads) == 0
 
 
+async def test_connect_threaded_decode_in_thread(monkeypatch):
+    appmock = MagicMock()
+    transport = MagicMock()
+
+    async def mockconnect(loop, protocol_factory, **kwargs):
+        protocol = protocol_factory()
+        loop.call_soon(protocol.connection_made, transport)
+        return None, protocol
+
+    monkeypatch.setattr(serial_asyncio, "create_serial_connection", mockconnect)
+
+    def on_transport_close():
+        gw.connection_lost(None)
+
+    transport.close.side_effect = on_transport_close
+    gw = await uart.connect(
+        config.SCHEMA_DEVICE(
+            {
+                conf.CONF_DEVICE_PATH: "/dev/serial",
+                conf.CONF_DEVICE_BAUDRATE: 115200,
+                config.CONF_DECODE_IN_THREAD: True,
+            }
+        ),
+        appmock,
+    )
+
+    assert gw._obj._frame_decoder is appmock.decode_frame
+
+    gw.close()
+    [t.join(1) for t in threading.enumerate() if "bellows" in t.name]
+
+
+async def test_connect_reader_thread():
+    appmock = MagicMock()
+    controller, port = os.openpty()
+
+    try:
+        gw = await uart.connect(
+            config.SCHEMA_DEVICE(
+                {
+                    conf.CONF_DEVICE_PATH: os.ttyname(port),
+                    conf.CONF_DEVICE_BAUDRATE: 115200,
+                    config.CONF_SERIAL_READER_THREAD: True,
+                }
+            ),
+            appmock,
+            use_thread=True,
+        )
+
+        # No second event loop is started, only the reader thread
+        threads = [t for t in threading.enumerate() if "bellows" in t.name]
+        assert [t.name for t in threads] == [
+            f"bellows.serial_thread[{os.ttyname(port)}]"
+        ]
+
+        # Complete a reset over the pty
+        reset = asyncio.create_task(gw.reset())
+        await asyncio.sleep(0.05)
+        assert os.read(controller, 100) == b"\x1A" + ash.RstFrame().to_bytes() + b"\x7E"
+
+        rstack = ash.RStackFrame(
+            version=2, reset_code=t.NcpResetCode.RESET_SOFTWARE
+        ).to_bytes()
+        os.write(controller, ash.stuff_bytes(rstack) + b"\x7E")
+        assert await asyncio.wait_for(reset, 1) is True
+
+        gw.close()
+        await asyncio.sleep(0.01)
+        appmock.connection_lost.assert_not_called()
+    finally:
+        os.close(controller)
+        os.close(port)
+
+    [t.join(1) for t in threading.enumerate() if "bellows" in t.name]
+    threads = [t for t in threading.enumerate() if "bellows" in t.name]
+    assert len(threads) == 0
+
+
+async def test_connect_reader_thread_url(monkeypatch, caplog):
+    appmock = MagicMock()
+    transport = MagicMock()
+
+    async def mockconnect(loop, protocol_factory, **kwargs):
+        protocol = protocol_factory()
+        loop.call_soon(protocol.connection_made, transport)
+        return None, protocol
+
+    monkeypatch.setattr(serial_asyncio, "create_serial_connection", mockconnect)
+    gw = await uart.connect(
+        config.SCHEMA_DEVICE(
+            {
+                conf.CONF_DEVICE_PATH: "rfc2217://localhost:1234",
+                conf.CONF_DEVICE_BAUDRATE: 115200,
+                config.CONF_SERIAL_READER_THREAD: True,
+            }
+        ),
+        appmock,
+        use_thread=False,
+    )
+
+    assert "only supported for local serial ports" in caplog.text
+    gw.close()
+
+
 @pytest.fixture
 def gw():
     gw = uart.Gateway(MagicMock())
@@ -249,3 +355,87 @@ async def test_callbacks(gw):
     assert gw._application.enter_failed_state.mock_calls == [
         call(t.NcpResetCode.RESET_SOFTWARE)
     ]
+
+
+async def test_callback_backpressure():
+    loop = asyncio.get_running_loop()
+    application = MagicMock()
+    application.host_ready_changed.return_value = None
+    application_loop = MagicMock()
+    application_loop.is_closed.return_value = False
+
+    gw = uart.Gateway(ThreadsafeProxy(application, application_loop))
+    gw.connection_made(MagicMock())
+
+    with patch.object(gw, "_loop") as ash_loop:
+        for _ in range(uart.CALLBACK_QUEUE_HIGH_WATER - 1):
+            gw.data_received(b"callback")
+
+        assert gw._transport.set_host_ready.mock_calls == []
+
+        # The NCP is asked to stop sending callbacks once the backlog is too large
+        gw.data_received(b"callback")
+        assert gw._transport.set_host_ready.mock_calls == [call(False)]
+
+        # All frames are handed over to the application event loop with one wakeup,
+        # followed by the backlog notification
+        drain, host_ready = application_loop.call_soon_threadsafe.mock_calls
+        assert drain == call(gw._frame_channel._drain)
+        assert application.frame_received.mock_calls == []
+
+        host_ready.args[0](*host_ready.args[1:])
+        assert application.host_ready_changed.mock_calls == [call(False)]
+
+        gw._frame_channel._drain()
+        assert (
+            application.frame_received.mock_calls
+            == [call(b"callback")] * uart.CALLBACK_QUEUE_HIGH_WATER
+        )
+
+        # Callbacks resume once the backlog has drained
+        assert ash_loop.call_soon_threadsafe.mock_calls == [call(gw._check_host_ready)]
+
+    gw._check_host_ready()
+    assert gw._transport.set_host_ready.mock_calls == [call(False), call(True)]
+
+    host_ready = application_loop.call_soon_threadsafe.mock_calls[-1]
+    host_ready.args[0](*host_ready.args[1:])
+    assert application.host_ready_changed.mock_calls == [call(False), call(True)]
+    assert gw._loop is loop
+
+
+async def test_callback_decoded_in_thread():
+    application = MagicMock()
+    application_loop = MagicMock()
+    application_loop.is_closed.return_value = False
+    frame_decoder = MagicMock(return_value=sentinel.decoded)
+
+    gw = uart.Gateway(
+        ThreadsafeProxy(application, application_loop), frame_decoder=frame_decoder
+    )
+    gw.connection_made(MagicMock())
+
+    gw.data_received(b"callback1")
+    gw.data_received(b"callback2")
+    assert frame_decoder.mock_calls == [call(b"callback1"), call(b"callback2")]
+
+    gw._frame_channel._drain()
+    assert application.frame_decoded.mock_calls == [
+        call(b"callback1", sentinel.decoded),
+        call(b"callback2", sentinel.decoded),
+    ]
+    assert application.frame_received.mock_calls == []
+
+
+async def test_callback_backpressure_same_loop(gw):
+    for _ in range(2 * uart.CALLBACK_QUEUE_HIGH_WATER):
+        gw.data_received(b"callback")
+
+    assert gw._transport.set_host_ready.mock_calls == []
+
+
+async def test_get_ash_statistics(gw):
+    gw._transport.stats = ash.AshStatistics(frames_rx=3)
+    counters = await gw.get_ash_statistics()
+
+    assert counters["frames_rx"] == 3